@@ -0,0 +1,91 @@
+# scripts/bench_openapi_parse.py
+# Time OpenAPI spec loading: pure-Python yaml.safe_load vs the C loader, $ref resolution
+# (serial vs process pool) and a warm cache hit. Without --spec a synthetic spec is generated.
+#   python -m scripts.bench_openapi_parse --paths 2000
+#   python -m scripts.bench_openapi_parse --spec docs/openapi.yaml
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import yaml
+
+from src.rag.openapi_index import EndpointIndex, YamlLoader, load_spec, resolve_refs
+
+
+def synthetic_spec(n_paths: int) -> dict:
+    """A vendor-sized spec: n_paths resources with shared component schemas and $refs."""
+    schemas = {
+        f"Model{i}": {
+            "type": "object",
+            "required": ["id"],
+            "properties": {
+                "id": {"type": "string", "example": f"M{i}-1"},
+                "name": {"type": "string"},
+                "amount": {"type": "number"},
+                "owner": {"$ref": f"#/components/schemas/Model{(i + 1) % 50}Ref"},
+            },
+        }
+        for i in range(50)
+    }
+    schemas.update({f"Model{i}Ref": {"type": "object", "properties": {"id": {"type": "string"}}} for i in range(50)})
+    paths = {}
+    for i in range(n_paths):
+        ref = {"$ref": f"#/components/schemas/Model{i % 50}"}
+        paths[f"/resources{i}/{{id}}"] = {
+            "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
+            "get": {
+                "summary": f"Get resource {i}",
+                "tags": [f"group{i % 20}"],
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}},
+            },
+            "put": {
+                "summary": f"Replace resource {i}",
+                "requestBody": {"required": True, "content": {"application/json": {"schema": ref}}},
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}},
+            },
+        }
+    return {"openapi": "3.0.0", "info": {"title": "Synthetic", "description": ""}, "paths": paths, "components": {"schemas": schemas}}
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, round((time.perf_counter() - t0) * 1000, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spec", default="", help="Spec file (default: generate one)")
+    ap.add_argument("--paths", type=int, default=2000, help="Paths in the synthetic spec")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.spec
+        if not path:
+            path = os.path.join(tmp, "openapi.yaml")
+            with open(path, "w", encoding="utf-8") as f:
+                yaml.safe_dump(synthetic_spec(args.paths), f, sort_keys=False)
+        with open(path, "rb") as f:
+            raw = f.read()
+        report = {"spec": args.spec or f"synthetic:{args.paths}", "bytes": len(raw), "c_loader": YamlLoader is not yaml.SafeLoader}
+        spec, report["safe_load_ms"] = _timed(lambda: yaml.safe_load(raw))
+        _, report["c_loader_ms"] = _timed(lambda: yaml.load(raw, Loader=YamlLoader))
+        _, report["resolve_serial_ms"] = _timed(lambda: resolve_refs(spec, workers=1))
+        if len(spec.get("paths") or {}) and args.workers > 1:
+            import src.rag.openapi_index as openapi_index
+
+            openapi_index.PARALLEL_MIN_PATHS = 1
+            _, report[f"resolve_{args.workers}_workers_ms"] = _timed(lambda: resolve_refs(spec, workers=args.workers))
+        cache_dir = os.path.join(tmp, "cache")
+        _, report["cold_load_spec_ms"] = _timed(lambda: load_spec(path, cache_dir))
+        resolved, report["cached_load_spec_ms"] = _timed(lambda: load_spec(path, cache_dir))
+        index, report["index_build_ms"] = _timed(lambda: EndpointIndex.from_spec(resolved, resolved=True))
+        report["operations"] = len(index)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/bench_retrieval.py
+# Retrieval quality + latency on the labeled query set (scripts/retrieval_queries.json).
+# Reports recall@k, MRR and p50/p95 per backend and writes a JSON run under runs/.
+#   python -m scripts.bench_retrieval --k 4 --repeats 5
+#   python -m scripts.bench_retrieval --baseline runs/retrieval_20240101T000000Z.json
+import argparse
+import json
+import os
+import subprocess
+import time
+
+import src.tools as tools
+from src.rag import ApiCollections, NumpyIndex, open_collections
+from src.rag.benchmark import compare_runs, load_queries, run_benchmark
+from src.rag.snapshot import load_snapshot
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_QUERIES = os.path.join(ROOT_DIR, "scripts", "retrieval_queries.json")
+
+# default backends; "mmap" (the ingestion snapshot) can be added with --backends
+BACKENDS = ("chroma", "numpy", "bm25", "hybrid")
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", default=DEFAULT_QUERIES)
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--no-api-hint", action="store_true", help="Ignore each query's api label")
+    ap.add_argument("--out", default="", help="Output JSON (default runs/retrieval_<utc>.json)")
+    ap.add_argument("--baseline", default="", help="Earlier run JSON to diff against")
+    args = ap.parse_args()
+
+    queries = load_queries(args.queries)
+    if tools.embedding_model is None:
+        raise SystemExit("Embeddings unavailable; check EMBEDDING_PROVIDER / GOOGLE_API_KEY.")
+    chroma = open_collections(tools.CHROMA_PERSIST_DIR, tools.embedding_model)
+    stores = {"chroma": chroma}
+    if "numpy" in args.backends:
+        to_numpy = lambda store: NumpyIndex.from_chroma(store, tools.embedding_model)
+        stores["numpy"] = chroma.map(to_numpy) if isinstance(chroma, ApiCollections) else to_numpy(chroma)
+    if "mmap" in args.backends:
+        stores["mmap"] = load_snapshot(tools.CHROMA_PERSIST_DIR, tools.embedding_model)
+    # backend name -> (vector store, RAG_RETRIEVAL_MODE)
+    modes = {
+        "chroma": ("chroma", "vector"),
+        "numpy": ("numpy", "vector"),
+        "mmap": ("mmap", "vector"),
+        "bm25": (None, "lexical"),
+        "hybrid": ("chroma", "hybrid"),
+    }
+
+    # Embed every query once up front so latency compares retrieval, not the embedding API
+    tools.embedding_model.embed_queries([q["query"] for q in queries])
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": _git_commit(),
+        "index_dir": tools.CHROMA_PERSIST_DIR,
+        "embedding_provider": tools.EMBEDDING_PROVIDER_NAME,
+        "k": args.k,
+        "repeats": args.repeats,
+        "mmr": {"lambda": tools.RAG_MMR_LAMBDA, "max_per_source": tools.RAG_MAX_PER_SOURCE},
+        "backends": {},
+    }
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if name not in modes:
+            raise SystemExit(f"Unknown backend {name!r}; choose from {', '.join(modes)}")
+        store_name, mode = modes[name]
+        if mode != "vector" and tools.bm25_index is None:
+            print(f"Skipping {name}: no BM25 index (run python -m src.ingestion)")
+            continue
+        if store_name and stores.get(store_name) is None:
+            print(f"Skipping {name}: no current snapshot (run python -m src.ingestion)")
+            continue
+        tools.vector_store = stores.get(store_name) if store_name else chroma
+        tools.RAG_RETRIEVAL_MODE = mode
+
+        def retrieve(query, api):
+            results, _ = tools._retrieve_many([query], args.k, "" if args.no_api_hint else api)[0]
+            return [doc for doc, _ in results]
+
+        run["backends"][name] = run_benchmark(retrieve, queries, k=args.k, repeats=args.repeats)
+
+    out = args.out or os.path.join(ROOT_DIR, "runs", f"retrieval_{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    summary = {name: result["metrics"] for name, result in run["backends"].items()}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            summary = {"metrics": summary, "delta_vs_baseline": compare_runs(run, json.load(f))}
+    print(json.dumps(summary, indent=2))
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
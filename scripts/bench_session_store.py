@@ -0,0 +1,102 @@
+# scripts/bench_session_store.py
+# Per-operation cost of the in-memory session store at scale: the previous prune (TTL scan of every
+# session plus a sort when over max_sessions, on every append/reset) vs the ordered-map MemoryBackend.
+#   python -m scripts.bench_session_store --sessions 100000
+import argparse
+import json
+import random
+import time
+
+from src.session_store import MemoryBackend
+
+
+class ScanPruneBackend:
+    """The store as it was before: a plain dict pruned by full scan and sort."""
+
+    def __init__(self, max_turns, max_sessions, ttl_seconds):
+        self.max_turns, self.max_sessions, self.ttl_seconds = max_turns, max_sessions, ttl_seconds
+        self._store = {}
+
+    def _prune(self):
+        now = time.time()
+        for sid in list(self._store.keys()):
+            if now - float(self._store[sid].get("at", 0)) > self.ttl_seconds:
+                self._store.pop(sid, None)
+        if len(self._store) > self.max_sessions:
+            items = sorted(self._store.items(), key=lambda kv: kv[1].get("at", 0))
+            for sid, _ in items[: max(0, len(self._store) - self.max_sessions)]:
+                self._store.pop(sid, None)
+
+    def append(self, session_id, turn):
+        rec = self._store.setdefault(session_id, {"turns": [], "at": time.time()})
+        rec["turns"].append(turn)
+        if len(rec["turns"]) > self.max_turns:
+            del rec["turns"][0 : len(rec["turns"]) - self.max_turns]
+        rec["at"] = time.time()
+        self._prune()
+        return list(rec["turns"])
+
+    def get(self, session_id):
+        rec = self._store.get(session_id)
+        if not rec:
+            return []
+        rec["at"] = time.time()
+        return list(rec["turns"])
+
+    def reset(self, session_id):
+        self._store.pop(session_id, None)
+        self._prune()
+
+    def fill(self, sessions):
+        # Appending one by one would prune (scan) on every insert: O(n^2) just to set up
+        for i in range(sessions):
+            self._store[f"s{i}"] = {"turns": [{"role": "user", "text": "hello", "meta": {}}], "at": time.time()}
+
+
+def fill(backend, sessions):
+    if hasattr(backend, "fill"):
+        return backend.fill(sessions)
+    for i in range(sessions):
+        backend.append(f"s{i}", {"role": "user", "text": "hello", "meta": {}})
+
+
+def run(backend, sessions, ops, seed=0):
+    rng = random.Random(seed)
+    timings = {"append": [], "get": [], "reset": []}
+    for n in range(ops):
+        sid = f"s{rng.randrange(sessions)}"
+        kind = ("append", "get", "append", "reset")[n % 4]
+        t0 = time.perf_counter()
+        if kind == "append":
+            backend.append(sid, {"role": "user", "text": "hello", "meta": {}})
+        elif kind == "get":
+            backend.get(sid)
+        else:
+            backend.reset(sid)
+        timings[kind].append(time.perf_counter() - t0)
+    return {f"{k}_us_mean": round(sum(v) / len(v) * 1e6, 2) for k, v in timings.items() if v}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=100_000)
+    ap.add_argument("--ops", type=int, default=100_000, help="Operations against the ordered-map backend")
+    ap.add_argument("--scan-ops", type=int, default=200, help="Operations against the scan-and-sort backend")
+    ap.add_argument("--max-turns", type=int, default=20)
+    args = ap.parse_args()
+
+    report = {"sessions": args.sessions}
+    # max_sessions just below the population so the LRU path is exercised as well as the TTL scan
+    for name, backend, ops in (
+        ("ordered_map", MemoryBackend(args.max_turns, args.sessions - 1, 86400), args.ops),
+        ("scan_and_sort", ScanPruneBackend(args.max_turns, args.sessions - 1, 86400), args.scan_ops),
+    ):
+        t0 = time.perf_counter()
+        fill(backend, args.sessions)
+        report[name] = {"fill_s": round(time.perf_counter() - t0, 2), "ops": ops, **run(backend, args.sessions, ops)}
+    report["append_speedup"] = round(report["scan_and_sort"]["append_us_mean"] / report["ordered_map"]["append_us_mean"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
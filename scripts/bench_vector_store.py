@@ -0,0 +1,83 @@
+# scripts/bench_vector_store.py
+# Compare Chroma (HNSW) against the in-memory NumPy exact index on the current corpus.
+# Query vectors are perturbed copies of stored chunk vectors, so no embedding calls are made.
+#   python -m scripts.bench_vector_store --queries 200 --k 4
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from src.rag import NumpyIndex, get_embedding_provider, open_collections
+from src.rag.snapshot import load_snapshot
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _pct(samples, p):
+    return round(float(np.percentile(samples, p)) * 1000, 3) if samples else None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--noise", type=float, default=0.05)
+    args = ap.parse_args()
+
+    provider = get_embedding_provider()
+    index_dir = provider.index_dir(ROOT_DIR)
+    t0 = time.perf_counter()
+    chroma = open_collections(index_dir, provider.embeddings)
+    chroma_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = NumpyIndex.from_chroma(chroma)
+    numpy_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    snapshot = load_snapshot(index_dir, allow_stale=True)
+    mmap_load = time.perf_counter() - t0 if snapshot is not None else None
+    if len(index) == 0:
+        raise SystemExit(f"No chunks in {index_dir}; run python -m src.ingestion first.")
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(index), size=args.queries)
+    queries = index.matrix[rows] + rng.normal(0, args.noise, size=(args.queries, index.matrix.shape[1])).astype(np.float32)
+
+    chroma_lat, numpy_lat, overlap = [], [], []
+    for q in queries:
+        vec = q.tolist()
+        t0 = time.perf_counter()
+        c_hits = chroma.similarity_search_by_vector_with_relevance_scores(vec, k=args.k)
+        chroma_lat.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        n_hits = index.query_batch(q, k=args.k)[0]
+        numpy_lat.append(time.perf_counter() - t0)
+        c_ids = {d.id for d, _ in c_hits}
+        n_ids = {index.ids[i] for i, _ in n_hits}
+        overlap.append(len(c_ids & n_ids) / max(1, len(n_ids)))
+
+    t0 = time.perf_counter()
+    index.query_batch(queries, k=args.k)
+    batch_total = time.perf_counter() - t0
+
+    print(json.dumps({
+        "index_dir": index_dir,
+        "chunks": len(index),
+        "dim": int(index.matrix.shape[1]),
+        "queries": args.queries,
+        "k": args.k,
+        "load_ms": {
+            "chroma": round(chroma_load * 1000, 3),
+            "numpy": round(numpy_load * 1000, 3),
+            "mmap": round(mmap_load * 1000, 3) if mmap_load is not None else None,
+        },
+        "chroma_ms": {"p50": _pct(chroma_lat, 50), "p95": _pct(chroma_lat, 95)},
+        "numpy_ms": {"p50": _pct(numpy_lat, 50), "p95": _pct(numpy_lat, 95)},
+        "numpy_batch_ms_per_query": round(batch_total * 1000 / args.queries, 4),
+        "topk_agreement": round(float(np.mean(overlap)), 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
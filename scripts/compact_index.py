@@ -0,0 +1,122 @@
+# scripts/compact_index.py
+# Remove duplicate and orphaned chunks from the Chroma index. The kept chunks are copied into a fresh
+# Chroma directory (new, compact HNSW graphs), which is then published: running apps keep searching the
+# database they opened until they hot-swap on the generation bump. Reports index size and query latency
+# before and after; writes runs/compact_<utc>.json.
+#   python -m scripts.compact_index --dry-run
+#   EMBEDDING_PROVIDER=hashing python -m scripts.compact_index --queries 200
+import argparse
+import json
+import os
+import time
+
+import chromadb
+import numpy as np
+
+from src.index_watcher import try_ingest_lock
+from src.ingestion import DOCS_PATH, ROOT_DIR, publish_index
+from src.rag import get_embedding_provider, open_collections
+from src.rag.compaction import CHROMA_SUBDIR_PREFIX, chroma_bytes, copy_collection, plan_compaction, query_latency, remove_chroma_dirs
+from src.rag.openapi_index import EndpointIndex
+from src.rag.stores import chroma_dir, set_chroma_dir
+
+
+def live_sources(docs_path):
+    """File names ingestion would read today (chunks from any other file are orphans)."""
+    names = {"openapi.yaml"}
+    for _, _, filenames in os.walk(docs_path):
+        names.update(n for n in filenames if n.endswith(".md"))
+    return names
+
+
+def live_operations(docs_path):
+    spec = os.path.join(docs_path, "openapi.yaml")
+    return set(EndpointIndex.from_file(spec).operations) if os.path.exists(spec) else set()
+
+
+def measure(index_dir, embeddings, queries, k):
+    store = open_collections(index_dir, embeddings)
+    return {"bytes": chroma_bytes(chroma_dir(index_dir)),
+            "chunks": len(store) if hasattr(store, "__len__") else store._collection.count(),
+            **query_latency(store, queries, k)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    ap.add_argument("--queries", type=int, default=100, help="Latency samples before/after")
+    ap.add_argument("--k", type=int, default=4)
+    ap.add_argument("--out", default="", help="Output JSON (default runs/compact_<utc>.json)")
+    args = ap.parse_args()
+
+    provider = get_embedding_provider()
+    index_dir = provider.index_dir(ROOT_DIR)
+    source_dir = chroma_dir(index_dir)
+    if not os.path.exists(os.path.join(source_dir, "chroma.sqlite3")):
+        raise SystemExit(f"No index in {index_dir}; run python -m src.ingestion first.")
+    # Same lock as ingestion: never compact while chunks are being written
+    lock = try_ingest_lock(index_dir)
+    if lock is None:
+        raise SystemExit(f"Ingestion is running on {index_dir} (ingest.lock); try again later.")
+    try:
+        # Only read from the live database: apps may be searching it right now
+        source = chromadb.PersistentClient(path=source_dir)
+        collections = {name: source.get_collection(name) for name in sorted(c.name for c in source.list_collections())}
+        dumps = {name: col.get(include=["embeddings", "documents", "metadatas"]) for name, col in collections.items()}
+        vectors = [np.asarray(d["embeddings"], dtype=np.float32) for d in dumps.values() if len(d["ids"])]
+        if not vectors:
+            raise SystemExit(f"No chunks in {index_dir}.")
+        # Perturbed copies of stored vectors: latency without embedding calls (same as bench_vector_store)
+        matrix = np.concatenate(vectors)
+        rng = np.random.default_rng(0)
+        queries = matrix[rng.integers(0, len(matrix), size=args.queries)]
+        queries = queries + rng.normal(0, 0.05, size=queries.shape).astype(np.float32)
+
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "index_dir": index_dir,
+            "source_dir": source_dir,
+            "dry_run": args.dry_run,
+            "before": measure(index_dir, provider.embeddings, queries, args.k),
+            "collections": {},
+        }
+        sources, operations = live_sources(DOCS_PATH), live_operations(DOCS_PATH)
+        plans = {}
+        for name, data in dumps.items():
+            plans[name] = plan_compaction(data, sources, operations)
+            report["collections"][name] = {
+                "chunks": len(data["ids"]),
+                "duplicates": len(plans[name]["duplicates"]),
+                "orphans": len(plans[name]["orphans"]),
+                "kept": len(plans[name]["keep"]),
+            }
+
+        if not args.dry_run:
+            target_dir = os.path.join(index_dir, f"{CHROMA_SUBDIR_PREFIX}{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}")
+            if os.path.exists(target_dir):
+                raise SystemExit(f"{target_dir} already exists; try again in a second.")
+            target = chromadb.PersistentClient(path=target_dir)
+            for name, plan in plans.items():
+                copy_collection(collections[name], target, plan["keep"])
+                print(f"{name}: {report['collections'][name]}")
+            # Atomic pointer swap, then BM25/snapshot over the new database and a generation bump:
+            # every process reloads onto it (RAG_WATCH) while searches in flight finish on the old one
+            set_chroma_dir(index_dir, os.path.basename(target_dir))
+            report["chroma_dir"] = target_dir
+            report["generation"] = publish_index(index_dir, provider.embeddings, changed=True)
+            # The database just replaced stays for processes that have not reloaded yet; older ones go
+            report["removed_dirs"] = remove_chroma_dirs(index_dir, keep=[target_dir, source_dir])
+            report["after"] = measure(index_dir, provider.embeddings, queries, args.k)
+    finally:
+        os.remove(lock)
+
+    out = args.out or os.path.join(ROOT_DIR, "runs", f"compact_{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: report[k] for k in ("collections", "before", "after") if k in report}, indent=2))
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
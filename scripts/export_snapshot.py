@@ -0,0 +1,24 @@
+# scripts/export_snapshot.py
+# Write the memory-mapped vector snapshot (VECTOR_BACKEND=mmap) for an existing Chroma index
+# without re-running ingestion.
+#   EMBEDDING_PROVIDER=hashing python -m scripts.export_snapshot
+import os
+
+from src.rag import NumpyIndex, get_embedding_provider, open_collections
+from src.rag.snapshot import export_snapshot, snapshot_info
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def main():
+    provider = get_embedding_provider()
+    index_dir = provider.index_dir(ROOT_DIR)
+    index = NumpyIndex.from_chroma(open_collections(index_dir, provider.embeddings))
+    if len(index) == 0:
+        raise SystemExit(f"No chunks in {index_dir}; run python -m src.ingestion first.")
+    export_snapshot(index, index_dir)
+    print(snapshot_info(index_dir))
+
+
+if __name__ == "__main__":
+    main()
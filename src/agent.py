@@ -60,6 +60,7 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 # Tools (LangChain @tool objects)
 # We support both `get_tools()` presence and direct imports for robustness.
 search_documentation = None
+lookup_endpoint = None
 check_api_status = None
 create_project = None
 add_cost_item = None
@@ -71,6 +72,8 @@ try:
         tname = getattr(t, "name", "")
         if tname == "search_documentation":
             search_documentation = t
+        if tname == "lookup_endpoint":
+            lookup_endpoint = t
         if tname == "check_api_status":
             check_api_status = t
         if tname == "create_project":
@@ -82,11 +85,13 @@ except Exception as e:
     try:
         from src.tools import (
             search_documentation as _sd,
+            lookup_endpoint as _le,
             check_api_status as _hc,
             create_project as _cp,
             add_cost_item as _aci,
         )
         search_documentation = _sd
+        lookup_endpoint = _le
         check_api_status = _hc
         create_project = _cp
         add_cost_item = _aci
@@ -134,6 +139,7 @@ class AgentState(TypedDict, total=False):
     user_query: str
     api_status: Dict[str, Any]
     docs: List[Dict[str, Any]]
+    endpoints: List[Dict[str, Any]]
     plan: List[Dict[str, Any]]
     answer: str
     pm_score: Dict[str, Any]
@@ -237,7 +243,7 @@ def planner_node(state: AgentState) -> AgentState:
 
 
 def executor_node(state: AgentState) -> AgentState:
-    """Run a RAG lookup using search_documentation tool and stash results."""
+    """Run a RAG lookup (plus a structured endpoint lookup) and stash results."""
     _append_event(state, "executor")
     if search_documentation is None:
         state["docs"] = []
@@ -265,6 +271,16 @@ def executor_node(state: AgentState) -> AgentState:
         else:
             state["docs"] = [{"message": str(results)}]
 
+        # Exact endpoint details (request/response examples) go ahead of the prose chunks
+        if lookup_endpoint is not None:
+            endpoints = lookup_endpoint.invoke({"query": query, "limit": 2})
+            endpoints = [e for e in endpoints if isinstance(e, dict) and "operation" in e]
+            if endpoints:
+                state["endpoints"] = endpoints
+                state["docs"] = [
+                    {"page_content": e["page_content"], "metadata": e["metadata"]} for e in endpoints
+                ] + state["docs"]
+
         # Execute real actions for the specific workflow (Block 7)
         uq = query.lower()
         if (
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class PoolFull(Exception):
+    """Every worker is busy and the wait queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Agent pool is full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _pct(samples, p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+
+
+class AgentPool:
+    """
+    Runs blocking agent calls on ``workers`` threads with at most
+    ``queue_size`` more waiting. Admission is decided up front and never
+    blocks: when every slot is taken, ``submit`` raises PoolFull so the
+    caller can answer 503 right away instead of piling up work. Threads (not
+    processes) because an agent run mostly waits on the LLM and HTTP calls.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 16, max_retry_after: int = 60, samples: int = 512):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.max_retry_after = max_retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits: Deque[float] = deque(maxlen=samples)
+        self._runs: Deque[float] = deque(maxlen=samples)
+
+    @classmethod
+    def from_env(cls) -> "AgentPool":
+        return cls(
+            workers=int(os.getenv("AGENT_WORKERS", "4")),
+            queue_size=int(os.getenv("AGENT_QUEUE_SIZE", "16")),
+            max_retry_after=int(os.getenv("AGENT_MAX_RETRY_AFTER", "60")),
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queue ahead / workers x mean run time."""
+        with self._lock:
+            mean_run = sum(self._runs) / len(self._runs) if self._runs else 1.0
+            ahead = self.queued + 1
+        return max(1, min(self.max_retry_after, math.ceil(mean_run * ahead / self.workers)))
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolFull(self.retry_after())
+        submitted = time.monotonic()
+        with self._lock:
+            self.queued += 1
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._waits.append(started - submitted)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self._runs.append(time.monotonic() - started)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self._slots.release()
+
+        try:
+            return self._executor.submit(job)
+        except RuntimeError:
+            # Executor shut down (app stopping): give the slot back and refuse
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise PoolFull(self.max_retry_after)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await ``fn`` on the pool without blocking the event loop; raises PoolFull when saturated."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits, runs = list(self._waits), list(self._runs)
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "active": self.active,
+                "queue_depth": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms_p50": _pct(waits, 50),
+                "wait_ms_p95": _pct(waits, 95),
+                "run_ms_p50": _pct(runs, 50),
+                "run_ms_p95": _pct(runs, 95),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+AGENT_POOL = AgentPool.from_env()
@@ -6,7 +6,7 @@ import requests
 
 # Reuse registry + tools (no LLM)
 from src.apis import ApiRegistry, ContechApi, SchedulerApi
-from src.tools import check_api_status, search_documentation, create_project as tool_create_project, add_cost_item as tool_add_cost_item
+from src.tools import check_api_status, search_documentation, search_documentation_batch, create_project as tool_create_project, add_cost_item as tool_add_cost_item
 
 JSON = Dict[str, Any]
 
@@ -41,6 +41,11 @@ def rag(query: str, api_hint: str = "", k: int = 4) -> List[JSON]:
     return search_documentation.invoke({"query": query, "k": k, "api_hint": api_hint})
 
 
+def rag_batch(queries: List[str], api_hint: str = "", k: int = 4) -> List[List[JSON]]:
+    """Batch RAG call (one embedding request for all queries); results align with `queries`."""
+    return search_documentation_batch.invoke({"queries": queries, "k": k, "api_hint": api_hint})
+
+
 # ---- Minimal helpers to hit the mock ConTech API (via our stable tools) ----
 def create_project(base_url: str, name: str) -> JSON:
     # Use the real tool to ensure payload/auth compatibility with the mock
@@ -112,8 +117,10 @@ def run_smoke(include_scheduler: bool = True) -> JSON:
             summary["scheduler_checked"] = False
 
     # 3) RAG checks (just verify non-empty message-less results)
-    rag_auth = rag("How do I authenticate to the API?", api_hint=primary_name)
-    rag_cost = rag("Create a project and add some cost items.", api_hint=primary_name)
+    rag_auth, rag_cost = rag_batch(
+        ["How do I authenticate to the API?", "Create a project and add some cost items."],
+        api_hint=primary_name,
+    )
 
     summary["steps"].append({"rag_auth_count": len(rag_auth)})
     summary["steps"].append({"rag_cost_count": len(rag_cost)})
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from src.rag import read_generation
+
+WATCH_EXTENSIONS = (".md", ".yaml", ".yml")
+LOCK_FILE = "ingest.lock"
+# Digest of the docs an ingestion read, written next to index_generation when it publishes
+INDEXED_DOCS_FILE = "indexed_docs.json"
+
+
+def docs_signature(docs_path: str) -> Tuple[Tuple[str, int, int], ...]:
+    """(relative path, mtime_ns, size) for every indexable file; any edit, add or delete changes it."""
+    out = []
+    for dirpath, dirnames, filenames in os.walk(docs_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not name.endswith(WATCH_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((os.path.relpath(path, docs_path), st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def signature_digest(signature: Tuple[Tuple[str, int, int], ...]) -> str:
+    return hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()
+
+
+def read_indexed_docs(index_dir: str) -> Optional[str]:
+    """Digest of the docs the live index was built from (None if never recorded)."""
+    try:
+        with open(os.path.join(index_dir, INDEXED_DOCS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("signature")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_indexed_docs(index_dir: str, digest: str, generation: int) -> None:
+    path = os.path.join(index_dir, INDEXED_DOCS_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"signature": digest, "generation": generation}, f)
+    os.replace(tmp, path)
+
+
+def _lock_owner_alive(path: str) -> Optional[bool]:
+    """Whether the process named in a lock file still runs (None: no readable pid in it)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    except OSError:
+        return None
+    return True
+
+
+def try_ingest_lock(index_dir: str, stale_after: float = 600.0) -> Optional[str]:
+    """
+    Cross-process ingest lock (O_EXCL file in ``index_dir``), held by anything
+    that writes the index: ingestion, watch-mode re-indexing and compaction.
+    Returns the lock path to remove when done, or None if another process
+    holds it. The file records the holder's pid: a lock whose process has
+    died is taken over however recent, and a live holder keeps it however
+    long it runs. Only a lock without a readable pid falls back to expiring
+    after ``stale_after`` seconds.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, LOCK_FILE)
+    try:
+        alive = _lock_owner_alive(path)
+        if alive is False or (alive is None and time.time() - os.path.getmtime(path) > stale_after):
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return path
+
+
+class DocsWatcher:
+    """
+    Polls ``docs_path`` and, once a change has been stable for one interval,
+    runs ``reindex`` (incremental ingestion) under a cross-process lock. Every
+    poll also compares the on-disk index generation with ``current_generation``
+    and calls ``reload`` when another process (or this one) published a new
+    one, so all workers swap to it without a restart.
+    """
+
+    def __init__(
+        self,
+        docs_path: str,
+        index_dir: str,
+        reindex: Callable[[], object],
+        reload: Callable[[], object],
+        current_generation: Callable[[], int],
+        interval: float = 2.0,
+    ):
+        self.docs_path = docs_path
+        self.index_dir = index_dir
+        self.reindex = reindex
+        self.reload = reload
+        self.current_generation = current_generation
+        self.interval = interval
+        self._signature = docs_signature(docs_path)
+        self._changed_at: Optional[float] = None
+        self._seen_generation = read_generation(index_dir)  # on disk when the pending change was seen
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reindexes = 0
+        self.reloads = 0
+        self.last_error = ""
+
+    def poll_once(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        signature = docs_signature(self.docs_path)
+        if signature != self._signature:
+            # Still being edited (or copied): wait for one quiet interval
+            self._signature = signature
+            self._changed_at = now
+            self._seen_generation = read_generation(self.index_dir)
+        elif self._changed_at is not None and self._indexed_elsewhere(signature):
+            # Another worker (or a CLI run) already published an index of exactly these docs
+            self._changed_at = None
+        elif self._changed_at is not None and now - self._changed_at >= self.interval:
+            lock = try_ingest_lock(self.index_dir)
+            if lock is not None:
+                try:
+                    # Re-check under the lock: the previous holder may have just indexed this change
+                    if read_indexed_docs(self.index_dir) != signature_digest(signature):
+                        self.reindex()
+                        self.reindexes += 1
+                    self._changed_at = None
+                except Exception as e:
+                    self.last_error = f"reindex: {e}"
+                finally:
+                    os.remove(lock)
+        if read_generation(self.index_dir) != self.current_generation():
+            try:
+                self.reload()
+                self.reloads += 1
+            except Exception as e:
+                self.last_error = f"reload: {e}"
+
+    def _indexed_elsewhere(self, signature) -> bool:
+        # Only a newer generation can cover the pending change; skip the file read otherwise
+        if read_generation(self.index_dir) <= self._seen_generation:
+            return False
+        return read_indexed_docs(self.index_dir) == signature_digest(signature)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self) -> "DocsWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="docs-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.current_generation(),
+            "reindexes": self.reindexes,
+            "reloads": self.reloads,
+            "pending_change": self._changed_at is not None,
+            "last_error": self.last_error,
+        }
+
+
+def start_watcher_from_env() -> Optional[DocsWatcher]:
+    """RAG_WATCH=1 starts a watcher on docs/ bound to the live search tools (RAG_WATCH_INTERVAL seconds)."""
+    if os.getenv("RAG_WATCH", "").strip().lower() not in {"1", "true", "yes", "on"}:
+        return None
+    import src.tools as tools
+    from src.ingestion import DOCS_PATH, ingest_documents
+
+    watcher = DocsWatcher(
+        docs_path=DOCS_PATH,
+        index_dir=tools.CHROMA_PERSIST_DIR,
+        reindex=lambda: ingest_documents(tools.EMBEDDING_PROVIDER_NAME, lock_held=True),  # poll_once holds it
+        reload=tools.reload_index,
+        current_generation=lambda: tools.INDEX_GENERATION,
+        interval=float(os.getenv("RAG_WATCH_INTERVAL", "2")),
+    )
+    return watcher.start()
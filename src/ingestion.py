@@ -1,112 +1,451 @@
+import json
 import os
-import yaml # To parse the OpenAPI YAML file
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # --- LangChain Components ---
 # Document Loaders for different file types
-from langchain_community.document_loaders import TextLoader, DirectoryLoader
+from langchain_community.document_loaders import TextLoader
 # Text Splitter for chunking documents
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-# Google's Embedding Model
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-# Vector Store (ChromaDB)
-from langchain_community.vectorstores import Chroma
+try:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+except ImportError:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+# Vector Store (ChromaDB) - prefer standalone, same as src/tools.py
+try:
+    from langchain_chroma import Chroma
+except ImportError:
+    from langchain_community.vectorstores import Chroma
+
+# Embedding providers + shared embedding cache (same SQLite file as the query path in src/tools.py)
+from src.rag import (
+    BM25Index,
+    NumpyIndex,
+    bump_generation,
+    chunk_id,
+    get_embedding_provider,
+    infer_api,
+    known_apis,
+    open_collections,
+    read_generation,
+)
+from src.rag.batch_embed import BatchEmbedder, batched
+from src.rag.bm25 import BM25_FILE
+from src.rag.openapi_index import EndpointIndex, load_spec
+from src.rag.profiling import StageProfiler, TimedEmbeddings, write_report
+from src.rag.snapshot import export_snapshot, snapshot_info
+from src.rag.stores import LEGACY_COLLECTION, api_collection_name, chroma_dir, list_collections
+from src.index_watcher import LOCK_FILE, docs_signature, signature_digest, try_ingest_lock, write_indexed_docs
 
 # --- Configuration ---
 # Load API Key from .env file
 load_dotenv()
+# google (default) | local | hashing -- only the Google provider needs an API key
+EMBEDDING_PROVIDER_NAME = os.getenv("EMBEDDING_PROVIDER", "google").strip().lower()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in .env file. Please add it.")
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY # Ensure environment variable is set for LangChain
+if GOOGLE_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY # Ensure environment variable is set for LangChain
+
+# Define paths (relative to the repo root, so `python -m src.ingestion` works from anywhere)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DOCS_PATH = os.path.join(ROOT_DIR, "docs") # Path to your documentation folder
+CHROMA_PERSIST_DIR = os.path.join(ROOT_DIR, "chroma_db") # Google index; other providers get their own dir
+
+# Chunker settings are part of every chunk id: changing them re-embeds everything
+CHUNK_SIZE = 1000 # Max characters per chunk
+CHUNK_OVERLAP = 100 # Characters overlap between chunks
+CHUNKER_CONFIG = f"recursive:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+# Embedding stage: chunks per embedding request and concurrent requests (halved on every 429/503)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "4"))
+CHECKPOINT_FILE = "ingest_checkpoint.json"
+RUNS_DIR = os.path.join(ROOT_DIR, "runs")  # --profile reports
+# Records nothing; the default for every stage below unless --profile is given
+NO_PROFILE = StageProfiler(enabled=False)
+
 
-# Define paths
-DOCS_PATH = "../docs" # Path to your documentation folder (relative to this script)
-CHROMA_PERSIST_DIR = "../chroma_db" # Where to save the vector database
+def _write_checkpoint(persist_dir, state):
+    os.makedirs(persist_dir, exist_ok=True)
+    path = os.path.join(persist_dir, CHECKPOINT_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _read_checkpoint(persist_dir):
+    try:
+        with open(os.path.join(persist_dir, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
 # --- Helper Function for OpenAPI/YAML ---
-def load_openapi_spec_to_text(file_path):
-    """Loads an OpenAPI YAML file and converts relevant parts to text."""
+def load_openapi_operations(file_path, profiler=NO_PROFILE):
+    """
+    One Document per OpenAPI operation (method, path, summary, description,
+    parameters, example request/response bodies with $refs resolved), plus a
+    short overview Document for the spec's title and description.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            spec = yaml.safe_load(f)
+        with profiler.stage("yaml_parse"):
+            spec = load_spec(file_path)
+        with profiler.stage("load"):
+            index = EndpointIndex.from_spec(spec, source="openapi.yaml", resolved=True)
     except Exception as e:
         print(f"Error loading or parsing YAML file {file_path}: {e}")
-        return None
+        return []
+
+    from langchain_core.documents import Document
+    with profiler.stage("load"):
+        docs = [Document(
+            page_content=f"# API Title: {index.title or 'N/A'}\n\n{index.description or 'No description provided.'}",
+            metadata={"source": "openapi.yaml"},
+        )]
+        for op in index.operations.values():
+            docs.append(Document(
+                page_content=EndpointIndex.render(op),
+                metadata={
+                    "source": "openapi.yaml",
+                    "method": op["method"],
+                    "path": op["path"],
+                    "tags": ",".join(op["tags"]),  # Chroma metadata must be scalar
+                    # Last path segment decides the API, e.g. .../schedule-tasks -> scheduler
+                    "api": infer_api(op["path"]),
+                },
+            ))
+    return docs
+
+
+# --- Streaming stages (each yields one item at a time; nothing holds the whole corpus) ---
+def iter_source_documents(docs_path=DOCS_PATH, profiler=NO_PROFILE):
+    """Yield Markdown files one at a time (sorted, repo-relative sources), then the OpenAPI spec."""
+    md_files = 0
+    for dirpath, dirnames, filenames in os.walk(docs_path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not name.endswith(".md"):
+                continue
+            with profiler.stage("load"):
+                docs = TextLoader(os.path.join(dirpath, name), encoding="utf-8").load()
+            for doc in docs:
+                # Store repo-relative sources (e.g. "docs/auth.md"), not machine paths
+                doc.metadata["source"] = os.path.relpath(doc.metadata.get("source", ""), ROOT_DIR).replace(os.sep, "/")
+                yield doc
+            md_files += 1
+    print(f"Loaded {md_files} Markdown documents.")
+
+    # The OpenAPI spec is chunked per operation rather than cut at arbitrary character offsets
+    openapi_docs = load_openapi_operations(os.path.join(docs_path, "openapi.yaml"), profiler)
+    yield from openapi_docs
+    profiler.count("documents", md_files + len(openapi_docs))
+    if openapi_docs:
+        print(f"Loaded OpenAPI spec ({len(openapi_docs) - 1} operations).")
+    else:
+        print("Skipping OpenAPI spec due to loading error.")
 
-    # Extract key information into a text format RAG can understand
-    text_content = ""
-    info = spec.get('info', {})
-    text_content += f"# API Title: {info.get('title', 'N/A')}\n\n"
-    text_content += f"## Description:\n{info.get('description', 'No description provided.')}\n\n"
 
-    paths = spec.get('paths', {})
-    text_content += "## API Endpoints:\n\n"
-    for path, methods in paths.items():
-        for method, details in methods.items():
-            text_content += f"### {method.upper()} {path}\n"
-            text_content += f"Summary: {details.get('summary', 'No summary')}\n"
-            # Add more details as needed (parameters, responses, etc.)
-            # For simplicity, we keep it concise here. In production, you'd extract more.
-            text_content += "---\n" # Separator
+def iter_chunks(documents, text_splitter, profiler=NO_PROFILE):
+    """Split documents one at a time; yield (chunk id, chunk) with duplicates dropped."""
+    seen = set()
+    for doc in documents:
+        with profiler.stage("split"):
+            chunks = text_splitter.split_documents([doc])
+        for chunk in chunks:
+            # Tag each chunk with the API it documents so searches can filter in the vector query
+            chunk.metadata.setdefault("api", infer_api(chunk.metadata.get("source", "")))
+            # Content-hash ids: identical chunks collapse to one, unchanged chunks keep their id across runs
+            cid = chunk_id(chunk, CHUNKER_CONFIG)
+            if cid not in seen:
+                seen.add(cid)
+                yield cid, chunk
 
-    return text_content
+
+# --- Per-API routing: the corpus is loaded and split once, each chunk goes to its API's writer ---
+_END = object()  # end of the corpus: every chunk of this API has been routed
+
+
+class IngestAborted(Exception):
+    """Another stage of the same run failed; this API's sync stopped without deleting anything."""
+
+
+class IngestLocked(RuntimeError):
+    """Another process (ingestion, watcher or compaction) is writing this index."""
+
+
+def _put(q, item, abort):
+    # Bounded queues keep the stream throttled by the slowest writer; give up once the run is aborted
+    while not abort.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def route_chunks(chunks, queues, abort):
+    """Single producer: hand each (id, chunk) to its API's queue, then mark every queue complete."""
+    try:
+        for cid, chunk in chunks:
+            q = queues.get(chunk.metadata.get("api"))
+            if q is not None and not _put(q, (cid, chunk), abort):
+                return
+    except BaseException:
+        abort.set()
+        raise
+    for q in queues.values():
+        _put(q, _END, abort)
+
+
+def drain_chunks(q, abort):
+    """Consume one API's queue until the producer marks the end of the corpus."""
+    while True:
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            if abort.is_set():
+                # A partial stream must not look complete: that would delete the unseen chunks
+                raise IngestAborted("ingestion aborted")
+            continue
+        if item is _END:
+            return
+        yield item
 
 
 # --- Main Ingestion Function ---
-def ingest_documents():
-    """Loads, splits, embeds, and stores documents in ChromaDB."""
-    print("Starting document ingestion...")
+def _sync_api(api, vector_store, embedding_model, chunks, max_in_flight, progress, record, profiler=NO_PROFILE):
+    """
+    Sync one API's collection from the stream of that API's (id, chunk) pairs:
+    only new chunks are embedded, and chunks no longer in the docs are deleted
+    once the stream is complete.
+    """
+    existing = set(vector_store.get(include=[])["ids"])
+    current_ids = set()
+    new_chunks = {}  # in-flight chunks awaiting their embeddings
+
+    def new_ids():
+        for cid, chunk in chunks:
+            current_ids.add(cid)
+            profiler.count("chunks")
+            profiler.count("chars", len(chunk.page_content))
+            if cid not in existing:
+                new_chunks[cid] = chunk
+                profiler.count("embedded_chunks")
+                profiler.count("embedded_chars", len(chunk.page_content))
+                yield cid
 
-    # 1. Load Documents
+    def pending_batches():
+        for ids in batched(new_ids(), INGEST_BATCH_SIZE):
+            yield ids, [new_chunks[i].page_content for i in ids]
+
+    def upsert(ids, texts, vectors):
+        # Each stored batch is a checkpoint: a re-run finds these ids and skips them
+        metadatas = [new_chunks.pop(i).metadata for i in ids]
+        with profiler.stage("upsert"):
+            vector_store._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+            record(api, len(ids))
+        print(f"  [{api}] embedded {progress['done'][api]} chunks")
+
+    # The embedder pulls a batch only when an in-flight slot frees up, which throttles loading/splitting
+    embedder = BatchEmbedder(TimedEmbeddings(embedding_model, profiler) if profiler.enabled else embedding_model,
+                             max_in_flight=max_in_flight)
+    stats = embedder.run(pending_batches(), upsert)
+    print(f"[{api}] embedding stage: {stats}")
+    profiler.count("embed_batches", stats["batches"])
+    profiler.count("throttled", stats["throttled"])
+
+    # Deletions need the full id set, so they run after the stream is drained
+    to_remove = sorted(existing - current_ids)
+    if to_remove:
+        with profiler.stage("upsert"):
+            vector_store.delete(ids=to_remove)
+    return {"added": stats["chunks"], "removed": len(to_remove), "kept": len(existing) - len(to_remove), "total": len(current_ids)}
+
+
+def publish_index(persist_dir, embedding_model, changed, profiler=NO_PROFILE, docs_digest=None):
+    """
+    Rebuild what is derived from the collections (BM25 and the mmap snapshot)
+    and, if ``changed``, bump the index generation so every process reloads.
+    ``docs_digest`` (the docs the collections were synced from) is recorded
+    with the generation so watchers do not re-index the same change.
+    Returns the live generation.
+    """
+    # Local BM25 index next to Chroma for literal endpoint/header/code queries (no embeddings, always rebuilt)
+    vector_store = open_collections(persist_dir, embedding_model)
+    with profiler.stage("bm25"):
+        data = vector_store.get(include=["documents", "metadatas"])
+        bm25 = BM25Index.build(list(zip(data["documents"], data["metadatas"])))
+        bm25.save(os.path.join(persist_dir, BM25_FILE))
+    print(f"BM25 index written ({len(bm25)} chunks).")
+    generation = read_generation(persist_dir) + (1 if changed else 0)
+    # Read-only vector snapshot for VECTOR_BACKEND=mmap (workers map it instead of loading Chroma).
+    # Written before the generation bump so a hot reload triggered by the bump finds it current.
+    if changed or (snapshot_info(persist_dir) or {}).get("generation") != generation:
+        with profiler.stage("snapshot"):
+            snapshot = NumpyIndex.from_chroma(vector_store)
+            export_snapshot(snapshot, persist_dir, generation)
+        print(f"Vector snapshot written ({len(snapshot)} vectors).")
+    # New generation invalidates cached search results and triggers hot reloads in every running process
+    if changed:
+        generation = bump_generation(persist_dir)
+    if docs_digest:
+        write_indexed_docs(persist_dir, docs_digest, generation)
+    print(f"Index generation: {generation}{'' if changed else ' (unchanged)'}")
+    return generation
+
+
+def ingest_documents(provider_name=None, apis=None, profile=False, lock_held=False):
+    """
+    Streams docs through load -> split -> embed -> upsert in bounded batches and
+    syncs one Chroma collection per API incrementally, all APIs in parallel.
+    ``apis`` limits the run to some collections (the others are not touched);
+    BM25 and the vector snapshot are always rebuilt over all of them. Returns
+    added/removed/kept counts, overall and per API. ``profile`` times every
+    stage and writes a JSON + Markdown report under runs/.
+
+    Runs under the index's ingest lock and raises IngestLocked if another
+    process holds it; ``lock_held`` is for callers that already took it.
+    """
+    provider_name = provider_name or EMBEDDING_PROVIDER_NAME
+    # Checked here rather than at import, so the helpers above stay importable without a key
+    if provider_name == "google" and not os.getenv("GOOGLE_API_KEY"):
+        raise ValueError("GOOGLE_API_KEY not found in .env file. Please add it.")
+    provider = get_embedding_provider(provider_name)
+    persist_dir = provider.index_dir(ROOT_DIR)
+    lock = None if lock_held else try_ingest_lock(persist_dir)
+    if lock is None and not lock_held:
+        raise IngestLocked(
+            f"Another ingestion or compaction is writing {persist_dir} "
+            f"(lock: {os.path.join(persist_dir, LOCK_FILE)}); try again once it finishes."
+        )
+    try:
+        return _ingest_locked(provider, persist_dir, apis, profile)
+    finally:
+        if lock is not None:
+            os.remove(lock)
+
+
+def _ingest_locked(provider, persist_dir, apis, profile):
+    profiler = StageProfiler(enabled=profile)
+    print("Starting document ingestion...")
     print(f"Loading documents from: {DOCS_PATH}")
-    markdown_loader = DirectoryLoader(DOCS_PATH, glob="**/*.md", loader_cls=TextLoader, loader_kwargs={'encoding': 'utf-8'}, recursive=True)
-    md_docs = markdown_loader.load()
-    print(f"Loaded {len(md_docs)} Markdown documents.")
-
-    # Load and process the OpenAPI YAML file separately
-    openapi_file = os.path.join(DOCS_PATH, "openapi.yaml")
-    openapi_text = load_openapi_spec_to_text(openapi_file)
-    openapi_docs = []
-    if openapi_text:
-        # Create a LangChain Document object for the processed YAML content
-        from langchain_core.documents import Document
-        openapi_docs = [Document(page_content=openapi_text, metadata={"source": "openapi.yaml"})]
-        print("Loaded and processed OpenAPI spec.")
-    else:
-        print("Skipping OpenAPI spec due to loading error.")
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+    print(f"Initializing embedding model ({provider.name}: {provider.model_name})...")
+    embedding_model = provider.cached()
+    targets = [a.lower() for a in apis] if apis else known_apis()
+
+    print(f"Creating/updating vector store at: {persist_dir} (collections: {', '.join(targets)})")
+    # A leftover checkpoint means the last run stopped mid-way: its finished batches are already
+    # stored (and skipped via their ids), but the generation/snapshot still need refreshing
+    interrupted = _read_checkpoint(persist_dir)
+    if interrupted:
+        print(f"Resuming interrupted ingestion ({sum((interrupted.get('done') or {}).values())} chunks were stored).")
+
+    # Taken before reading: an edit made during the run leaves the record stale, so it is re-indexed
+    docs_digest = signature_digest(docs_signature(DOCS_PATH)) if not apis else None
+    progress = {"started_at": time.time(), "chunker": CHUNKER_CONFIG, "done": {api: 0 for api in targets}}
+    _write_checkpoint(persist_dir, progress)
+    progress_lock = threading.Lock()
+
+    def record(api, n):
+        with progress_lock:
+            progress["done"][api] += n
+            _write_checkpoint(persist_dir, progress)
+
+    # Each API gets its own collection and its own share of the in-flight embedding budget
+    stores = {
+        api: Chroma(collection_name=api_collection_name(api), persist_directory=chroma_dir(persist_dir),
+                    embedding_function=embedding_model)
+        for api in targets
+    }
+    share = max(1, INGEST_MAX_IN_FLIGHT // len(targets))
+    # One pass over the corpus feeds every API's writer (chunks of APIs not being synced are skipped)
+    queues = {api: queue.Queue(maxsize=2 * INGEST_BATCH_SIZE) for api in targets}
+    abort = threading.Event()
+
+    def sync(api, store):
+        try:
+            return _sync_api(api, store, embedding_model, drain_chunks(queues[api], abort), share, progress, record,
+                             profiler=profiler)
+        except BaseException:
+            abort.set()
+            raise
 
-    all_docs = md_docs + openapi_docs
-    if not all_docs:
+    with ThreadPoolExecutor(max_workers=len(targets) + 1, thread_name_prefix="ingest") as pool:
+        chunks = iter_chunks(iter_source_documents(DOCS_PATH, profiler=profiler), text_splitter, profiler)
+        router = pool.submit(route_chunks, chunks, queues, abort)
+        futures = {api: pool.submit(sync, api, store) for api, store in stores.items()}
+    # Report the failure that aborted the run, not the IngestAborted it caused elsewhere
+    for future in [router, *futures.values()]:
+        if future.exception() is not None and not isinstance(future.exception(), IngestAborted):
+            raise future.exception()
+    results = {api: future.result() for api, future in futures.items()}
+
+    if not any(r["total"] for r in results.values()):
         print("No documents loaded. Exiting.")
+        os.remove(os.path.join(persist_dir, CHECKPOINT_FILE))
         return
 
-    # 2. Split Documents into Chunks
-    print("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, # Max characters per chunk
-        chunk_overlap=100  # Characters overlap between chunks
-    )
-    chunks = text_splitter.split_documents(all_docs)
-    print(f"Split documents into {len(chunks)} chunks.")
-
-    # 3. Initialize Embedding Model
-    print("Initializing embedding model (models/text-embedding-004)...")
-    embedding_model = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-
-    # 4. Create or Load Vector Store (ChromaDB) and Add Chunks
-    print(f"Creating/updating vector store at: {CHROMA_PERSIST_DIR}")
-    vector_store = Chroma.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        persist_directory=CHROMA_PERSIST_DIR # Save to this directory
-    )
+    # Indexes built before the per-API split keep everything in one collection; drop it once
+    # every API has its own (a partial --api run leaves it for the next full one)
+    legacy_removed = False
+    if set(known_apis()) <= set(targets) and LEGACY_COLLECTION in list_collections(persist_dir):
+        Chroma(collection_name=LEGACY_COLLECTION, persist_directory=chroma_dir(persist_dir)).delete_collection()
+        legacy_removed = True
+        print(f"Removed legacy single-collection index '{LEGACY_COLLECTION}'.")
 
-    # Persist the database to disk
-    vector_store.persist()
-    print("Vector store created and data persisted.")
+    added = sum(r["added"] for r in results.values())
+    removed = sum(r["removed"] for r in results.values())
+    kept = sum(r["kept"] for r in results.values())
+    for api, r in results.items():
+        print(f"[{api}] chunks: {r['added']} added, {r['removed']} removed, {r['kept']} kept.")
+
+    changed = bool(added or removed or interrupted or legacy_removed)
+    generation = publish_index(persist_dir, embedding_model, changed, profiler, docs_digest=docs_digest)
+    os.remove(os.path.join(persist_dir, CHECKPOINT_FILE))
+    print(f"Embedding cache: {embedding_model.stats()}")
+    summary = {
+        "added": added,
+        "removed": removed,
+        "kept": kept,
+        "generation": generation,
+        "apis": {api: {k: r[k] for k in ("added", "removed", "kept")} for api, r in results.items()},
+    }
+    if profile:
+        report = profiler.report(
+            embedding_provider=f"{provider.name}:{provider.model_name}",
+            index_dir=persist_dir,
+            apis=",".join(targets),
+            chunker=CHUNKER_CONFIG,
+            batch_size=INGEST_BATCH_SIZE,
+            max_in_flight=INGEST_MAX_IN_FLIGHT,
+            result=summary,
+            embedding_cache=embedding_model.stats(),
+        )
+        summary["profile"] = write_report(report, RUNS_DIR)
+        print(f"Profile: {', '.join(summary['profile'])}")
     print("--- Ingestion Complete ---")
+    return summary
 
 # --- Run the Ingestion ---
 if __name__ == "__main__":
-    ingest_documents()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or update the documentation index.")
+    parser.add_argument("--api", action="append", dest="apis", metavar="NAME",
+                        help="Only re-sync this API's collection (repeatable); default: all APIs")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each stage, count docs/chunks/tokens, record peak RSS; report under runs/")
+    args = parser.parse_args()
+    try:
+        ingest_documents(apis=args.apis, profile=args.profile)
+    except IngestLocked as e:
+        raise SystemExit(str(e))
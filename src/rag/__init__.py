@@ -0,0 +1,30 @@
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .embedding_cache import CachedEmbeddings
+from .embeddings import EmbeddingProvider, HashingEmbeddings, get_embedding_provider
+from .mmr import mmr_rerank
+from .numpy_index import NumpyIndex
+from .result_cache import ResultCache, bump_generation, read_generation
+from .sources import chunk_id, content_key, infer_api, known_apis, source_name, top_up_by_api
+from .stores import ApiCollections, open_collections
+
+__all__ = [
+    "ApiCollections",
+    "BM25Index",
+    "CachedEmbeddings",
+    "EmbeddingProvider",
+    "HashingEmbeddings",
+    "NumpyIndex",
+    "ResultCache",
+    "bump_generation",
+    "chunk_id",
+    "content_key",
+    "get_embedding_provider",
+    "infer_api",
+    "known_apis",
+    "mmr_rerank",
+    "open_collections",
+    "read_generation",
+    "reciprocal_rank_fusion",
+    "source_name",
+    "top_up_by_api",
+]
@@ -0,0 +1,154 @@
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+# (ids, texts) for one embedding request
+Batch = Tuple[List[str], List[str]]
+Sink = Callable[[List[str], List[str], List[List[float]]], None]
+
+RETRYABLE_STATUS = (429, 503)
+_RETRYABLE_TEXT = re.compile(r"\b(429|503)\b|resource.?exhausted|unavailable|rate.?limit|quota|too many requests", re.I)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code", "http_status"):
+        value = getattr(exc, attr, None)
+        value = value() if callable(value) else value
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for quota / overload errors (HTTP 429 or 503, or the provider's wording of them)."""
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return bool(_RETRYABLE_TEXT.search(str(exc)))
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def batched(items: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    """Yield lists of up to ``size`` items without materialising ``items``."""
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchEmbedder:
+    """
+    Embeds batches on a thread pool with AIMD concurrency control: every
+    success allows one more batch in flight (up to ``max_in_flight``), every
+    429/503 halves the allowance and pauses all workers for an exponential,
+    jittered delay (or the server's Retry-After). Finished batches are handed
+    to ``sink`` on the calling thread in completion order, so the sink can
+    write to a store that is not thread-safe and each upsert doubles as a
+    checkpoint.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_in_flight: int = 4,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.embeddings = embeddings
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.limit = self.max_in_flight
+        self._resume_at = 0.0
+        self._streak = 0
+        self.batches = 0
+        self.throttled = 0
+
+    def _wait_for_cooldown(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._streak = 0
+            self.limit = min(self.max_in_flight, self.limit + 1)
+
+    def _on_throttle(self, exc: BaseException) -> float:
+        with self._lock:
+            self.throttled += 1
+            self._streak += 1
+            self.limit = max(1, self.limit // 2)
+            delay = _retry_after(exc)
+            if delay is None:
+                delay = min(self.max_delay, self.base_delay * (2 ** (self._streak - 1)))
+                delay *= random.uniform(0.5, 1.0)
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            return delay
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """One batch with retry on 429/503; other errors propagate."""
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._sleep(self._on_throttle(e))
+                continue
+            self._on_success()
+            return vectors
+        raise RuntimeError("unreachable")
+
+    def run(self, batches: Iterable[Batch], sink: Sink) -> Dict[str, int]:
+        """
+        Embed ``batches`` (consumed lazily) and pass each result to ``sink``.
+        At most ``limit`` batches are in flight, so a generator upstream is
+        only advanced as fast as embedding keeps up.
+        """
+        source = iter(batches)
+        pending: Dict[Any, Batch] = {}
+        chunks = 0
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed") as pool:
+            while True:
+                while not exhausted and len(pending) < self.limit:
+                    batch = next(source, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    pending[pool.submit(self.embed, batch[1])] = batch
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ids, texts = pending.pop(future)
+                    sink(ids, texts, future.result())
+                    self.batches += 1
+                    chunks += len(ids)
+        return {"batches": self.batches, "chunks": chunks, "throttled": self.throttled, "in_flight_limit": self.limit}
+
@@ -0,0 +1,100 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .sources import source_name
+
+# A labeled query: {"id", "query", "api", "expected": [{"source", "section", "anchor"}]}
+Query = Dict[str, Any]
+Retriever = Callable[[str, str], Sequence[Any]]
+
+
+def load_queries(path: str) -> List[Query]:
+    with open(path, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    for q in queries:
+        if not q.get("query") or not q.get("expected"):
+            raise ValueError(f"Labeled query {q.get('id')!r} needs 'query' and 'expected'")
+    return queries
+
+
+def matches(doc: Any, target: Dict[str, str]) -> bool:
+    """
+    A chunk satisfies a target when it comes from the expected source file and
+    contains the target's anchor text (falls back to the section heading).
+    """
+    meta = doc.metadata if isinstance(doc.metadata, dict) else {}
+    if source_name(meta.get("source", "")).lower() != source_name(target["source"]).lower():
+        return False
+    anchor = (target.get("anchor") or target.get("section") or "").lower()
+    return anchor in doc.page_content.lower()
+
+
+def score_ranking(docs: Sequence[Any], expected: Sequence[Dict[str, str]], k: int) -> Tuple[float, float]:
+    """(recall@k, reciprocal rank) of one ranked result list against its targets."""
+    top = list(docs)[:k]
+    found = sum(1 for target in expected if any(matches(doc, target) for doc in top))
+    rr = 0.0
+    for rank, doc in enumerate(top, start=1):
+        if any(matches(doc, target) for target in expected):
+            rr = 1.0 / rank
+            break
+    return found / len(expected), rr
+
+
+def _ms(samples: Sequence[float], p: float) -> Optional[float]:
+    return round(float(np.percentile(samples, p)) * 1000, 3) if len(samples) else None
+
+
+def run_benchmark(retrieve: Retriever, queries: Sequence[Query], k: int = 4, repeats: int = 1) -> Dict[str, Any]:
+    """
+    Run every labeled query through ``retrieve(query, api_hint)`` and report
+    recall@k, MRR and latency percentiles. Quality is scored on the first run;
+    ``repeats`` only adds latency samples.
+    """
+    latencies: List[float] = []
+    per_query: List[Dict[str, Any]] = []
+    for q in queries:
+        docs: Sequence[Any] = []
+        for r in range(max(1, repeats)):
+            t0 = time.perf_counter()
+            out = retrieve(q["query"], q.get("api", ""))
+            latencies.append(time.perf_counter() - t0)
+            if r == 0:
+                docs = out
+        recall, rr = score_ranking(docs, q["expected"], k)
+        per_query.append({
+            "id": q.get("id") or q["query"],
+            "recall": round(recall, 4),
+            "rr": round(rr, 4),
+            "sources": [source_name((d.metadata or {}).get("source", "")) for d in list(docs)[:k]],
+        })
+    n = max(1, len(per_query))
+    return {
+        "metrics": {
+            "queries": len(per_query),
+            f"recall@{k}": round(sum(p["recall"] for p in per_query) / n, 4),
+            "mrr": round(sum(p["rr"] for p in per_query) / n, 4),
+            "p50_ms": _ms(latencies, 50),
+            "p95_ms": _ms(latencies, 95),
+            "mean_ms": round(float(np.mean(latencies)) * 1000, 3) if latencies else None,
+        },
+        "per_query": per_query,
+    }
+
+
+def compare_runs(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Metric deltas (current - baseline) for every backend present in both runs."""
+    deltas: Dict[str, Dict[str, float]] = {}
+    for name, result in current.get("backends", {}).items():
+        before = baseline.get("backends", {}).get(name)
+        if not before:
+            continue
+        deltas[name] = {
+            metric: round(value - before["metrics"][metric], 4)
+            for metric, value in result["metrics"].items()
+            if isinstance(value, (int, float)) and isinstance(before["metrics"].get(metric), (int, float))
+        }
+    return deltas
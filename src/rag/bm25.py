@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .sources import infer_api
+
+BM25_FILE = "bm25_index.json"
+
+_RAW_TOKEN_RE = re.compile(r"[\w{}/.\-]+")
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or the this to what when with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens plus whole literals such as
+    ``/projects/{projectid}/cost-items``, ``x-api-key`` or ``lab-elec-01``,
+    so exact endpoint/header/code matches score higher than their parts.
+    """
+    out: List[str] = []
+    for raw in _RAW_TOKEN_RE.findall((text or "").lower()):
+        raw = raw.strip(".-")
+        if not raw:
+            continue
+        words = _WORD_RE.findall(raw)
+        if len(words) > 1 or raw != (words[0] if words else ""):
+            out.append(raw)
+        out.extend(w for w in words if w not in _STOPWORDS)
+    return out
+
+
+def literal_terms(query: str) -> List[str]:
+    """Query tokens that look like identifiers: paths, hyphenated codes/headers, numbers."""
+    terms = []
+    for raw in _RAW_TOKEN_RE.findall((query or "").lower()):
+        raw = raw.strip(".-")
+        if "/" in raw or "-" in raw or any(ch.isdigit() for ch in raw):
+            terms.append(raw)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked key lists: score(key) = sum(1 / (k + rank))."""
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+
+class BM25Index:
+    """Small in-memory inverted index (Okapi BM25) over ingested chunks."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Dict[str, Any]] = []  # {page_content, metadata}
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_len: List[int] = []
+        self._avgdl = 0.0
+        self._idf: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, Dict[str, Any]]]) -> "BM25Index":
+        index = cls()
+        for text, metadata in chunks:
+            index.docs.append({"page_content": text, "metadata": dict(metadata or {})})
+        index._reindex()
+        return index
+
+    def _reindex(self) -> None:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_len = []
+        for i, doc in enumerate(self.docs):
+            tf = Counter(tokenize(doc["page_content"]))
+            self._doc_len.append(sum(tf.values()))
+            for term, count in tf.items():
+                postings[term].append((i, count))
+        self._postings = dict(postings)
+        n = len(self.docs)
+        self._avgdl = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self._postings.items()
+        }
+
+    def _doc_api(self, i: int) -> str:
+        meta = self.docs[i]["metadata"]
+        return str(meta.get("api") or infer_api(meta.get("source", ""))).lower()
+
+    def search(self, query: str, k: int = 4, api: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Return (doc index, score) pairs, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        api = (api or "").strip().lower()
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                dl = self._doc_len[i]
+                denom = tf + self.k1 * (1 - self.b + self.b * dl / (self._avgdl or 1.0))
+                scores[i] += idf * tf * (self.k1 + 1) / denom
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if api:
+            ranked = [(i, s) for i, s in ranked if self._doc_api(i) == api]
+        return ranked[:k]
+
+    def is_confident(self, query: str, hits: List[Tuple[int, float]], margin: float = 1.2) -> bool:
+        """
+        True when a keyword query can be answered lexically: it names at least
+        one literal, the top chunk contains all of them, and it clearly beats
+        the runner-up.
+        """
+        literals = literal_terms(query)
+        if not literals or not hits:
+            return False
+        top_terms = set(tokenize(self.docs[hits[0][0]]["page_content"]))
+        if not all(t in top_terms for t in literals):
+            return False
+        return len(hits) == 1 or hits[0][1] >= margin * hits[1][1]
+
+    # --- persistence ---------------------------------------------------------
+    def save(self, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.docs}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        index.docs = data.get("docs", [])
+        index._reindex()
+        return index
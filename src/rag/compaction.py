@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .sources import source_name
+
+_CONTENT_ID = re.compile(r"^[0-9a-f]{64}$")  # sha256 chunk ids written by incremental ingestion
+_SEGMENT_DIR = re.compile(r"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}")  # Chroma's per-segment HNSW files
+# Compacted databases are written to <index dir>/chroma-<utc> and published with set_chroma_dir
+CHROMA_SUBDIR_PREFIX = "chroma-"
+
+
+def content_hash(text: Optional[str], metadata: Optional[Dict[str, Any]]) -> str:
+    """Duplicate key: source file name + chunk text (old Windows paths and repo-relative paths agree)."""
+    meta = metadata or {}
+    h = hashlib.sha256()
+    h.update(source_name(meta.get("source", "")).encode("utf-8"))
+    h.update(b"\0")
+    h.update((text or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+def plan_compaction(
+    data: Dict[str, Any],
+    live_sources: Optional[Set[str]] = None,
+    live_operations: Optional[Set[Tuple[str, str]]] = None,
+) -> Dict[str, List[str]]:
+    """
+    Split a collection dump (ids, documents, metadatas, embeddings) into the
+    ids to keep and the ids to drop:
+
+    - orphans: no text or no vector, a source file no longer in ``live_sources``
+      (file names), or an OpenAPI operation no longer in ``live_operations``
+    - duplicates: same content hash as an earlier kept chunk; a content-hash
+      id (written by incremental ingestion) is preferred as the survivor
+    """
+    ids = list(data.get("ids") or [])
+    documents = list(data.get("documents") or [None] * len(ids))
+    metadatas = list(data.get("metadatas") or [None] * len(ids))
+    embeddings = data.get("embeddings")
+    embeddings = [None] * len(ids) if embeddings is None else list(embeddings)
+
+    orphans: List[str] = []
+    groups: Dict[str, List[str]] = {}
+    for cid, text, meta, vec in zip(ids, documents, metadatas, embeddings):
+        meta = meta or {}
+        name = source_name(meta.get("source", ""))
+        operation = (str(meta.get("method") or "").upper(), str(meta.get("path") or ""))
+        if not text or vec is None or len(vec) == 0:
+            orphans.append(cid)
+        elif live_sources is not None and name not in live_sources:
+            orphans.append(cid)
+        elif live_operations is not None and all(operation) and operation not in live_operations:
+            orphans.append(cid)
+        else:
+            groups.setdefault(content_hash(text, meta), []).append(cid)
+
+    keep: List[str] = []
+    duplicates: List[str] = []
+    for members in groups.values():
+        survivor = next((cid for cid in members if _CONTENT_ID.match(cid)), members[0])
+        keep.append(survivor)
+        duplicates.extend(cid for cid in members if cid != survivor)
+    return {"keep": keep, "duplicates": duplicates, "orphans": orphans}
+
+
+def copy_collection(source: Any, client: Any, keep_ids: Iterable[str], batch_size: int = 512) -> int:
+    """
+    Copy the ``keep_ids`` rows of ``source`` into a new collection of the same
+    name and HNSW settings in ``client`` (a fresh Chroma directory). Chroma
+    only marks deleted vectors in the HNSW graph; the copy drops them.
+    Returns the number of rows copied.
+    """
+    hnsw = dict((getattr(source, "configuration", None) or {}).get("hnsw") or {})
+    kwargs = {"configuration": {"hnsw": hnsw}} if hnsw else {}
+    target = client.create_collection(source.name, metadata=source.metadata, embedding_function=None, **kwargs)
+    keep_ids = list(keep_ids)
+    for i in range(0, len(keep_ids), batch_size):
+        rows = source.get(ids=keep_ids[i:i + batch_size], include=["embeddings", "documents", "metadatas"])
+        target.add(
+            ids=rows["ids"],
+            embeddings=rows["embeddings"],
+            documents=rows["documents"],
+            metadatas=rows["metadatas"],
+        )
+    if target.count() != len(keep_ids):
+        raise RuntimeError(f"Copy of {source.name} has {target.count()} of {len(keep_ids)} rows")
+    return len(keep_ids)
+
+
+def _chroma_entries(path: str) -> List[str]:
+    """The files and segment directories of the Chroma database stored directly in ``path``."""
+    out = []
+    for entry in os.listdir(path):
+        full = os.path.join(path, entry)
+        if entry.startswith("chroma.sqlite3") or (os.path.isdir(full) and _SEGMENT_DIR.fullmatch(entry)):
+            out.append(full)
+    return out
+
+
+def chroma_bytes(path: str) -> int:
+    """Size of the Chroma database in ``path`` (not the BM25 index, snapshot or other databases next to it)."""
+    return sum(dir_size(p) if os.path.isdir(p) else os.path.getsize(p) for p in _chroma_entries(path))
+
+
+def remove_chroma_dirs(index_dir: str, keep: Iterable[str]) -> List[str]:
+    """
+    Delete the compaction outputs (``chroma-*`` dirs, including any left
+    half-written) of ``index_dir`` other than those in ``keep``. The original
+    database stored in ``index_dir`` itself is never touched (the default
+    index is checked in). Returns the paths removed.
+    """
+    keep = {os.path.abspath(p) for p in keep}
+    removed = []
+    for entry in sorted(os.listdir(index_dir)):
+        path = os.path.abspath(os.path.join(index_dir, entry))
+        if entry.startswith(CHROMA_SUBDIR_PREFIX) and os.path.isdir(path) and path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
+
+
+def dir_size(path: str) -> int:
+    """Total bytes under ``path``."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def query_latency(store: Any, vectors: np.ndarray, k: int = 4) -> Dict[str, Optional[float]]:
+    """p50/p95 milliseconds of single-vector searches against ``store``."""
+    samples = []
+    for vec in vectors:
+        t0 = time.perf_counter()
+        store.similarity_search_by_vector_with_relevance_scores(vec.tolist(), k=k)
+        samples.append(time.perf_counter() - t0)
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None}
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+    }
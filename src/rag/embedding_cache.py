@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "embeddings.sqlite3")
+)
+
+
+def normalize_text(text: str) -> str:
+    """Cache-key normalisation: NFC + collapsed whitespace (case is preserved)."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain ``Embeddings`` with a two-level cache:
+    an in-memory LRU in front of a persistent SQLite table keyed by
+    (model, normalised text). Query and document embeddings are cached
+    separately because some providers embed them with different task types.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        model_name: str,
+        path: Optional[str] = None,
+        max_memory_items: int = 4096,
+        batch_query_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    ):
+        self.inner = inner
+        self.batch_query_fn = batch_query_fn
+        self.model_name = model_name
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_memory_items = max_memory_items
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._conn = self._connect()
+
+    # --- storage -----------------------------------------------------------
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        try:
+            base = os.path.dirname(self.path)
+            if base:
+                os.makedirs(base, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            conn.commit()
+            return conn
+        except sqlite3.Error:
+            # Disk cache is best-effort; the in-memory LRU still works.
+            return None
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _model_key(self, kind: str) -> str:
+        return f"{self.model_name}#{kind}"
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def _load_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        if self._conn is None or not hashes:
+            return {}
+        found: Dict[str, List[float]] = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(hashes), 500):
+            part = hashes[i : i + 500]
+            marks = ",".join("?" for _ in part)
+            try:
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+            except sqlite3.Error:
+                return found
+            for h, blob in rows:
+                found[h] = array("f", blob).tolist()
+        return found
+
+    def _store_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if self._conn is None or not items:
+            return
+        now = time.time()
+        rows = [(model, h, len(v), array("f", v).tobytes(), now) for h, v in items.items()]
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    # --- lookup ------------------------------------------------------------
+    def _embed(self, texts: List[str], kind: str, compute: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        model = self._model_key(kind)
+        hashes = [self._hash(t) for t in texts]
+        unique: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            unique.setdefault(h, t)
+        out: Dict[str, List[float]] = {}
+        with self._lock:
+            pending: List[str] = []
+            for h in unique:
+                vec = self._lru.get(f"{model}:{h}")
+                if vec is None:
+                    pending.append(h)
+                    continue
+                self._lru.move_to_end(f"{model}:{h}")
+                self.memory_hits += 1
+                out[h] = vec
+            for h, vec in self._load_many(model, pending).items():
+                self.disk_hits += 1
+                out[h] = vec
+                self._remember(f"{model}:{h}", vec)
+
+        missing = [h for h in unique if h not in out]
+        if missing:
+            computed = compute([unique[h] for h in missing])
+            fresh = {h: [float(x) for x in vec] for h, vec in zip(missing, computed)}
+            with self._lock:
+                self.misses += len(fresh)
+                for h, vec in fresh.items():
+                    out[h] = vec
+                    self._remember(f"{model}:{h}", vec)
+                self._store_many(model, fresh)
+        return [list(out[h]) for h in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "document", self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query", lambda ts: [self.inner.embed_query(ts[0])])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries; every cache miss goes to the backend in one batched request."""
+        compute = self.batch_query_fn or (lambda ts: [self.inner.embed_query(t) for t in ts])
+        return self._embed(list(texts), "query", compute)
+
+    # --- introspection -----------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_items": len(self._lru),
+        }
@@ -0,0 +1,138 @@
+import hashlib
+import math
+import os
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .bm25 import tokenize
+from .embedding_cache import CachedEmbeddings
+
+DEFAULT_GOOGLE_MODEL = "models/text-embedding-004"
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline feature-hashing embeddings: word unigrams/bigrams and character
+    trigrams hashed into a fixed number of signed buckets, log-scaled and
+    L2-normalised. Deterministic across processes; no model download.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = tokenize(text)
+        feats = list(words)
+        feats.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for w in words:
+            padded = f"#{w}#"
+            feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return feats
+
+    def _embed(self, text: str) -> List[float]:
+        counts = {}
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 63) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        vec = [0.0] * self.dim
+        for bucket, c in counts.items():
+            vec[bucket] = math.copysign(math.log1p(abs(c)), c)
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Local CPU embeddings via sentence-transformers (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer  # optional
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(list(texts), normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+@dataclass
+class EmbeddingProvider:
+    """An embedding backend plus the index directory that belongs to it."""
+
+    name: str
+    model_name: str
+    embeddings: Embeddings
+    # Embeds a batch of *queries* in one backend call (None: one call per query)
+    embed_queries: Optional[Callable[[List[str]], List[List[float]]]] = None
+
+    def index_dir(self, root_dir: str) -> str:
+        # The Google index keeps the historical location; every other
+        # provider/model gets its own directory so vectors never mix.
+        if self.name == "google":
+            return os.path.join(root_dir, "chroma_db")
+        slug = re.sub(r"[^a-z0-9]+", "-", self.model_name.lower()).strip("-")
+        if not slug.startswith(self.name):
+            slug = f"{self.name}-{slug}"
+        return os.path.join(root_dir, f"chroma_db_{slug}")
+
+    def cached(self, path: Optional[str] = None) -> CachedEmbeddings:
+        return CachedEmbeddings(
+            self.embeddings,
+            model_name=self.model_name,
+            path=path,
+            batch_query_fn=self.embed_queries,
+        )
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Build the provider selected by ``EMBEDDING_PROVIDER``:
+    ``google`` (default, remote), ``local`` (sentence-transformers on CPU) or
+    ``hashing`` (pure Python). ``local`` without sentence-transformers raises
+    ImportError unless ``LOCAL_EMBEDDING_FALLBACK=hashing`` opts into hashing.
+    """
+    name = (name or os.getenv("EMBEDDING_PROVIDER", "google")).strip().lower()
+    if name == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        model = os.getenv("GOOGLE_EMBEDDING_MODEL", DEFAULT_GOOGLE_MODEL)
+        emb = GoogleGenerativeAIEmbeddings(model=model)
+        return EmbeddingProvider(
+            "google",
+            model,
+            emb,
+            # Batched request with the same task type embed_query uses
+            embed_queries=lambda texts: emb.embed_documents(texts, task_type="RETRIEVAL_QUERY"),
+        )
+    if name == "local":
+        model = os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL)
+        try:
+            emb = SentenceTransformerEmbeddings(model)
+            return EmbeddingProvider("local", model, emb, embed_queries=emb.embed_documents)
+        except ImportError as e:
+            if os.getenv("LOCAL_EMBEDDING_FALLBACK", "").strip().lower() != "hashing":
+                raise ImportError(
+                    "EMBEDDING_PROVIDER=local needs sentence-transformers (pip install sentence-transformers); "
+                    "set LOCAL_EMBEDDING_FALLBACK=hashing to use hashing embeddings instead"
+                ) from e
+            warnings.warn("sentence-transformers not installed; using hashing embeddings (LOCAL_EMBEDDING_FALLBACK)")
+            name = "hashing"
+    if name == "hashing":
+        dim = int(os.getenv("HASHING_EMBEDDING_DIM", "512"))
+        emb = HashingEmbeddings(dim)
+        return EmbeddingProvider("hashing", f"hashing-{dim}", emb, embed_queries=emb.embed_documents)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{name}' (expected google, local or hashing)")
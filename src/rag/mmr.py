@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .bm25 import tokenize
+from .sources import content_key, source_name
+
+
+def _unit(vec: Any) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(v))
+    return v / n if n else v
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def mmr_rerank(
+    ranked: List[Tuple[Any, float]],
+    k: int,
+    vectors: Optional[Dict[Hashable, Any]] = None,
+    lambda_mult: float = 0.7,
+    max_per_source: int = 0,
+) -> List[Tuple[Any, float]]:
+    """
+    Maximal marginal relevance over already-retrieved (Document, score) pairs,
+    best first. Relevance is rank-based so vector, BM25 and fused lists can be
+    re-ranked the same way. Redundancy is cosine similarity of the chunk
+    embeddings fetched with the results, or token Jaccard overlap when a chunk
+    has no embedding (lexical hits). ``max_per_source`` caps chunks per source
+    file; it is relaxed only if there is nothing else left to fill ``k``.
+    """
+    if k <= 0 or not ranked:
+        return []
+    if lambda_mult >= 1.0 and max_per_source <= 0:
+        return ranked[:k]
+    vectors = vectors or {}
+    n = len(ranked)
+    relevance = [1.0 - i / n for i in range(n)]
+    keys = [content_key(doc) for doc, _ in ranked]
+    sources = [source_name((doc.metadata or {}).get("source", "")) for doc, _ in ranked]
+    units = [(_unit(vectors[key]) if key in vectors else None) for key in keys]
+    token_sets: Dict[int, set] = {}
+
+    def tokens(i: int) -> set:
+        if i not in token_sets:
+            token_sets[i] = set(tokenize(ranked[i][0].page_content))
+        return token_sets[i]
+
+    def similarity(i: int, j: int) -> float:
+        if units[i] is not None and units[j] is not None:
+            return float(np.dot(units[i], units[j]))
+        return _jaccard(tokens(i), tokens(j))
+
+    selected: List[int] = []
+    per_source: Counter = Counter()
+    remaining = list(range(n))
+    while remaining and len(selected) < k:
+        eligible = [i for i in remaining if max_per_source <= 0 or per_source[sources[i]] < max_per_source]
+        best, best_val = None, -float("inf")
+        for i in eligible or remaining:
+            redundancy = max((similarity(i, j) for j in selected), default=0.0)
+            val = lambda_mult * relevance[i] - (1.0 - lambda_mult) * redundancy
+            if val > best_val:
+                best, best_val = i, val
+        selected.append(best)
+        per_source[sources[best]] += 1
+        remaining.remove(best)
+    return [ranked[i] for i in selected]
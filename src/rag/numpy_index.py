@@ -0,0 +1,230 @@
+import json
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+Where = Optional[Dict[str, Any]]
+
+
+def _matches(meta: Dict[str, Any], where: Where) -> bool:
+    """Subset of Chroma's ``where`` syntax: {field: value}, {"$eq": v}, {"$in": [...]}, {"$and": [...]}."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(meta, sub) for sub in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if isinstance(cond, dict):
+            if "$eq" in cond and value != cond["$eq"]:
+                return False
+            if "$in" in cond and value not in cond["$in"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class PackedColumn(SequenceABC):
+    """
+    Read-only column of strings (``as_json``: JSON values) stored back to back
+    in one byte array; row ``i`` is ``blob[offsets[i]:offsets[i + 1]]``. Both
+    arrays may be memory-mapped, so rows stay in the page cache and are only
+    decoded when read.
+    """
+
+    def __init__(self, blob: Any, offsets: Any, as_json: bool = False):
+        self.blob = blob
+        self.offsets = offsets
+        self.as_json = as_json
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _row(self, i: int) -> Any:
+        raw = bytes(self.blob[int(self.offsets[i]):int(self.offsets[i + 1])]).decode("utf-8")
+        return json.loads(raw) if self.as_json else raw
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self._row(i) for i in range(len(self)))
+
+
+class NumpyIndex(VectorStore):
+    """
+    Exact-search vector store for small corpora. All chunk vectors live in one
+    contiguous float32 matrix of unit rows, so top-k is a single matrix-vector
+    (or matrix-matrix, for batches) product plus ``argpartition``.
+    Distances are squared L2 between unit vectors (2 - 2·cos), the same scale
+    Chroma's default ``l2`` space reports, so relevance scores line up.
+    Read-only once built (``from_chroma``, ``from_texts`` or a snapshot):
+    ``add_texts`` raises TypeError.
+    """
+
+    def __init__(
+        self,
+        vectors: Any,
+        documents: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        ids: Optional[Sequence[str]] = None,
+        embedding_function: Optional[Embeddings] = None,
+        normalized: bool = False,
+    ):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(documents), -1)
+        if not normalized:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = np.ascontiguousarray(matrix / np.where(norms == 0, 1.0, norms), dtype=np.float32)
+        self.matrix = matrix
+        # Packed (snapshot) columns are kept as they are: copying them would load every row into this process
+        self.documents = documents if isinstance(documents, PackedColumn) else list(documents)
+        self.metadatas = metadatas if isinstance(metadatas, PackedColumn) else [dict(m or {}) for m in metadatas]
+        if isinstance(ids, PackedColumn):
+            self.ids = ids
+        else:
+            self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.documents))]
+        self._embedding = embedding_function
+        self._mask_cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    # --- construction ----------------------------------------------------------
+    @classmethod
+    def from_chroma(cls, store: Any, embedding_function: Optional[Embeddings] = None) -> "NumpyIndex":
+        """Copy every vector out of a (langchain) Chroma store in one read."""
+        data = store.get(include=["embeddings", "documents", "metadatas"])
+        vectors = data.get("embeddings")
+        if vectors is None or len(vectors) == 0:
+            vectors = np.zeros((0, 1), dtype=np.float32)
+        return cls(
+            vectors,
+            data.get("documents") or [],
+            data.get("metadatas") or [],
+            ids=data.get("ids"),
+            embedding_function=embedding_function or getattr(store, "embeddings", None),
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> "NumpyIndex":
+        texts = list(texts)
+        return cls(
+            embedding.embed_documents(texts),
+            texts,
+            metadatas or [{} for _ in texts],
+            ids=kwargs.get("ids"),
+            embedding_function=embedding,
+        )
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        """
+        Not supported: the index is a read-only view of what ingestion wrote
+        (often a memory-mapped snapshot shared by several workers). New chunks
+        go through ingestion, which rebuilds the snapshot and bumps the index
+        generation so running processes reload.
+        """
+        raise TypeError("NumpyIndex is read-only; re-run ingestion (python -m src.ingestion) to add documents")
+
+    # --- search ----------------------------------------------------------------
+    def _mask(self, where: Where) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        key = repr(sorted(where.items()))
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = np.fromiter((_matches(m, where) for m in self.metadatas), dtype=bool, count=len(self.metadatas))
+            self._mask_cache[key] = mask
+        return mask
+
+    def query_batch(self, query_vectors: Any, k: int = 4, where: Where = None) -> List[List[Tuple[int, float]]]:
+        """Top-k (row index, squared L2 distance) for each query vector, best first."""
+        q = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        if len(self) == 0 or k <= 0:
+            return [[] for _ in range(len(q))]
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(norms == 0, 1.0, norms)
+        sims = q @ self.matrix.T  # (n_queries, n_chunks)
+        mask = self._mask(where)
+        candidates = int(mask.sum()) if mask is not None else len(self)
+        if mask is not None:
+            sims = np.where(mask[None, :], sims, -np.inf)
+        kk = min(k, candidates)
+        if kk == 0:
+            return [[] for _ in range(len(q))]
+        if kk < sims.shape[1]:
+            top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+        else:
+            top = np.tile(np.arange(sims.shape[1]), (len(q), 1))
+        out: List[List[Tuple[int, float]]] = []
+        for row, cols in zip(sims, top):
+            cols = cols[np.argsort(-row[cols])]
+            out.append([(int(c), float(2.0 - 2.0 * row[c])) for c in cols])
+        return out
+
+    def _doc(self, i: int) -> Document:
+        return Document(page_content=self.documents[i], metadata=self.metadatas[i], id=self.ids[i])
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Where = None,
+        with_embeddings: bool = False,
+    ) -> List[List[Tuple[Any, ...]]]:
+        """Batch form of ``similarity_search_by_vector_with_relevance_scores``."""
+        hits = self.query_batch(embeddings, k, filter)
+        if with_embeddings:
+            return [[(self._doc(i), d, self.matrix[i]) for i, d in row] for row in hits]
+        return [[(self._doc(i), d) for i, d in row] for row in hits]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: Sequence[float], k: int = 4, filter: Where = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # Mirrors langchain_chroma: returns distances (lower is closer)
+        return self.similarity_search_by_vectors([embedding], k, filter)[0]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Where = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        if self._embedding is None:
+            raise ValueError("NumpyIndex needs an embedding function for text queries.")
+        return self.similarity_search_by_vector_with_relevance_scores(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Where = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def get(self, include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        include = include or ["documents", "metadatas"]
+        out: Dict[str, Any] = {"ids": list(self.ids)}
+        if "documents" in include:
+            out["documents"] = list(self.documents)
+        if "metadatas" in include:
+            out["metadatas"] = [dict(m) for m in self.metadatas]
+        if "embeddings" in include:
+            out["embeddings"] = self.matrix
+        return out
@@ -0,0 +1,338 @@
+import copy
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .bm25 import tokenize
+
+# libyaml's C loader is several times faster; same safe subset as yaml.safe_load
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+DEFAULT_SPEC_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "openapi"))
+# Bump when resolve_refs changes what it produces, so old cache entries are not reused
+SPEC_CACHE_VERSION = 1
+# Specs with at least this many paths resolve their path items on a process pool
+PARALLEL_MIN_PATHS = int(os.getenv("OPENAPI_PARALLEL_MIN_PATHS", "1000"))
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete", "head", "options")
+# Words that imply an HTTP method when the query names none explicitly
+METHOD_HINTS = {
+    "get": ("get", "list", "retrieve", "fetch", "show", "read", "check", "details"),
+    "post": ("post", "create", "add", "new", "submit", "schedule"),
+    "put": ("put", "replace", "update"),
+    "patch": ("patch", "update", "modify"),
+    "delete": ("delete", "remove"),
+}
+_EXPLICIT = re.compile(r"\b(GET|POST|PUT|PATCH|DELETE|HEAD|OPTIONS)\s+(/\S*)", re.IGNORECASE)
+_PATH = re.compile(r"(/[A-Za-z0-9_\-{}./]+)")
+
+Key = Tuple[str, str]  # (METHOD, path template)
+
+
+def _resolve(spec: Dict[str, Any], node: Any) -> Any:
+    """Copy of ``node`` with local ``$ref``s into ``spec`` inlined; cycles are left as refs."""
+
+    def lookup(ref: str) -> Any:
+        target: Any = spec
+        for part in ref.lstrip("#/").split("/"):
+            target = target[part.replace("~1", "/").replace("~0", "~")]
+        return target
+
+    def walk(node: Any, seen: Tuple[str, ...]) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/") and ref not in seen:
+                try:
+                    target = lookup(ref)
+                except (KeyError, TypeError):
+                    return dict(node)
+                return walk(target, seen + (ref,))
+            return {k: walk(v, seen) for k, v in node.items()}
+        if isinstance(node, list):
+            return [walk(v, seen) for v in node]
+        return node
+
+    return walk(node, ())
+
+
+_worker_spec: Dict[str, Any] = {}
+
+
+def _init_worker(spec: Dict[str, Any]) -> None:
+    global _worker_spec
+    _worker_spec = spec
+
+
+def _resolve_items(items: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+    return [(path, _resolve(_worker_spec, item)) for path, item in items]
+
+
+def resolve_refs(spec: Dict[str, Any], workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copy of ``spec`` with local ``$ref``s ("#/components/...") inlined; cycles are left as refs.
+    Specs with PARALLEL_MIN_PATHS or more paths resolve their path items on
+    ``workers`` processes (default: one per CPU); each worker receives the
+    spec once, and paths keep their original order. Workers are spawned, not
+    forked, since ingestion calls this while its embedding threads are running.
+    """
+    paths = spec.get("paths") if isinstance(spec, dict) else None
+    workers = workers or os.cpu_count() or 1
+    if not isinstance(paths, dict) or len(paths) < PARALLEL_MIN_PATHS or workers < 2:
+        return _resolve(spec, spec)
+    out = {k: _resolve(spec, v) for k, v in spec.items() if k != "paths"}
+    items = list(paths.items())
+    size = -(-len(items) // (workers * 4))  # a few chunks per worker to even out large operations
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(spec,)) as pool:
+            resolved = [pair for part in pool.map(_resolve_items, [items[i:i + size] for i in range(0, len(items), size)]) for pair in part]
+    except (OSError, RuntimeError):
+        # No process support (restricted sandbox, frozen app): same result, serially
+        resolved = [(path, _resolve(spec, item)) for path, item in items]
+    out["paths"] = dict(resolved)
+    return out
+
+
+def load_spec(path: str, cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse ``path`` with the C YAML loader and resolve its ``$ref``s, caching the
+    result as a pickle keyed by the file's sha256 (under ``cache_dir``,
+    default OPENAPI_CACHE_DIR or .cache/openapi). An unchanged spec is loaded
+    from the cache without touching YAML; entries for older versions of the
+    same file are removed when a new one is written.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    cache_dir = cache_dir or os.getenv("OPENAPI_CACHE_DIR", DEFAULT_SPEC_CACHE_DIR)
+    owner = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    digest = hashlib.sha256(raw + f"\0v{SPEC_CACHE_VERSION}".encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{owner}-{digest}.pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        pass
+
+    spec = resolve_refs(yaml.load(raw, Loader=YamlLoader) or {})
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+        for old in glob.glob(os.path.join(cache_dir, f"{owner}-*.pickle")):
+            if old != cache_path:
+                os.remove(old)
+    except OSError:
+        pass  # read-only checkout: parse again next time
+    return spec
+
+
+def example_from_schema(schema: Optional[Dict[str, Any]]) -> Any:
+    """Build an example value from a (resolved) schema, preferring declared examples."""
+    if not isinstance(schema, dict):
+        return None
+    if "example" in schema:
+        return copy.deepcopy(schema["example"])
+    if schema.get("enum"):
+        return schema["enum"][0]
+    for combo in ("allOf", "oneOf", "anyOf"):
+        if schema.get(combo):
+            parts = [example_from_schema(s) for s in schema[combo]]
+            if combo == "allOf" and all(isinstance(p, dict) for p in parts):
+                merged: Dict[str, Any] = {}
+                for p in parts:
+                    merged.update(p)
+                return merged
+            return parts[0]
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {name: example_from_schema(sub) for name, sub in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        item = example_from_schema(schema.get("items"))
+        return [item] if item is not None else []
+    return {"string": "string", "integer": 0, "number": 0.0, "boolean": True}.get(kind)
+
+
+def _path_regex(template: str) -> "re.Pattern[str]":
+    parts = re.split(r"(\{[^}/]+\})", template.rstrip("/") or "/")
+    body = "".join("[^/]+" if p.startswith("{") else re.escape(p) for p in parts)
+    return re.compile(f"^{body}/?$")
+
+
+def _body(content: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not content:
+        return None
+    content_type, media = next(iter(content.items()))
+    schema = (media or {}).get("schema")
+    example = (media or {}).get("example")
+    return {
+        "content_type": content_type,
+        "schema": schema,
+        "example": example if example is not None else example_from_schema(schema),
+    }
+
+
+class EndpointIndex:
+    """
+    Precomputed (method, path) -> operation details for an OpenAPI spec, with
+    a keyword index over paths, summaries, descriptions, tags and field names.
+    Lookups are dict hits or a small postings scan -- no embeddings involved.
+    """
+
+    def __init__(self, operations: Dict[Key, Dict[str, Any]], title: str = "", source: str = "", description: str = ""):
+        self.operations = operations
+        self.title = title
+        self.description = description
+        self.source = source
+        self._templates = [(key, _path_regex(key[1])) for key in operations]
+        self._postings: Dict[str, Dict[Key, int]] = defaultdict(dict)
+        for key, op in operations.items():
+            for term in self._terms(op):
+                self._postings[term][key] = self._postings[term].get(key, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], source: str = "", resolved: bool = False) -> "EndpointIndex":
+        spec = (spec or {}) if resolved else resolve_refs(spec or {})
+        operations: Dict[Key, Dict[str, Any]] = {}
+        for path, item in (spec.get("paths") or {}).items():
+            if not isinstance(item, dict):
+                continue
+            shared_params = item.get("parameters") or []
+            for method in HTTP_METHODS:
+                op = item.get(method)
+                if not isinstance(op, dict):
+                    continue
+                params = {(p.get("in"), p.get("name")): p for p in shared_params + (op.get("parameters") or [])}
+                request = op.get("requestBody") or {}
+                request_body = _body(request.get("content"))
+                if request_body is not None:
+                    request_body["required"] = bool(request.get("required"))
+                    request_body["required_fields"] = list((request_body["schema"] or {}).get("required") or [])
+                operations[(method.upper(), path)] = {
+                    "method": method.upper(),
+                    "path": path,
+                    "operation_id": op.get("operationId", ""),
+                    "summary": op.get("summary", ""),
+                    "description": op.get("description", ""),
+                    "tags": list(op.get("tags") or []),
+                    "parameters": [
+                        {
+                            "name": p.get("name"),
+                            "in": p.get("in"),
+                            "required": bool(p.get("required")),
+                            "schema": p.get("schema"),
+                            "description": p.get("description", ""),
+                        }
+                        for p in params.values()
+                    ],
+                    "request_body": request_body,
+                    "responses": {
+                        str(code): {"description": (resp or {}).get("description", ""), **(_body((resp or {}).get("content")) or {})}
+                        for code, resp in (op.get("responses") or {}).items()
+                    },
+                }
+        info = spec.get("info") or {}
+        return cls(operations, title=info.get("title", ""), source=source, description=info.get("description", ""))
+
+    @classmethod
+    def from_file(cls, path: str, source: str = "openapi.yaml", cache_dir: Optional[str] = None) -> "EndpointIndex":
+        return cls.from_spec(load_spec(path, cache_dir), source=source, resolved=True)
+
+    @staticmethod
+    def _terms(op: Dict[str, Any]) -> List[str]:
+        fields = [op["path"], op["operation_id"], op["summary"], op["description"], " ".join(op["tags"])]
+        fields += [p["name"] or "" for p in op["parameters"]]
+        body = op.get("request_body") or {}
+        fields += list(((body.get("schema") or {}).get("properties") or {}).keys())
+        return tokenize(" ".join(fields))
+
+    def get(self, method: str, path: str) -> Optional[Dict[str, Any]]:
+        """Exact operation for a method and a path template or concrete path."""
+        method = method.upper()
+        op = self.operations.get((method, path))
+        if op is not None:
+            return op
+        for key, pattern in self._templates:
+            if key[0] == method and pattern.match(path.split("?")[0].rstrip(".,;:)")):
+                return self.operations[key]
+        return None
+
+    def _match_path(self, path: str) -> List[Key]:
+        path = path.split("?")[0].rstrip(".,;:)")
+        return [key for key, pattern in self._templates if key[1] == path or pattern.match(path)]
+
+    def lookup(self, query: str, limit: int = 3, min_score: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Best operations for a free-text query. An explicit "METHOD /path" or a
+        bare path wins outright; otherwise operations are ranked by keyword
+        overlap (rarer terms weigh more) plus a bonus for implied methods.
+        Each result is {"endpoint", "match", "score", "operation"}; score is None
+        for exact and path matches.
+        """
+        explicit = _EXPLICIT.search(query or "")
+        if explicit:
+            op = self.get(explicit.group(1), explicit.group(2))
+            if op is not None:
+                return [self._result(op, "exact", None)]
+        words = set(re.findall(r"[a-z]+", (query or "").lower()))
+        implied = {m.upper() for m, hints in METHOD_HINTS.items() if words & set(hints)}
+        for candidate in _PATH.findall(query or ""):
+            keys = self._match_path(candidate)
+            if keys:
+                keys.sort(key=lambda key: key[0] not in implied)
+                return [self._result(self.operations[key], "path", None) for key in keys[:limit]]
+
+        scores: Dict[Key, float] = defaultdict(float)
+        for term in set(tokenize(query or "")):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            weight = 1.0 / len(postings)
+            for key in postings:
+                scores[key] += weight
+        for key in scores:
+            if key[0] in implied:
+                scores[key] += 0.5
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [
+            self._result(self.operations[key], "keywords", round(score, 3))
+            for key, score in ranked[:limit]
+            if score >= min_score
+        ]
+
+    def _result(self, op: Dict[str, Any], match: str, score: Optional[float]) -> Dict[str, Any]:
+        return {"endpoint": f"{op['method']} {op['path']}", "match": match, "score": score, "operation": op}
+
+    @staticmethod
+    def render(op: Dict[str, Any]) -> str:
+        """Compact text form of one operation (for prompts and chat answers)."""
+        lines = [f"{op['method']} {op['path']} -- {op['summary']}".rstrip(" -")]
+        if op.get("description"):
+            lines.append(op["description"])
+        if op.get("tags"):
+            lines.append(f"Tags: {', '.join(op['tags'])}")
+        for p in op.get("parameters") or []:
+            req = "required" if p["required"] else "optional"
+            lines.append(f"Parameter {p['name']} ({p['in']}, {req}): {p.get('description') or ''}".rstrip(": "))
+        body = op.get("request_body")
+        if body:
+            fields = ", ".join(body.get("required_fields") or []) or "none"
+            lines.append(f"Request body ({body['content_type']}; required fields: {fields}):")
+            lines.append(json.dumps(body.get("example"), indent=2))
+        for code, resp in (op.get("responses") or {}).items():
+            lines.append(f"Response {code}: {resp.get('description', '')}")
+            if resp.get("example") is not None:
+                lines.append(json.dumps(resp["example"], indent=2))
+        return "\n".join(lines)
@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# Stages in pipeline order (reports list them in this order)
+STAGES = ("load", "yaml_parse", "split", "embed", "upsert")
+# Rough tokens per character for embedding-size estimates (English prose / code)
+CHARS_PER_TOKEN = 4.0
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB (None where ``resource`` is unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+class StageProfiler:
+    """
+    Thread-safe per-stage timers and counters for one ingestion run. Stages of
+    a streamed pipeline interleave (and embedding runs on several threads), so
+    stage times are cumulative busy time and can add up to more than the wall
+    time. A disabled profiler records nothing and costs one branch per call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.seconds[name] += elapsed
+                self.calls[name] += 1
+
+    def stage(self, name: str):
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counts[name] += n
+
+    def report(self, **context: Any) -> Dict[str, Any]:
+        wall = time.perf_counter() - self.started
+        stages = {
+            name: {"seconds": round(self.seconds.get(name, 0.0), 4), "calls": self.calls.get(name, 0)}
+            for name in list(STAGES) + sorted(set(self.seconds) - set(STAGES))
+        }
+        counts = dict(self.counts)
+        for prefix in ("", "embedded_"):
+            chars = counts.get(f"{prefix}chars", 0)
+            counts[f"{prefix}est_tokens"] = int(round(chars / CHARS_PER_TOKEN))
+        embed_s = self.seconds.get("embed", 0.0)
+        return {
+            "started_at": self.started_at,
+            **context,
+            "wall_seconds": round(wall, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+            "counts": counts,
+            "throughput": {
+                "chunks_per_s": round(counts.get("chunks", 0) / wall, 2) if wall else None,
+                "embedded_tokens_per_embed_s": round(counts["embedded_est_tokens"] / embed_s, 1) if embed_s else None,
+            },
+        }
+
+
+def render_markdown(report: Dict[str, Any]) -> str:
+    lines = [f"# Ingestion profile ({report['started_at']})", ""]
+    for key in ("embedding_provider", "index_dir", "apis"):
+        if report.get(key):
+            lines.append(f"- {key}: `{report[key]}`")
+    lines += [f"- wall time: {report['wall_seconds']:.2f} s", f"- peak RSS: {report['peak_rss_mb']} MiB", ""]
+    lines += ["| stage | seconds | calls | share of wall |", "|---|---:|---:|---:|"]
+    wall = report["wall_seconds"] or 1.0
+    for name, stage in report["stages"].items():
+        lines.append(f"| {name} | {stage['seconds']:.3f} | {stage['calls']} | {stage['seconds'] / wall:.0%} |")
+    lines += ["", "Stage times are cumulative busy time; streamed stages overlap and embedding runs in parallel.", ""]
+    lines += ["| count | value |", "|---|---:|"]
+    lines += [f"| {name} | {value} |" for name, value in sorted(report["counts"].items())]
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report: Dict[str, Any], runs_dir: str) -> List[str]:
+    """Write ``ingest_profile_<utc>.json`` and ``.md`` under ``runs_dir``; returns both paths."""
+    os.makedirs(runs_dir, exist_ok=True)
+    stem = os.path.join(runs_dir, f"ingest_profile_{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}")
+    with open(f"{stem}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(f"{stem}.md", "w", encoding="utf-8") as f:
+        f.write(render_markdown(report))
+    return [f"{stem}.json", f"{stem}.md"]
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper that books every call under the ``embed`` stage of ``profiler``."""
+
+    def __init__(self, inner: Embeddings, profiler: StageProfiler):
+        self.inner = inner
+        self.profiler = profiler
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.profiler.stage("embed"):
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.profiler.stage("embed"):
+            return self.inner.embed_query(text)
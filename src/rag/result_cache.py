@@ -0,0 +1,135 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .embedding_cache import normalize_text
+
+GENERATION_FILE = "index_generation"
+
+
+def read_generation(index_dir: str) -> int:
+    """Return the index generation stored alongside the vector store (0 if never written)."""
+    try:
+        with open(os.path.join(index_dir, GENERATION_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation(index_dir: str) -> int:
+    """Increment the generation counter atomically; called after every index write."""
+    os.makedirs(index_dir, exist_ok=True)
+    gen = read_generation(index_dir) + 1
+    path = os.path.join(index_dir, GENERATION_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(gen))
+    os.replace(tmp, path)
+    return gen
+
+
+def _approx_chars(value: List[Dict[str, Any]]) -> int:
+    return sum(len(str(item.get("page_content") or "")) + len(str(item.get("metadata") or "")) for item in value)
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache for formatted retrieval results.
+    Entries are dropped whenever the index generation on disk changes, so a
+    re-ingest in any process invalidates every worker's cache.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        max_entries: int = 256,
+        ttl_seconds: float = 600.0,
+        max_chars: int = 2_000_000,
+    ):
+        self.index_dir = index_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self._gen_stamp: Optional[Tuple[int, int, int]] = None
+        self.generation = read_generation(index_dir)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, k: int, api_hint: str = "") -> Tuple[str, int, str]:
+        return normalize_text(query), int(k), (api_hint or "").strip().lower()
+
+    def _check_generation(self) -> None:
+        # stat() is cheap; only re-read the counter when the file changed.
+        # bump_generation() replaces the file, so the inode changes on every write.
+        try:
+            st = os.stat(os.path.join(self.index_dir, GENERATION_FILE))
+            stamp: Optional[Tuple[int, int, int]] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._gen_stamp:
+            return
+        self._gen_stamp = stamp
+        gen = read_generation(self.index_dir)
+        if gen != self.generation:
+            self.generation = gen
+            self._entries.clear()
+            self._chars = 0
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._chars -= entry[1]
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+    def put(self, key: Hashable, value: List[Dict[str, Any]], generation: Optional[int] = None) -> None:
+        """
+        ``generation`` is the index generation the results were computed on.
+        Results from an older generation (a search that ran on the previous
+        store before this process swapped to the new one) are not cached.
+        """
+        size = _approx_chars(value)
+        if size > self.max_chars:
+            return
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self.generation:
+                return
+            self._drop(key)
+            self._entries[key] = (time.monotonic(), size, copy.deepcopy(value))
+            self._chars += size
+            while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
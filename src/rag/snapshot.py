@@ -0,0 +1,128 @@
+import glob
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .numpy_index import NumpyIndex, PackedColumn
+from .result_cache import read_generation
+
+SNAPSHOT_FILE = "snapshot.json"
+# Per-chunk columns packed into texts-<generation>.npy; row k of offsets-<generation>.npy indexes column k
+COLUMNS = ("ids", "documents", "metadatas")
+_FILE_PREFIXES = ("vectors", "texts", "offsets")
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _pack(index: NumpyIndex) -> Tuple[np.ndarray, np.ndarray]:
+    """Every column's UTF-8 rows in one byte array, plus (len(COLUMNS), count + 1) absolute offsets."""
+    rows = [
+        [str(i).encode("utf-8") for i in index.ids],
+        [d.encode("utf-8") for d in index.documents],
+        [json.dumps(m, ensure_ascii=False).encode("utf-8") for m in index.metadatas],
+    ]
+    offsets = np.zeros((len(COLUMNS), len(index) + 1), dtype=np.int64)
+    start = 0
+    for k, column in enumerate(rows):
+        offsets[k, 0] = start
+        offsets[k, 1:] = start + np.cumsum([len(r) for r in column], dtype=np.int64)
+        start = int(offsets[k, -1])
+    blob = np.frombuffer(b"".join(r for column in rows for r in column), dtype=np.uint8)
+    return blob, offsets
+
+
+def export_snapshot(index: NumpyIndex, index_dir: str, generation: Optional[int] = None) -> str:
+    """
+    Write the index as ``vectors-<generation>.npy`` (unit float32 rows), its
+    ids, texts and metadata packed into ``texts-<generation>.npy`` (one byte
+    array) with ``offsets-<generation>.npy``, and a small ``snapshot.json``
+    manifest naming them. The manifest is replaced last and atomically, so
+    readers always see a matching set; older files are removed afterwards
+    (open mappings keep working on POSIX).
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    gen = read_generation(index_dir) if generation is None else generation
+    names = {prefix: f"{prefix}-{gen}.npy" for prefix in _FILE_PREFIXES}
+    blob, offsets = _pack(index)
+    _save_npy(os.path.join(index_dir, names["vectors"]), np.ascontiguousarray(index.matrix, dtype=np.float32))
+    _save_npy(os.path.join(index_dir, names["texts"]), blob)
+    _save_npy(os.path.join(index_dir, names["offsets"]), offsets)
+
+    manifest = {
+        "generation": gen,
+        **names,
+        "count": len(index),
+        "dim": int(index.matrix.shape[1]) if len(index) else 0,
+    }
+    path = os.path.join(index_dir, SNAPSHOT_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+    for prefix in _FILE_PREFIXES:
+        for old in glob.glob(os.path.join(index_dir, f"{prefix}-*.npy")):
+            if os.path.basename(old) != names[prefix]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass  # still mapped by a reader on Windows; removed by the next export
+    return path
+
+
+def _read_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(index_dir, SNAPSHOT_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Snapshots from before the packed layout kept the texts in the manifest: treat as missing so they are rewritten
+    return manifest if "offsets" in manifest else None
+
+
+def snapshot_info(index_dir: str) -> Optional[Dict[str, Any]]:
+    """Manifest header (generation, count, dim) without the document payload."""
+    manifest = _read_manifest(index_dir)
+    if manifest is None:
+        return None
+    return {k: manifest.get(k) for k in ("generation", "vectors", "count", "dim")}
+
+
+def load_snapshot(
+    index_dir: str,
+    embedding_function: Optional[Embeddings] = None,
+    allow_stale: bool = False,
+) -> Optional[NumpyIndex]:
+    """
+    Open the snapshot read-only with ``np.load(mmap_mode="r")``: the vectors,
+    texts and metadata stay in the OS page cache, shared by every worker
+    process, and a chunk's text is only decoded when a search returns it.
+    Returns None if there is no snapshot or it is older than the index generation.
+    """
+    manifest = _read_manifest(index_dir)
+    if manifest is None:
+        return None
+    if not allow_stale and manifest.get("generation") != read_generation(index_dir):
+        return None
+    vectors = np.load(os.path.join(index_dir, manifest["vectors"]), mmap_mode="r")
+    if vectors.shape[0] != manifest["count"]:
+        raise ValueError(f"Snapshot {manifest['vectors']} has {vectors.shape[0]} rows, manifest says {manifest['count']}")
+    blob = np.load(os.path.join(index_dir, manifest["texts"]), mmap_mode="r")
+    offsets = np.load(os.path.join(index_dir, manifest["offsets"]), mmap_mode="r")
+    columns = {name: PackedColumn(blob, offsets[k], as_json=name == "metadatas") for k, name in enumerate(COLUMNS)}
+    return NumpyIndex(
+        vectors,
+        columns["documents"],
+        columns["metadatas"],
+        ids=columns["ids"],
+        embedding_function=embedding_function,
+        normalized=True,
+    )
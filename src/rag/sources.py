@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from typing import Any, List, Tuple
+
+# Same keywords the router uses to send queries to the secondary API
+SECONDARY_KEYWORDS = ("schedul", "calendar", "timeline", "deadline")
+
+
+def source_name(source: str) -> str:
+    """File name of a chunk source, tolerant of Windows-style paths in older indexes."""
+    return os.path.basename(str(source or "").replace("\\", "/"))
+
+
+def infer_api(source: str) -> str:
+    """Map a documentation source to the registry name of the API it describes."""
+    name = source_name(source).lower()
+    if any(k in name for k in SECONDARY_KEYWORDS):
+        return os.getenv("SECONDARY_API_NAME", "scheduler").lower()
+    return os.getenv("PRIMARY_API_NAME", "contech").lower()
+
+
+def known_apis() -> List[str]:
+    """Registry names of every API a chunk can be tagged with (primary first)."""
+    return [os.getenv("PRIMARY_API_NAME", "contech").lower(), os.getenv("SECONDARY_API_NAME", "scheduler").lower()]
+
+
+def content_key(doc: Any) -> Tuple[str, str]:
+    """Identity of a chunk across retrievers: (source, text)."""
+    meta = doc.metadata if isinstance(doc.metadata, dict) else {}
+    return str(meta.get("source") or ""), doc.page_content
+
+
+def chunk_id(doc: Any, chunker_config: str = "") -> str:
+    """
+    Stable chunk id: sha256 of source, chunker config, metadata and text.
+    Re-ingesting an unchanged chunk yields the same id, so it can be skipped.
+    """
+    meta = dict(doc.metadata) if isinstance(doc.metadata, dict) else {}
+    source = str(meta.pop("source", "") or "")
+    h = hashlib.sha256()
+    for part in (source, chunker_config, json.dumps(meta, sort_keys=True, default=str), doc.page_content):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def top_up_by_api(
+    filtered: List[Tuple[Any, float]],
+    candidates: List[Tuple[Any, float]],
+    api: str,
+    k: int,
+) -> List[Tuple[Any, float]]:
+    """
+    Fill a metadata-filtered result list up to ``k`` from an over-fetched,
+    unfiltered candidate list. Chunks from indexes built before API tagging
+    are matched by inferring the API from their source.
+    """
+    api = (api or "").lower()
+    out = list(filtered[:k])
+    seen = {content_key(doc) for doc, _ in out}
+    for doc, score in candidates:
+        if len(out) >= k:
+            break
+        key = content_key(doc)
+        if key in seen:
+            continue
+        meta = doc.metadata if isinstance(doc.metadata, dict) else {}
+        tag = str(meta.get("api") or infer_api(meta.get("source", ""))).lower()
+        if tag == api:
+            out.append((doc, score))
+            seen.add(key)
+    return out
@@ -0,0 +1,178 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# One Chroma collection per API ("api_contech", "api_scheduler"); "langchain" is the pre-split layout
+API_COLLECTION_PREFIX = "api_"
+LEGACY_COLLECTION = "langchain"
+# Names the subdirectory holding the live Chroma database; compaction publishes a fresh one through it
+CHROMA_DIR_FILE = "chroma_dir"
+
+
+def api_collection_name(api: str) -> str:
+    return f"{API_COLLECTION_PREFIX}{api.lower()}"
+
+
+def chroma_dir(index_dir: str) -> str:
+    """
+    Directory of the live Chroma database for an index: the index directory
+    itself, or the subdirectory the last compaction published. The generation,
+    BM25 index, snapshot and locks always stay in ``index_dir``.
+    """
+    try:
+        with open(os.path.join(index_dir, CHROMA_DIR_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return index_dir
+    return os.path.join(index_dir, name) if name else index_dir
+
+
+def set_chroma_dir(index_dir: str, name: str) -> None:
+    """Point ``index_dir`` at the Chroma database in its subdirectory ``name`` (atomic replace)."""
+    path = os.path.join(index_dir, CHROMA_DIR_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, path)
+
+
+def list_collections(persist_dir: str) -> List[str]:
+    """Names of the collections in an index's Chroma database (empty if there is none)."""
+    import chromadb
+
+    try:
+        client = chromadb.PersistentClient(path=chroma_dir(persist_dir))
+        return sorted(getattr(c, "name", c) for c in client.list_collections())
+    except Exception:
+        return []
+
+
+def search_by_vectors(
+    store: Any,
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    where: Optional[Dict[str, Any]] = None,
+    with_embeddings: bool = False,
+) -> List[List[Tuple[Any, ...]]]:
+    """
+    Run one vector lookup for a batch of query vectors and return
+    (Document, distance) lists aligned with ``vectors`` -- or
+    (Document, distance, embedding) when ``with_embeddings`` is set, so
+    re-ranking can reuse the stored chunk vectors. Uses the store's native
+    batch path: a single matmul for NumpyIndex, a single ``collection.query``
+    for Chroma.
+    """
+    if not vectors:
+        return []
+    batch = getattr(store, "similarity_search_by_vectors", None)
+    if batch is not None:
+        return batch(vectors, k=k, filter=where, with_embeddings=with_embeddings)
+    collection = getattr(store, "_collection", None)
+    if collection is None:
+        hits = [store.similarity_search_by_vector_with_relevance_scores(v, k=k, filter=where) for v in vectors]
+        return [[(doc, dist, None) for doc, dist in row] for row in hits] if with_embeddings else hits
+    include = ["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else [])
+    res = collection.query(
+        query_embeddings=[list(v) for v in vectors],
+        n_results=k,
+        where=where or None,
+        include=include,
+    )
+    embeddings = res.get("embeddings") if with_embeddings else None
+    out: List[List[Tuple[Any, ...]]] = []
+    for q, (ids, docs, metas, dists) in enumerate(zip(res["ids"], res["documents"], res["metadatas"], res["distances"])):
+        row: List[Tuple[Any, ...]] = []
+        for j, (_id, doc, meta, dist) in enumerate(zip(ids, docs, metas, dists)):
+            hit = (Document(page_content=doc or "", metadata=meta or {}, id=_id), float(dist))
+            if with_embeddings:
+                hit += (embeddings[q][j] if embeddings is not None else None,)
+            row.append(hit)
+        out.append(row)
+    return out
+
+
+class ApiCollections:
+    """
+    Routes vector queries to one store per API. A query filtered on a single
+    ``api`` value touches only that API's vectors; anything else fans out to
+    every store and merges hits by distance (all share one embedding space).
+    Exposes the subset of the VectorStore surface the search code uses.
+    """
+
+    def __init__(self, stores: Dict[str, Any]):
+        if not stores:
+            raise ValueError("ApiCollections needs at least one store")
+        self.stores = dict(stores)
+
+    def __len__(self) -> int:
+        return sum(len(s) if hasattr(s, "__len__") else s._collection.count() for s in self.stores.values())
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return getattr(next(iter(self.stores.values())), "embeddings", None)
+
+    def map(self, fn: Callable[[Any], Any]) -> "ApiCollections":
+        """Same routing over transformed stores (e.g. NumpyIndex.from_chroma per API)."""
+        return ApiCollections({api: fn(store) for api, store in self.stores.items()})
+
+    def _select_relevance_score_fn(self):
+        return next(iter(self.stores.values()))._select_relevance_score_fn()
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        with_embeddings: bool = False,
+    ) -> List[List[Tuple[Any, ...]]]:
+        api = filter.get("api") if filter and set(filter) == {"api"} else None
+        if isinstance(api, str) and api.lower() in self.stores:
+            # The collection is the filter: no where clause, no other API's vectors
+            return search_by_vectors(self.stores[api.lower()], embeddings, k, None, with_embeddings)
+        merged: List[List[Tuple[Any, ...]]] = [[] for _ in embeddings]
+        for store in self.stores.values():
+            for row, hits in zip(merged, search_by_vectors(store, embeddings, k, filter, with_embeddings)):
+                row.extend(hits)
+        return [sorted(row, key=lambda hit: hit[1])[:k] for row in merged]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: Sequence[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def get(self, include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        include = include or ["documents", "metadatas"]
+        out: Dict[str, Any] = {"ids": []}
+        for field in include:
+            out[field] = []
+        for store in self.stores.values():
+            data = store.get(include=include, **kwargs)
+            out["ids"].extend(data.get("ids") or [])
+            for field in include:
+                values = data.get(field)
+                if values is not None:
+                    out[field].extend(list(values))
+        return out
+
+
+def open_collections(persist_dir: str, embedding_function: Optional[Embeddings] = None) -> Any:
+    """
+    Open the index in ``persist_dir``: an ApiCollections over the per-API
+    collections, or the single legacy collection for indexes built before the split.
+    """
+    try:
+        from langchain_chroma import Chroma
+    except ImportError:
+        from langchain_community.vectorstores import Chroma
+
+    path = chroma_dir(persist_dir)
+    names = list_collections(persist_dir)
+    apis = [n[len(API_COLLECTION_PREFIX):] for n in names if n.startswith(API_COLLECTION_PREFIX)]
+    if not apis:
+        return Chroma(persist_directory=path, embedding_function=embedding_function)
+    return ApiCollections({
+        api: Chroma(collection_name=api_collection_name(api), persist_directory=path, embedding_function=embedding_function)
+        for api in apis
+    })
@@ -0,0 +1,153 @@
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "ratelimit.sqlite3"))
+
+# (window_start, previous window count, current window count)
+Counter = Tuple[float, int, int]
+
+
+def slide(state: Optional[Counter], limit: int, window: float, now: float) -> Tuple[bool, float, Counter]:
+    """
+    One sliding-window-counter step: the previous fixed window's count is
+    weighted by how much of it still overlaps the sliding window. O(1) time and
+    space per key, accurate to within one window boundary. Returns
+    (allowed, retry_after_seconds, new_state); a denied hit is not counted.
+    """
+    start = math.floor(now / window) * window
+    if state is None:
+        prev, curr = 0, 0
+    else:
+        s, p, c = state
+        if s == start:
+            prev, curr = p, c
+        elif s == start - window:
+            prev, curr = c, 0
+        else:
+            prev, curr = 0, 0
+    weight = 1.0 - (now - start) / window
+    if prev * weight + curr + 1 > limit:
+        # Earliest time the estimate drops below the limit: later in this window, else the next one
+        if curr < limit and prev:
+            wait = (start + window * (1.0 - (limit - curr - 1) / prev)) - now
+        else:
+            wait = start + window - now
+        return False, max(wait, 0.001), (start, prev, curr)
+    return True, 0.0, (start, prev, curr + 1)
+
+
+class MemoryBackend:
+    """
+    Per-process counters in an OrderedDict kept in last-use order, so idle
+    keys are evicted from the front in O(1) amortised time per hit.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counters: "OrderedDict[str, Tuple[Counter, float]]" = OrderedDict()  # key -> (state, expires)
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            entry = self._counters.pop(key, None)
+            allowed, retry_after, state = slide(entry[0] if entry else None, limit, window, now)
+            # After two idle windows the counter is all zeros again, so the key can go
+            self._counters[key] = (state, now + 2 * window)
+            while self._counters:
+                oldest_key, (_, expires) = next(iter(self._counters.items()))
+                if expires > now and len(self._counters) <= self.max_keys:
+                    break
+                del self._counters[oldest_key]
+            return allowed, retry_after
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class SQLiteBackend:
+    """
+    Counters in a shared SQLite file (WAL), so every worker process on the box
+    enforces the same limit. Each hit is one short IMMEDIATE transaction on a
+    primary-key row; expired rows are deleted every ``cleanup_every`` hits.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, cleanup_every: int = 1000):
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        # Shared by every thread (connections are per thread); next() on a count is atomic
+        self._hits = itertools.count(1)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_start REAL, prev INTEGER, curr INTEGER, expires REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_expires ON rate_limits (expires)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT window_start, prev, curr FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            allowed, retry_after, (start, prev, curr) = slide(tuple(row) if row else None, limit, window, now)
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_start, prev, curr, expires) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start, prev = excluded.prev, "
+                "curr = excluded.curr, expires = excluded.expires",
+                (key, start, prev, curr, now + 2 * window),
+            )
+            if next(self._hits) % self.cleanup_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires < ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Sliding-window-counter limits over a pluggable backend (``memory`` or ``sqlite``)."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        # memory (default, per process) | sqlite (shared by all workers on the box)
+        kind = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+        if kind == "sqlite":
+            return cls(SQLiteBackend(os.getenv("RATE_LIMIT_DB", DEFAULT_DB_PATH)))
+        return cls(MemoryBackend(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))))
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Count one request for ``key``; returns (allowed, seconds until the next one would be)."""
+        allowed, retry_after = self.backend.hit(key, limit, window, time.time() if now is None else now)
+        if not allowed:
+            with self._lock:
+                self.denied += 1
+        return allowed, retry_after
+
+    def stats(self) -> Dict[str, object]:
+        return {"backend": type(self.backend).__name__, "keys": len(self.backend), "denied": self.denied}
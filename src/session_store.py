@@ -1,51 +1,339 @@
+import json
 import os
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
 
-ChatTurn = Dict[str, object]  # role: str, text: str, meta: dict
+ChatTurn = Dict[str, object]  # role: str, text: str, meta: dict, html: rendered bubble (optional)
 
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "sessions.sqlite3"))
+
+
+class SessionBackend(ABC):
+    """
+    Storage for chat transcripts. ``append`` adds one turn (keeping the last
+    ``max_turns``), ``get`` returns the transcript and marks the session as
+    used, ``reset`` drops it. Sessions idle longer than ``ttl_seconds`` and the
+    least recently used beyond ``max_sessions`` are removed.
+    """
 
-class SessionStore:
     def __init__(self, max_turns: int = 30, max_sessions: int = 500, ttl_seconds: int = 86400):
         self.max_turns = max_turns
         self.max_sessions = max_sessions
         self.ttl_seconds = ttl_seconds
-        self._store: Dict[str, Dict[str, object]] = {}  # sid -> {turns: List[ChatTurn], at: float}
 
-    def _prune(self) -> None:
+    @abstractmethod
+    def append(self, session_id: str, turn: ChatTurn) -> List[ChatTurn]:
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[ChatTurn]:
+        ...
+
+    @abstractmethod
+    def reset(self, session_id: str) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    """
+    Per-process sessions (the default): fast, but lost on restart and not
+    shared between workers. Sessions sit in an OrderedDict in last-use order;
+    since every session has the same TTL, that is also expiry order, so both
+    TTL and LRU eviction only ever pop from the front: O(1) amortised per
+    append, get and reset, with no scan or sort.
+    """
+
+    def __init__(self, max_turns: int = 30, max_sessions: int = 500, ttl_seconds: int = 86400):
+        super().__init__(max_turns, max_sessions, ttl_seconds)
+        self._lock = threading.Lock()
+        # sid -> (turns, last use on the monotonic clock, so wall-clock jumps cannot reorder)
+        self._store: "OrderedDict[str, Tuple[Deque[ChatTurn], float]]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        while self._store:
+            _, at = next(iter(self._store.values()))
+            if now - at <= self.ttl_seconds and len(self._store) <= self.max_sessions:
+                break
+            self._store.popitem(last=False)
+
+    def append(self, session_id: str, turn: ChatTurn) -> List[ChatTurn]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            rec = self._store.pop(session_id, None)
+            turns = rec[0] if rec is not None else deque(maxlen=self.max_turns)
+            turns.append(turn)
+            self._store[session_id] = (turns, now)
+            self._evict(now)
+            return list(turns)
+
+    def get(self, session_id: str) -> List[ChatTurn]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            rec = self._store.get(session_id)
+            if rec is None:
+                return []
+            self._store[session_id] = (rec[0], now)
+            self._store.move_to_end(session_id)
+            return list(rec[0])
+
+    def reset(self, session_id: str) -> None:
+        with self._lock:
+            self._store.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    Transcripts in one SQLite file in WAL mode, shared by every worker process
+    on the box and kept across restarts. Readers never block each other or the
+    writer: each thread has its own connection. Writes are queued and applied
+    by one background thread in a single transaction every ``flush_interval``
+    seconds. Reads overlay this process's not-yet-written operations, so a
+    turn shows up in the very next ``get``. The same thread deletes expired and
+    surplus sessions every ``cleanup_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        max_turns: int = 30,
+        max_sessions: int = 500,
+        ttl_seconds: int = 86400,
+        flush_interval: float = 0.05,
+        cleanup_interval: float = 60.0,
+    ):
+        super().__init__(max_turns, max_sessions, ttl_seconds)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # sid -> ordered ops not yet committed: ("turn", tid, turn) | ("reset",) | ("touch", at)
+        self._pending: Dict[str, List[Tuple]] = {}
+        self._inflight: Dict[str, List[Tuple]] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.flushes = 0
+        self.last_error = ""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS sessions_at ON sessions (at);
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sid TEXT NOT NULL,
+                tid TEXT NOT NULL,
+                role TEXT,
+                text TEXT,
+                meta TEXT,
+                html TEXT
+            );
+            CREATE INDEX IF NOT EXISTS turns_sid ON turns (sid, id);
+            """
+        )
+        if "html" not in {row[1] for row in conn.execute("PRAGMA table_info(turns)")}:
+            conn.execute("ALTER TABLE turns ADD COLUMN html TEXT")
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- writes (queued) ------------------------------------------------------
+    def _queue(self, session_id: str, op: Tuple) -> None:
+        with self._lock:
+            self._pending.setdefault(session_id, []).append(op)
+        self._wake.set()
+
+    def append(self, session_id: str, turn: ChatTurn) -> List[ChatTurn]:
+        self._queue(session_id, ("turn", uuid4().hex, turn))
+        return self.get(session_id, touch=False)
+
+    def reset(self, session_id: str) -> None:
+        self._queue(session_id, ("reset",))
+
+    def flush(self) -> None:
+        """Write every queued operation now (one transaction)."""
+        with self._lock:
+            if not self._pending:
+                return
+            self._inflight, self._pending = self._pending, {}
+            batch = self._inflight
+        conn = self._conn()
         now = time.time()
-        # TTL prune
-        for sid in list(self._store.keys()):
-            at = self._store[sid].get("at", 0)  # type: ignore
-            if now - float(at) > self.ttl_seconds:
-                self._store.pop(sid, None)
-        # Size prune (LRU)
-        if len(self._store) > self.max_sessions:
-            items = sorted(self._store.items(), key=lambda kv: kv[1].get("at", 0))
-            for sid, _ in items[: max(0, len(self._store) - self.max_sessions)]:
-                self._store.pop(sid, None)
-
-    def append(self, session_id: str, role: str, text: str, meta: Optional[Dict] = None) -> List[ChatTurn]:
-        rec = self._store.setdefault(session_id, {"turns": [], "at": time.time()})
-        turns: List[ChatTurn] = rec["turns"]  # type: ignore
-        turns.append({"role": role, "text": text, "meta": meta or {}})
-        if len(turns) > self.max_turns:
-            del turns[0 : len(turns) - self.max_turns]
-        rec["at"] = time.time()
-        self._prune()
-        return list(turns)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sid, ops in batch.items():
+                row = conn.execute("SELECT at FROM sessions WHERE sid = ?", (sid,)).fetchone()
+                if row is not None and now - row[0] > self.ttl_seconds:
+                    # Expired but not cleaned up yet: start over rather than revive old turns
+                    conn.execute("DELETE FROM turns WHERE sid = ?", (sid,))
+                for op in ops:
+                    if op[0] == "reset":
+                        conn.execute("DELETE FROM turns WHERE sid = ?", (sid,))
+                        conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+                    elif op[0] == "turn":
+                        turn = op[2]
+                        conn.execute(
+                            "INSERT INTO turns (sid, tid, role, text, meta, html) VALUES (?, ?, ?, ?, ?, ?)",
+                            (sid, op[1], turn.get("role"), turn.get("text"), json.dumps(turn.get("meta") or {}, default=str),
+                             turn.get("html")),
+                        )
+                if any(op[0] in ("turn", "touch") for op in ops):
+                    at = max([now] + [op[1] for op in ops if op[0] == "touch"])
+                    conn.execute(
+                        "INSERT INTO sessions (sid, at) VALUES (?, ?) ON CONFLICT(sid) DO UPDATE SET at = excluded.at",
+                        (sid, at),
+                    )
+                if any(op[0] == "turn" for op in ops):
+                    conn.execute(
+                        "DELETE FROM turns WHERE sid = ? AND id NOT IN "
+                        "(SELECT id FROM turns WHERE sid = ? ORDER BY id DESC LIMIT ?)",
+                        (sid, sid, self.max_turns),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            with self._lock:
+                # Keep the batch for the next attempt, ahead of anything queued since
+                for sid, ops in batch.items():
+                    self._pending[sid] = ops + self._pending.get(sid, [])
+                self._inflight = {}
+            raise
+        with self._lock:
+            self._inflight = {}
+        self.flushes += 1
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Delete sessions idle past the TTL and the least recently used beyond max_sessions."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = [r[0] for r in conn.execute("SELECT sid FROM sessions WHERE at < ?", (now - self.ttl_seconds,))]
+            total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - len(stale)
+            if total > self.max_sessions:
+                stale += [r[0] for r in conn.execute(
+                    "SELECT sid FROM sessions WHERE at >= ? ORDER BY at LIMIT ?",
+                    (now - self.ttl_seconds, total - self.max_sessions),
+                )]
+            for sid in stale:
+                conn.execute("DELETE FROM turns WHERE sid = ?", (sid,))
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(stale)
+
+    def _run(self) -> None:
+        next_cleanup = time.monotonic() + self.cleanup_interval
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            # Let a burst of writes accumulate into one transaction
+            self._stop.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= next_cleanup:
+                    next_cleanup = time.monotonic() + self.cleanup_interval
+                    self.cleanup()
+            except Exception as e:
+                self.last_error = str(e)
+
+    # --- reads ----------------------------------------------------------------
+    def get(self, session_id: str, touch: bool = True) -> List[ChatTurn]:
+        # Snapshot the overlay before reading: anything committed in between is de-duplicated by turn id
+        with self._lock:
+            overlay = list(self._inflight.get(session_id, [])) + list(self._pending.get(session_id, []))
+        conn = self._conn()
+        row = conn.execute("SELECT at FROM sessions WHERE sid = ?", (session_id,)).fetchone()
+        turns: List[Tuple[str, ChatTurn]] = []
+        if row is not None and time.time() - row[0] <= self.ttl_seconds:
+            for tid, role, text, meta, html in conn.execute(
+                "SELECT tid, role, text, meta, html FROM turns WHERE sid = ? ORDER BY id", (session_id,)
+            ):
+                turn = {"role": role, "text": text, "meta": json.loads(meta or "{}")}
+                if html is not None:
+                    turn["html"] = html
+                turns.append((tid, turn))
+        seen = {tid for tid, _ in turns}
+        for op in overlay:
+            if op[0] == "reset":
+                turns, seen = [], set()
+            elif op[0] == "turn" and op[1] not in seen:
+                turns.append((op[1], op[2]))
+                seen.add(op[1])
+        if touch and turns:
+            self._queue(session_id, ("touch", time.time()))
+        return [turn for _, turn in turns[-self.max_turns:]]
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+class SessionStore:
+    """Chat transcripts per session id over a pluggable backend (in-memory by default)."""
+
+    def __init__(
+        self,
+        max_turns: int = 30,
+        max_sessions: int = 500,
+        ttl_seconds: int = 86400,
+        backend: Optional[SessionBackend] = None,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend(max_turns, max_sessions, ttl_seconds)
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        max_turns = int(os.getenv("MAX_TURNS", "20"))
+        max_sessions = int(os.getenv("MAX_SESSIONS", "500"))
+        ttl = int(os.getenv("SESSION_TTL_SECONDS", "86400"))
+        # memory (default, per process) | sqlite (shared by all workers on the box, survives restarts)
+        if os.getenv("SESSION_BACKEND", "memory").strip().lower() == "sqlite":
+            path = os.getenv("SESSION_DB", DEFAULT_DB_PATH)
+            return cls(backend=SQLiteBackend(path, max_turns, max_sessions, ttl))
+        return cls(max_turns, max_sessions, ttl)
+
+    def append(
+        self, session_id: str, role: str, text: str, meta: Optional[Dict] = None, html: Optional[str] = None
+    ) -> List[ChatTurn]:
+        turn: ChatTurn = {"role": role, "text": text, "meta": meta or {}}
+        if html is not None:
+            turn["html"] = html  # rendered once by the caller, reused on every full render
+        return self.backend.append(session_id, turn)
 
     def get(self, session_id: str) -> List[ChatTurn]:
-        rec = self._store.get(session_id)
-        if not rec:
-            return []
-        rec["at"] = time.time()
-        return list(rec.get("turns", []))  # type: ignore
+        return self.backend.get(session_id)
 
     def reset(self, session_id: str) -> None:
-        self._store.pop(session_id, None)
-        self._prune()
+        self.backend.reset(session_id)
 
+    def close(self) -> None:
+        self.backend.close()
 
-SESSION_STORE = SessionStore(max_turns=int(os.getenv("MAX_TURNS", "20")))
 
+SESSION_STORE = SessionStore.from_env()
@@ -1,7 +1,8 @@
 import os
+import threading
 import time
 import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from dotenv import load_dotenv
 from langchain.tools import tool
 from datetime import datetime
@@ -29,43 +30,318 @@ try:
 except ImportError:
     from langchain_community.vectorstores import Chroma
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from chromadb.errors import NotFoundError
+from langchain_core.documents import Document
+
+from src.rag import (
+    BM25Index,
+    CachedEmbeddings,
+    EmbeddingProvider,
+    NumpyIndex,
+    ResultCache,
+    read_generation,
+    content_key,
+    get_embedding_provider,
+    mmr_rerank,
+    reciprocal_rank_fusion,
+    top_up_by_api,
+)
+from src.rag.bm25 import BM25_FILE
+from src.rag.openapi_index import EndpointIndex
+from src.rag.snapshot import load_snapshot
+from src.rag.stores import ApiCollections, open_collections, search_by_vectors
 
 # --- Load Environment ---
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=dotenv_path)
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in .env")
-# Ensure nested libs can see the key
-os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+# google (default) | local | hashing -- local providers need no key and no network
+EMBEDDING_PROVIDER_NAME = os.getenv("EMBEDDING_PROVIDER", "google").strip().lower()
 
-# --- Setup Chroma Vector Store ---
-CHROMA_PERSIST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "chroma_db"))
-console.log(f"[bold yellow]Attempting to load ChromaDB from:[/bold yellow] {CHROMA_PERSIST_DIR}")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+if EMBEDDING_PROVIDER_NAME == "google":
+    if not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY not found in .env")
+    # Ensure nested libs can see the key
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-embedding_model: Optional[GoogleGenerativeAIEmbeddings] = None
-vector_store: Optional[Chroma] = None
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+embedding_provider: Optional[EmbeddingProvider] = None
+embedding_model: Optional[CachedEmbeddings] = None
+vector_store: Optional[Union[Chroma, NumpyIndex]] = None
 
 try:
-    embedding_model = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    embedding_provider = get_embedding_provider(EMBEDDING_PROVIDER_NAME)
+    # Cached wrapper: repeated queries skip the embedding round trip
+    embedding_model = embedding_provider.cached()
 except Exception as e:
     console.log(f"[red]❌ Failed to initialize embeddings: {e}[/red]")
 
+# --- Setup Chroma Vector Store (one directory per embedding provider) ---
+CHROMA_PERSIST_DIR = (
+    embedding_provider.index_dir(ROOT_DIR) if embedding_provider else os.path.join(ROOT_DIR, "chroma_db")
+)
+console.log(f"[bold yellow]Attempting to load ChromaDB from:[/bold yellow] {CHROMA_PERSIST_DIR}")
+
+# chroma (default) | numpy: exact search over an in-memory float32 matrix, loaded once from Chroma
+# | mmap: same exact search over the read-only snapshot written by ingestion (pages shared across workers)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").strip().lower()
+
+
+def _open_vector_store() -> Optional[Union[Chroma, NumpyIndex, ApiCollections]]:
+    """Open the configured backend over the current index; used at import and on hot reload."""
+    store: Optional[Union[Chroma, NumpyIndex, ApiCollections]] = None
+    if VECTOR_BACKEND == "mmap":
+        try:
+            store = load_snapshot(CHROMA_PERSIST_DIR, embedding_model)
+            if store is not None:
+                console.log(f"[green]✅ Memory-mapped snapshot opened ({len(store)} chunks).[/green]")
+            else:
+                console.log("[yellow]⚠️ No current snapshot (re-run ingestion); falling back to Chroma.[/yellow]")
+        except Exception as e:
+            console.log(f"[yellow]⚠️ Snapshot unavailable, falling back to Chroma: {e}[/yellow]")
+
+    if store is None:
+        try:
+            # One collection per API (api_hint searches touch only that one); legacy indexes open as a single store
+            store = open_collections(CHROMA_PERSIST_DIR, embedding_model)
+            layout = f"collections: {', '.join(store.stores)}" if isinstance(store, ApiCollections) else "single collection"
+            console.log(f"[green]✅ ChromaDB loaded successfully for RAG tool ({layout}).[/green]")
+        except Exception as e:
+            console.log(f"[red]❌ Failed to load ChromaDB: {e}[/red]")
+            console.log("Please ensure ingestion has been run successfully.")
+            return None
+
+    if VECTOR_BACKEND == "numpy":
+        try:
+            if isinstance(store, ApiCollections):
+                store = store.map(lambda s: NumpyIndex.from_chroma(s, embedding_model))
+            else:
+                store = NumpyIndex.from_chroma(store, embedding_model)
+            console.log(f"[green]✅ NumPy index loaded ({len(store)} chunks).[/green]")
+        except Exception as e:
+            console.log(f"[yellow]⚠️ NumPy index unavailable, staying on Chroma: {e}[/yellow]")
+    return store
+
+
+# Generation of the index the globals below were opened from (see reload_index)
+INDEX_GENERATION = read_generation(CHROMA_PERSIST_DIR)
 if embedding_model is not None:
-    try:
-        vector_store = Chroma(
-            persist_directory=CHROMA_PERSIST_DIR,
-            embedding_function=embedding_model
-        )
-        console.log("[green]✅ ChromaDB loaded successfully for RAG tool.[/green]")
-    except Exception as e:
-        console.log(f"[red]❌ Failed to load ChromaDB: {e}[/red]")
-        console.log("Please ensure ingestion has been run successfully.")
+    vector_store = _open_vector_store()
 else:
     console.log("[red]Embeddings unavailable; RAG tool will be disabled.[/red]")
 
+# Formatted results per (query, k, api_hint); cleared when ingestion bumps the index generation
+RESULT_CACHE = ResultCache(
+    index_dir=CHROMA_PERSIST_DIR,
+    max_entries=int(os.getenv("RAG_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("RAG_CACHE_TTL_SECONDS", "600")),
+)
+
+# Candidates fetched per requested slot when the api filter alone cannot fill k
+RAG_OVERFETCH = max(1, int(os.getenv("RAG_OVERFETCH", "3")))
+# vector | hybrid (BM25 + vector via RRF, lexical-only for confident keyword queries) | lexical
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").strip().lower()
+# MMR re-ranking of the over-fetched candidates: 1.0 = pure relevance; max chunks per source file (0 = no cap)
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+RAG_MAX_PER_SOURCE = int(os.getenv("RAG_MAX_PER_SOURCE", "2"))
+
+
+def _load_bm25(store: Optional[Union[Chroma, NumpyIndex]]) -> Optional[BM25Index]:
+    """Load the BM25 index written by ingestion; rebuild from stored chunks if it is missing."""
+    path = os.path.join(CHROMA_PERSIST_DIR, BM25_FILE)
+    try:
+        if os.path.exists(path):
+            return BM25Index.load(path)
+        if store is not None:
+            # Older index: chunk texts are in Chroma already, no embedding calls needed
+            data = store.get(include=["documents", "metadatas"])
+            return BM25Index.build(zip(data.get("documents") or [], data.get("metadatas") or []))
+    except Exception as e:
+        console.log(f"[yellow]⚠️ BM25 index unavailable: {e}[/yellow]")
+    return None
+
+
+bm25_index: Optional[BM25Index] = _load_bm25(vector_store) if RAG_RETRIEVAL_MODE != "vector" else None
+if bm25_index is not None:
+    console.log(f"[green]✅ BM25 index ready ({len(bm25_index)} chunks, mode={RAG_RETRIEVAL_MODE}).[/green]")
+
+# Guards the swap of vector_store/bm25_index; held only for the assignment, never during a search
+_INDEX_LOCK = threading.Lock()
+
+
+def reload_index() -> int:
+    """
+    Hot swap: open the current index generation (vector store, BM25, endpoint
+    index) next to the live one, then replace the module globals in one step.
+    Searches already running keep the objects they started with.
+    """
+    global vector_store, bm25_index, endpoint_index, INDEX_GENERATION
+    generation = read_generation(CHROMA_PERSIST_DIR)
+    store = _open_vector_store() if embedding_model is not None else None
+    bm25 = _load_bm25(store) if RAG_RETRIEVAL_MODE != "vector" else None
+    try:
+        endpoints = EndpointIndex.from_file(OPENAPI_SPEC_PATH)
+    except Exception as e:
+        console.log(f"[yellow]⚠️ Endpoint index unavailable: {e}[/yellow]")
+        endpoints = endpoint_index
+    with _INDEX_LOCK:
+        vector_store, bm25_index, endpoint_index = store, bm25, endpoints
+        INDEX_GENERATION = generation
+    console.log(f"[green]🔄 Index generation {generation} is live.[/green]")
+    return generation
+
+
+def _live_generation() -> int:
+    """
+    Generation of the store searches use right now. Read before a search: if
+    reload_index swaps in between, the results are tagged older than they are
+    and simply not cached.
+    """
+    with _INDEX_LOCK:
+        return INDEX_GENERATION
+
+
+def _vector_search_many(store, query_vecs: List[List[float]], k: int, api_hint: str = ""):
+    """
+    Look up a batch of query vectors at once, pushing the api filter into the
+    vector query. Queries whose filtered search returns fewer than k chunks
+    (small API corpus or an index built before chunks were tagged) are topped
+    up from one over-fetched unfiltered lookup with the same vectors.
+    Also returns the stored chunk embeddings (keyed by content_key) for re-ranking.
+    """
+    hint = (api_hint or "").strip().lower()
+    to_relevance = store._select_relevance_score_fn()
+    vectors: Dict[Any, Any] = {}
+
+    def run(vecs, n: int, where: Optional[Dict[str, str]] = None):
+        out = []
+        for hits in search_by_vectors(store, vecs, n, where, with_embeddings=True):
+            row = []
+            for doc, distance, vec in hits:
+                if vec is not None:
+                    vectors[content_key(doc)] = vec
+                row.append((doc, to_relevance(distance)))
+            out.append(row)
+        return out
+
+    if not hint:
+        return run(query_vecs, k), vectors
+    results = run(query_vecs, k, {"api": hint})
+    if isinstance(store, ApiCollections) and hint in store.stores:
+        # Per-API collections: that collection already holds every chunk of this API
+        return results, vectors
+    short = [i for i, hits in enumerate(results) if len(hits) < k]
+    if short:
+        wide = run([query_vecs[i] for i in short], k * RAG_OVERFETCH)
+        for i, candidates in zip(short, wide):
+            results[i] = top_up_by_api(results[i], candidates, hint, k)
+    return results, vectors
+
+
+def _lexical_hits(bm25: BM25Index, query: str, k: int, api_hint: str = ""):
+    """BM25 hits as (Document, score) with scores scaled to the best hit."""
+    hits = bm25.search(query, k=k, api=api_hint)
+    if not hits:
+        return [], hits
+    top = hits[0][1] or 1.0
+    docs = []
+    for i, score in hits:
+        d = bm25.docs[i]
+        docs.append((Document(page_content=d["page_content"], metadata=d["metadata"]), score / top))
+    return docs, hits
+
+
+def _fuse(dense, lexical):
+    by_key = {}
+    for doc, score in lexical + dense:  # dense last: keep vector relevance where both matched
+        by_key[content_key(doc)] = (doc, score)
+    fused = reciprocal_rank_fusion([[content_key(d) for d, _ in dense], [content_key(d) for d, _ in lexical]])
+    return [by_key[key] for key, _ in fused]
+
+
+def _rerank(ranked, k: int, vectors: Optional[Dict[Any, Any]] = None):
+    """MMR + per-source cap so overlapping neighbour chunks don't fill all k slots."""
+    return mmr_rerank(ranked, k, vectors, lambda_mult=RAG_MMR_LAMBDA, max_per_source=RAG_MAX_PER_SOURCE)
+
+
+def _retrieve_many(queries: List[str], k: int, api_hint: str = ""):
+    """
+    Dispatch on RAG_RETRIEVAL_MODE for a batch of queries. Every query that
+    needs a dense lookup is embedded in a single batched call and searched
+    together. Returns (results, mode actually used) per query, in input order.
+    """
+    # One consistent (store, BM25) pair per call, even if reload_index swaps them meanwhile
+    with _INDEX_LOCK:
+        store, bm25 = vector_store, bm25_index
+    use_lexical = bm25 is not None and RAG_RETRIEVAL_MODE != "vector"
+    use_mmr = RAG_MMR_LAMBDA < 1.0 or RAG_MAX_PER_SOURCE > 0
+    fetch_k = k * RAG_OVERFETCH if (use_lexical or use_mmr) else k
+    out: List[Any] = [None] * len(queries)
+    lexical: Dict[int, Any] = {}
+    dense_idx: List[int] = []
+    for i, query in enumerate(queries):
+        if use_lexical:
+            docs, hits = _lexical_hits(bm25, query, fetch_k, api_hint)
+            if RAG_RETRIEVAL_MODE == "lexical" or store is None:
+                out[i] = (_rerank(docs, k), "lexical")
+                continue
+            if bm25.is_confident(query, hits):
+                # Keyword query with a clear winner: answer without an embedding call, but only
+                # if BM25 alone fills all k slots; otherwise the hybrid path supplies the rest
+                ranked = _rerank(docs, k)
+                if len(ranked) >= k:
+                    out[i] = (ranked, "lexical")
+                    continue
+            lexical[i] = docs
+        dense_idx.append(i)
+
+    if dense_idx:
+        vecs = embedding_model.embed_queries([queries[i] for i in dense_idx])
+        dense_lists, vectors = _vector_search_many(store, vecs, fetch_k, api_hint)
+        for i, dense in zip(dense_idx, dense_lists):
+            if i in lexical:
+                out[i] = (_rerank(_fuse(dense, lexical[i]), k, vectors), "hybrid")
+            else:
+                out[i] = (_rerank(dense, k, vectors), "vector")
+    return out
+
+
+def _retrieve_or_reload(queries: List[str], k: int, api_hint: str = ""):
+    """
+    _retrieve_many, re-opening the index once if the Chroma collections it
+    holds no longer exist (e.g. another process removed the database this one
+    opened), so searches recover without waiting for a restart or the watcher.
+    """
+    try:
+        return _retrieve_many(queries, k, api_hint)
+    except NotFoundError as e:
+        console.log(f"[yellow]⚠️ Index changed underneath ({e}); reloading.[/yellow]")
+        reload_index()
+        return _retrieve_many(queries, k, api_hint)
+
+
+def _format_results(results) -> List[Dict[str, Any]]:
+    return [
+        {
+            "page_content": doc.page_content,
+            "metadata": doc.metadata,
+            "relevance_score": float(round(float(score), 3)),
+        }
+        for doc, score in results
+    ]
+
+
+def _print_results_table(formatted_results: List[Dict[str, Any]]) -> None:
+    if HAVE_RICH and Table is not None:
+        table = Table(title="Top Retrieved Chunks", show_header=True, header_style="bold magenta")
+        table.add_column("Relevance", justify="right")
+        table.add_column("Snippet", justify="left")
+        for item in formatted_results:
+            snippet = (item["page_content"] or "").replace("\n", " ")[:80] + "..."
+            table.add_row(str(item["relevance_score"]), snippet)
+        console.print(table)
+
 
 # --- RAG Tool: Documentation Search ---
 @tool
@@ -74,44 +350,32 @@ def search_documentation(query: str, k: int = 4, api_hint: str = "") -> List[Dic
     Searches the ConTech API documentation for the most relevant context.
     Returns the top-k results with relevance scores and metadata.
     """
-    if vector_store is None:
+    if vector_store is None and bm25_index is None:
         return [{"error": "Vector store not initialized. Run ingestion first."}]
 
     console.rule("[bold blue]RAG Search Initiated[/bold blue]")
     console.log(f"🔍 Query: [cyan]{query}[/cyan]")
 
+    cache_key = ResultCache.make_key(query, k, api_hint)
+    cached = RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        console.log(f"[green]Result cache hit ({len(cached)} results).[/green]")
+        return cached
+
     try:
-        results = vector_store.similarity_search_with_relevance_scores(query, k=k)
-        console.log(f"[green]Found {len(results)} results.[/green]")
-
-        formatted_results: List[Dict[str, Any]] = []
-        for doc, score in results:
-            # Apply soft filter by api_hint if provided and metadata has a 'source'
-            if api_hint and isinstance(doc.metadata, dict):
-                src = str(doc.metadata.get("source") or "").lower()
-                if api_hint.lower() not in src:
-                    continue
-            formatted_results.append(
-                {
-                    "page_content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "relevance_score": float(round(float(score), 3)),
-                }
-            )
+        generation = _live_generation()
+        results, mode = _retrieve_or_reload([query], k, api_hint)[0]
+        console.log(f"[green]Found {len(results)} results ({mode}).[/green]")
+        if embedding_model is not None:
+            console.log(f"[dim]Embedding cache: {embedding_model.stats()}[/dim]")
 
+        formatted_results = _format_results(results)
         if not formatted_results:
             console.log("[yellow]No relevant results found.[/yellow]")
             return [{"message": "No matching documentation found."}]
 
-        if HAVE_RICH and Table is not None:
-            table = Table(title="Top Retrieved Chunks", show_header=True, header_style="bold magenta")
-            table.add_column("Relevance", justify="right")
-            table.add_column("Snippet", justify="left")
-            for item in formatted_results:
-                snippet = (item["page_content"] or "").replace("\n", " ")[:80] + "..."
-                table.add_row(str(item["relevance_score"]), snippet)
-            console.print(table)
-
+        _print_results_table(formatted_results)
+        RESULT_CACHE.put(cache_key, formatted_results, generation)
         return formatted_results
 
     except Exception as e:
@@ -119,6 +383,73 @@ def search_documentation(query: str, k: int = 4, api_hint: str = "") -> List[Dic
         return [{"error": f"RAG search failed: {e}"}]
 
 
+@tool
+def search_documentation_batch(queries: List[str], k: int = 4, api_hint: str = "") -> List[List[Dict[str, Any]]]:
+    """
+    Searches the ConTech API documentation for several queries at once.
+    Uncached queries are embedded in one batched request and looked up together.
+    Returns one top-k result list per query, in the same order as `queries`.
+    """
+    if vector_store is None and bm25_index is None:
+        return [[{"error": "Vector store not initialized. Run ingestion first."}] for _ in queries]
+
+    console.rule("[bold blue]Batch RAG Search Initiated[/bold blue]")
+    console.log(f"🔍 {len(queries)} queries")
+
+    keys = [ResultCache.make_key(q, k, api_hint) for q in queries]
+    out: List[Any] = [RESULT_CACHE.get(key) for key in keys]
+    pending = [i for i, cached in enumerate(out) if cached is None]
+    console.log(f"[green]Result cache hits: {len(queries) - len(pending)}/{len(queries)}[/green]")
+
+    try:
+        if pending:
+            generation = _live_generation()
+            retrieved = _retrieve_or_reload([queries[i] for i in pending], k, api_hint)
+            for i, (results, _mode) in zip(pending, retrieved):
+                formatted = _format_results(results)
+                if formatted:
+                    RESULT_CACHE.put(keys[i], formatted, generation)
+                    out[i] = formatted
+                else:
+                    out[i] = [{"message": "No matching documentation found."}]
+            if embedding_model is not None:
+                console.log(f"[dim]Embedding cache: {embedding_model.stats()}[/dim]")
+        return out
+    except Exception as e:
+        console.log(f"[red]Error during batch RAG search:[/red] {e}")
+        return [[{"error": f"RAG search failed: {e}"}] for _ in queries]
+
+
+# --- Endpoint Index: structured OpenAPI lookups (no embeddings) ---
+OPENAPI_SPEC_PATH = os.getenv("OPENAPI_SPEC_PATH", os.path.join(ROOT_DIR, "docs", "openapi.yaml"))
+endpoint_index: Optional[EndpointIndex] = None
+try:
+    endpoint_index = EndpointIndex.from_file(OPENAPI_SPEC_PATH)
+    console.log(f"[green]✅ Endpoint index loaded ({len(endpoint_index)} operations).[/green]")
+except Exception as e:
+    console.log(f"[yellow]⚠️ Endpoint index unavailable: {e}[/yellow]")
+
+
+@tool
+def lookup_endpoint(query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """
+    Looks up ConTech API operations by "METHOD /path", a concrete path, or keywords.
+    Returns full operation details (parameters, request body, responses with
+    examples, $refs resolved) plus a rendered text form, best match first.
+    """
+    if endpoint_index is None:
+        return [{"error": "Endpoint index not initialized (OpenAPI spec missing)."}]
+    matches = endpoint_index.lookup(query, limit=limit)
+    return [
+        {
+            **m,
+            "page_content": EndpointIndex.render(m["operation"]),
+            "metadata": {"source": endpoint_index.source, "endpoint": m["endpoint"]},
+        }
+        for m in matches
+    ]
+
+
 # --- Retry Logic Helper ---
 def _retry_request(request_fn, max_retries=3, delay=2):
     last_exc: Optional[Exception] = None
@@ -205,7 +536,7 @@ def check_api_status(base_url: str = "http://localhost:8000", timeout: int = 5)
 
 
 # --- Export Tools ---
-available_tools = [search_documentation, check_api_status]
+available_tools = [search_documentation, search_documentation_batch, lookup_endpoint, check_api_status]
 
 def get_tools():
     return available_tools
@@ -347,4 +678,4 @@ def add_cost_item(project_id: str, item: Dict[str, Any], base_url: str, headers:
         return {"ok": False, "error": str(e)}
 
 # extend available tools
-available_tools = [search_documentation, check_api_status, create_project, add_cost_item]
+available_tools = [search_documentation, search_documentation_batch, lookup_endpoint, check_api_status, create_project, add_cost_item]
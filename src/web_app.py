@@ -1,10 +1,13 @@
 from fastapi import FastAPI, Request, APIRouter, Response
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import math
 import os
 import time
+from contextlib import asynccontextmanager
 from uuid import uuid4
-from typing import List
+from typing import List, Optional, Tuple
 
 # Reuse the mock API to keep parity with local dev
 try:
@@ -18,7 +21,29 @@ try:
 except Exception:
     run_agent_once = None
 
-app = FastAPI(title="API Copilot (Web)")
+from src.agent_pool import AGENT_POOL, PoolFull
+from src.index_watcher import start_watcher_from_env
+from src.rate_limit import RateLimiter
+
+# Optional docs/ watcher: incremental re-index + hot swap of the search index (RAG_WATCH=1)
+INDEX_WATCHER = None
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    global INDEX_WATCHER
+    try:
+        INDEX_WATCHER = start_watcher_from_env()
+    except Exception as e:
+        print(f"Index watcher disabled: {e}")
+    yield
+    if INDEX_WATCHER is not None:
+        INDEX_WATCHER.stop()
+    # Write out transcript turns still queued by the SQLite session backend
+    SESSION_STORE.close()
+
+
+app = FastAPI(title="API Copilot (Web)", lifespan=_lifespan)
 
 from src.analytics import ANALYTICS
 from src.security import SecurityHeadersMiddleware
@@ -42,29 +67,32 @@ def _new_sid() -> str:
     return uuid4().hex
 
 
+def _render_turn(turn: dict) -> str:
+    """One chat bubble; stored with the turn so a transcript is never re-rendered."""
+    text = (turn.get("text") or "").replace("<", "&lt;")
+    if turn.get("role") == "user":
+        return f"<div class='flex justify-end'><div class='max-w-[80%] bg-blue-50 border border-blue-100 rounded-2xl px-3 py-2 my-1'>{text}</div></div>"
+    return f"<div class='flex justify-start'><div class='max-w-[80%] bg-slate-50 border border-slate-200 rounded-2xl px-3 py-2 my-1 whitespace-pre-wrap'>{text}</div></div>"
+
+
+def _render_badge(api: Optional[str], oob: bool = False) -> str:
+    # Out-of-band on incremental responses: replaces the badge at the top of the window
+    attrs = " hx-swap-oob='true'" if oob else ""
+    inner = f"Selected API: <b>{api}</b>" if api else ""
+    return f"<div id='api-badge' class='text-xs text-slate-500 mb-2'{attrs}>{inner}</div>"
+
+
 def _render_chat(transcript: List[dict]) -> str:
     # Find latest assistant meta for selected API
-    api_badge = ""
+    api = None
     for turn in reversed(transcript):
         if turn.get("role") == "assistant":
-            meta = turn.get("meta") or {}
-            api = meta.get("selected_api")
-            if api:
-                api_badge = f"<div class=\"text-xs text-slate-500 mb-2\">Selected API: <b>{api}</b></div>"
+            api = (turn.get("meta") or {}).get("selected_api")
             break
-    bubbles = []
-    for t in transcript:
-        role = t.get("role")
-        text = (t.get("text") or "").replace("<", "&lt;")
-        if role == "user":
-            bubbles.append(
-                f"<div class='flex justify-end'><div class='max-w-[80%] bg-blue-50 border border-blue-100 rounded-2xl px-3 py-2 my-1'>{text}</div></div>"
-            )
-        else:
-            bubbles.append(
-                f"<div class='flex justify-start'><div class='max-w-[80%] bg-slate-50 border border-slate-200 rounded-2xl px-3 py-2 my-1 whitespace-pre-wrap'>{text}</div></div>"
-            )
-    return api_badge + "\n".join(bubbles) if bubbles else "<p class='text-slate-500'>No messages yet. Ask a question to begin.</p>"
+    bubbles = [t.get("html") or _render_turn(t) for t in transcript]
+    if not bubbles:
+        return "<p id='chat-empty' class='text-slate-500'>No messages yet. Ask a question to begin.</p>"
+    return _render_badge(api) + "\n".join(bubbles)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -129,6 +157,12 @@ async def index(request: Request):
       async function updateBadge(){
         try{ const r=await fetch('/mock/status'); const d=await r.json(); const ok=(d && (d.ok===true || d.status==='OK' || d.ok==='true')); const el=document.getElementById('op-badge'); if(!el) return; if(ok){ el.className='px-2 py-1 rounded bg-green-100 text-green-800'; el.textContent='🟢 Operational'; } else { el.className='px-2 py-1 rounded bg-amber-100 text-amber-800'; el.textContent='🟠 Issues'; } }catch(e){}
       }
+      function appendChat(target, html){
+        const tpl=document.createElement('template'); tpl.innerHTML=html;
+        tpl.content.querySelectorAll('[hx-swap-oob]').forEach(function(el){ el.removeAttribute('hx-swap-oob'); const cur=document.getElementById(el.id); if(cur) cur.replaceWith(el); else target.prepend(el); });
+        const empty=document.getElementById('chat-empty'); if(empty) empty.remove();
+        target.append(tpl.content);
+      }
       async function postForm(url, form, targetId){
         const target=document.getElementById(targetId);
         const sendBtn=document.getElementById('sendBtn');
@@ -139,7 +173,7 @@ async def index(request: Request):
           const fd=new FormData(form);
           const r=await fetch(url,{method:'POST', body:fd});
           const html=await r.text();
-          if(target) target.innerHTML=html;
+          if(target) appendChat(target, html);
         } finally {
           if(typing) typing.style.display='none';
           if(sendBtn) sendBtn.disabled=false;
@@ -159,7 +193,7 @@ async def index(request: Request):
       }
       async function sendMessage(text){
         const f=document.getElementById('chatForm'); if(!f) return; const fd=new FormData(); fd.append('message',text); const target=document.getElementById('chat-window'); const typing=document.getElementById('typingBubble');
-        try{ if(typing) typing.style.display='block'; const r=await fetch('/chat',{method:'POST', body:fd}); const html=await r.text(); if(target) target.innerHTML=html; } finally { if(typing) typing.style.display='none'; const cw=document.getElementById('chat-window'); if(cw){ cw.scrollTop=cw.scrollHeight; } }
+        try{ if(typing) typing.style.display='block'; const r=await fetch('/chat',{method:'POST', body:fd}); const html=await r.text(); if(target) appendChat(target, html); } finally { if(typing) typing.style.display='none'; const cw=document.getElementById('chat-window'); if(cw){ cw.scrollTop=cw.scrollHeight; } }
       }
       window.addEventListener('load', updateBadge);
       </script>
@@ -193,7 +227,8 @@ async def index(request: Request):
     return resp
 
 
-_RATE_LIMIT: dict = {}  # key -> list[timestamps]
+# Sliding-window counters (O(1) per request, idle keys evicted); RATE_LIMIT_BACKEND=sqlite shares them across workers
+RATE_LIMITER = RateLimiter.from_env()
 
 def _parse_rl_env(val: str, default_count: int, default_window: float) -> (int, float):
     try:
@@ -203,17 +238,10 @@ def _parse_rl_env(val: str, default_count: int, default_window: float) -> (int,
         return default_count, default_window
 
 
-def _rate_limited(ip: str) -> bool:
-    now = time.time()
+def _rate_limited(ip: str) -> Tuple[bool, float]:
     cnt, win = _parse_rl_env(os.getenv("RL_PER_IP", "10-60"), 10, 60.0)
-    q = _RATE_LIMIT.get(ip, [])
-    q = [t for t in q if now - t < win]
-    if len(q) >= cnt:
-        _RATE_LIMIT[ip] = q
-        return True
-    q.append(now)
-    _RATE_LIMIT[ip] = q
-    return False
+    allowed, retry_after = RATE_LIMITER.hit(f"ip:{ip}", cnt, win)
+    return not allowed, retry_after
 
 
 def _mask_secrets(msg: str) -> str:
@@ -229,6 +257,7 @@ def _mask_secrets(msg: str) -> str:
 @app.post("/chat")
 async def chat(request: Request):
     req_id = f"req_{uuid4().hex[:8]}"
+    start = time.monotonic()
     form = await request.form()
     message = (form.get("message") or "").strip()
     if not message:
@@ -246,8 +275,13 @@ async def chat(request: Request):
 
     # Simple per-IP rate limit
     client_ip = request.client.host if request.client else "0.0.0.0"
-    if _rate_limited(client_ip):
-        return HTMLResponse('<p class="text-amber-700">Rate limit—try again in a minute.</p>', status_code=429)
+    limited, retry_after = _rate_limited(client_ip)
+    if limited:
+        return HTMLResponse(
+            '<p class="text-amber-700">Rate limit—try again in a minute.</p>',
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
 
     if run_agent_once is None:
         return HTMLResponse('<p class="text-red-600">Agent not available in this build.</p>', status_code=500)
@@ -255,21 +289,32 @@ async def chat(request: Request):
     # Session handling
     sid = request.cookies.get("chat_sid") or _new_sid()
     # Per-session rate limit from env (default 20-300)
-    now = time.time();
-    key = f"sid:{sid}"
-    arr = _RATE_LIMIT.get(key, [])
     sc, sw = _parse_rl_env(os.getenv("RL_PER_SESSION", "20-300"), 20, 300.0)
-    arr = [t for t in arr if now - t < sw]
-    if len(arr) >= sc:
-        _RATE_LIMIT[key] = arr
-        return HTMLResponse('<p class="text-amber-700">Rate limit—try again in a few minutes.</p>', status_code=429)
-    arr.append(now); _RATE_LIMIT[key]=arr
-
-    # Append user turn
-    SESSION_STORE.append(sid, "user", message)
+    allowed, retry_after = RATE_LIMITER.hit(f"sid:{sid}", sc, sw)
+    if not allowed:
+        return HTMLResponse(
+            '<p class="text-amber-700">Rate limit—try again in a few minutes.</p>',
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    # Bounded worker pool: admit now (before recording the turn) or shed load with a fast 503
+    try:
+        pending = AGENT_POOL.submit(run_agent_once, message)
+    except PoolFull as e:
+        return HTMLResponse(
+            '<p class="text-amber-700">The assistant is busy right now. Please try again shortly.</p>',
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    # Append user turn (rendered once, here)
+    user_html = _render_turn({"role": "user", "text": message})
+    SESSION_STORE.append(sid, "user", message, html=user_html)
 
     try:
-        result = run_agent_once(message) or {}
+        # The agent blocks on LLM/HTTP calls; awaiting its future keeps the event loop free
+        result = await asyncio.wrap_future(pending) or {}
         final_text = result.get("final_text") or "No reply."
         api_name = result.get("selected_api") or "n/a"
         status = result.get("api_status")
@@ -279,10 +324,12 @@ async def chat(request: Request):
             status_badge = f'<span class="px-2 py-1 {color} rounded">{status.get("status")}</span>'
 
         # Append assistant turn with meta
-        SESSION_STORE.append(sid, "assistant", final_text, meta={"selected_api": api_name, "api_status": status})
-        # Return refreshed chat window
-        transcript = SESSION_STORE.get(sid)
-        html = _render_chat(transcript)
+        assistant_html = _render_turn({"role": "assistant", "text": final_text})
+        SESSION_STORE.append(
+            sid, "assistant", final_text, meta={"selected_api": api_name, "api_status": status}, html=assistant_html
+        )
+        # Only the new bubbles (appended client-side), so the response size does not grow with the transcript
+        html = _render_badge(api_name, oob=True) + user_html + "\n" + assistant_html
         resp = HTMLResponse(html)
         resp.set_cookie("chat_sid", sid, httponly=True, samesite="lax")
         try:
@@ -295,7 +342,10 @@ async def chat(request: Request):
             ANALYTICS.record_event(sid, "/chat", int((time.monotonic()-start)*1000), None, False, e.__class__.__name__)
         except Exception:
             pass
-        return HTMLResponse(f'<p class="text-red-600">Error: {_mask_secrets(str(e))}</p>', status_code=500)
+        # The user turn is already stored, so show it alongside the error to keep the page in step with the transcript
+        resp = HTMLResponse(user_html + f'\n<p class="text-red-600">Error: {_mask_secrets(str(e))}</p>', status_code=500)
+        resp.set_cookie("chat_sid", sid, httponly=True, samesite="lax")
+        return resp
 
 
 @app.post("/chat/new")
@@ -365,13 +415,7 @@ async def view_shared(token: str):
         secret = os.getenv("SECRET_KEY", "dev-secret-change-me")
         transcript = unpack_link(token, secret)
         # Render read-only bubbles
-        bubbles = []
-        for t in transcript:
-            role = t.get("r"); text = (t.get("t") or "").replace("<","&lt;")
-            if role == "user":
-                bubbles.append(f"<div class='flex justify-end'><div class='max-w-[80%] bg-blue-50 border border-blue-100 rounded-2xl px-3 py-2 my-1'>{text}</div></div>")
-            else:
-                bubbles.append(f"<div class='flex justify-start'><div class='max-w-[80%] bg-slate-50 border border-slate-200 rounded-2xl px-3 py-2 my-1 whitespace-pre-wrap'>{text}</div></div>")
+        bubbles = [_render_turn({"role": t.get("r"), "text": t.get("t")}) for t in transcript]
         html = """
         <div class='max-w-3xl mx-auto p-6'>
           <div class='text-xs text-slate-500 mb-2'>Read-only share</div>
@@ -388,7 +432,10 @@ async def view_shared(token: str):
 
 @app.get("/healthz")
 def healthz():
-    return {"ok": True}
+    health = {"ok": True, "agent_pool": AGENT_POOL.stats(), "rate_limit": RATE_LIMITER.stats()}
+    if INDEX_WATCHER is not None:
+        health["index"] = INDEX_WATCHER.stats()
+    return health
 
 # --- Admin endpoints ---
 def _auth_admin(request: Request) -> bool:
@@ -453,7 +500,7 @@ async def admin_metrics(request: Request):
         "avg_latency": (sum(d.get("avg_latency_ms", 0) for d in daily) // max(1, len(daily))) if daily else 0,
         "tool_calls": sum(d.get("tool_calls", 0) for d in daily),
     }
-    return JSONResponse({"daily": daily, "totals": totals})
+    return JSONResponse({"daily": daily, "totals": totals, "agent_pool": AGENT_POOL.stats()})
 
 
 @app.get("/admin/export.csv")
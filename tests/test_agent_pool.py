@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.web_app as web_app
+from src.agent_pool import AgentPool, PoolFull
+from src.rate_limit import RateLimiter
+
+
+def test_pool_rejects_when_workers_and_queue_are_full():
+    pool = AgentPool(workers=1, queue_size=1)
+    release = threading.Event()
+    running = pool.submit(release.wait, 5)
+    waiting = pool.submit(lambda: "queued")
+    with pytest.raises(PoolFull) as exc:
+        pool.submit(lambda: "rejected")
+    assert exc.value.retry_after >= 1
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["active"] + stats["queue_depth"] == 2
+
+    release.set()
+    assert running.result(timeout=5) is True and waiting.result(timeout=5) == "queued"
+    assert pool.submit(lambda: "admitted again").result(timeout=5) == "admitted again"
+    stats = pool.stats()
+    assert stats["completed"] == 3 and stats["active"] == 0 and stats["queue_depth"] == 0
+    assert stats["wait_ms_p50"] is not None
+    pool.shutdown()
+
+
+def test_chat_sheds_load_with_503_and_retry_after(monkeypatch):
+    pool = AgentPool(workers=1, queue_size=0)
+    monkeypatch.setattr(web_app, "AGENT_POOL", pool)
+    monkeypatch.setattr(web_app, "RATE_LIMITER", RateLimiter())
+    monkeypatch.setattr(web_app, "run_agent_once", lambda msg: {"final_text": "OK", "selected_api": "contech"})
+    client = TestClient(web_app.app)
+
+    release = threading.Event()
+    busy = pool.submit(release.wait, 5)
+    r = client.post("/chat", data={"message": "Hello"})
+    assert r.status_code == 503 and int(r.headers["Retry-After"]) >= 1
+    assert "user: Hello" not in client.get("/chat/transcript").text
+
+    release.set()
+    busy.result(timeout=5)
+    r = client.post("/chat", data={"message": "Hello"})
+    assert r.status_code == 200 and "OK" in r.text
+    assert client.get("/healthz").json()["agent_pool"]["rejected"] == 1
+    pool.shutdown()
@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.rag import ApiCollections, HashingEmbeddings, NumpyIndex, open_collections
+from src.rag.stores import LEGACY_COLLECTION, api_collection_name, list_collections
+
+
+class _Counting(NumpyIndex):
+    calls = 0
+
+    def similarity_search_by_vectors(self, *args, **kwargs):
+        self.calls += 1
+        return super().similarity_search_by_vectors(*args, **kwargs)
+
+
+def _store(api, vectors):
+    return _Counting(
+        np.asarray(vectors, dtype=np.float32),
+        [f"{api} chunk {i}" for i in range(len(vectors))],
+        [{"source": f"docs/{api}.md", "api": api} for _ in vectors],
+    )
+
+
+def _collections():
+    return ApiCollections({
+        "contech": _store("contech", [[1, 0, 0], [0.9, 0.1, 0]]),
+        "scheduler": _store("scheduler", [[0.95, 0, 0.05], [0, 0, 1]]),
+    })
+
+
+def test_api_filter_queries_only_that_collection():
+    stores = _collections()
+    hits = stores.similarity_search_by_vectors([[1, 0, 0]], k=4, filter={"api": "scheduler"})[0]
+    assert [d.metadata["api"] for d, _ in hits] == ["scheduler", "scheduler"]
+    assert stores.stores["scheduler"].calls == 1
+    assert stores.stores["contech"].calls == 0
+
+
+def test_unfiltered_query_merges_by_distance():
+    stores = _collections()
+    hits = stores.similarity_search_by_vectors([[1, 0, 0]], k=3)[0]
+    assert [d.page_content for d, _ in hits] == ["contech chunk 0", "scheduler chunk 0", "contech chunk 1"]
+    assert [d for d, _ in hits] == [d for d, _ in sorted(hits, key=lambda h: h[1])]
+    assert len(stores) == 4
+    assert len(stores.get(include=["documents"])["documents"]) == 4
+
+
+def test_open_collections_prefers_per_api_layout(tmp_path):
+    import chromadb
+
+    emb = HashingEmbeddings(dim=16)
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    client.get_or_create_collection(LEGACY_COLLECTION).add(ids=["a"], documents=["old"], embeddings=[emb.embed_query("old")])
+    assert open_collections(str(tmp_path), emb)._collection.name == LEGACY_COLLECTION
+
+    for api in ("contech", "scheduler"):
+        client.get_or_create_collection(api_collection_name(api)).add(
+            ids=[api], documents=[f"{api} docs"], metadatas=[{"api": api}], embeddings=[emb.embed_query(f"{api} docs")]
+        )
+    assert list_collections(str(tmp_path)) == ["api_contech", "api_scheduler", LEGACY_COLLECTION]
+    stores = open_collections(str(tmp_path), emb)
+    assert isinstance(stores, ApiCollections) and sorted(stores.stores) == ["contech", "scheduler"]
+    hits = stores.similarity_search_by_vectors([emb.embed_query("scheduler docs")], k=2, filter={"api": "scheduler"})[0]
+    assert [d.page_content for d, _ in hits] == ["scheduler docs"]
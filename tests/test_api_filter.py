@@ -0,0 +1,26 @@
+from langchain_core.documents import Document
+
+from src.rag import infer_api, top_up_by_api
+
+
+def test_infer_api_from_source():
+    assert infer_api("docs/auth.md") == "contech"
+    assert infer_api("..\\docs\\scheduling_overview.md") == "scheduler"
+    assert infer_api("openapi.yaml") == "contech"
+
+
+def test_top_up_fills_from_matching_chunks():
+    a = Document(page_content="auth", metadata={"source": "docs/auth.md", "api": "contech"})
+    b = Document(page_content="sched", metadata={"source": "docs/scheduling_overview.md", "api": "scheduler"})
+    c = Document(page_content="costs", metadata={"source": "docs/workflow_project_create.md", "api": "contech"})
+    legacy = Document(page_content="old", metadata={"source": "..\\docs\\resource_management.md"})
+    legacy_sched = Document(page_content="old-sched", metadata={"source": "..\\docs\\scheduling_overview.md"})
+
+    filtered = [(a, 0.9)]
+    wide = [(a, 0.9), (legacy, 0.85), (b, 0.8), (legacy_sched, 0.75), (c, 0.7)]
+    out = top_up_by_api(filtered, wide, "contech", k=3)
+    assert [d.page_content for d, _ in out] == ["auth", "old", "costs"]
+
+    # Never returns another API's chunks, even if that leaves fewer than k
+    out = top_up_by_api([], [(b, 0.8)], "contech", k=2)
+    assert out == []
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from src.rag.batch_embed import BatchEmbedder, batched, is_rate_limited
+
+
+class QuotaError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FlakyEmbeddings:
+    """Fails the first `failures` calls with a 429, then embeds text length."""
+
+    def __init__(self, failures=0, status=429):
+        self.failures = failures
+        self.status = status
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.calls += 1
+            if self.failures > 0:
+                self.failures -= 1
+                raise QuotaError(self.status)
+        return [[float(len(t))] for t in texts]
+
+
+def test_batches_are_streamed_to_sink_in_order_of_completion():
+    stored = {}
+    embedder = BatchEmbedder(FlakyEmbeddings(), max_in_flight=3, sleep=lambda s: None)
+    groups = (([f"id{i}" for i in b], [f"t{i}" for i in b]) for b in batched(range(10), 4))
+    stats = embedder.run(groups, lambda ids, texts, vecs: stored.update(zip(ids, vecs)))
+    assert stats["batches"] == 3 and stats["chunks"] == 10
+    assert stored["id9"] == [2.0]
+
+
+def test_backoff_on_429_halves_concurrency_and_retries():
+    sleeps = []
+    fake = FlakyEmbeddings(failures=2)
+    embedder = BatchEmbedder(fake, max_in_flight=4, base_delay=1.0, sleep=sleeps.append)
+    assert embedder.embed(["abc"]) == [[3.0]]
+    assert embedder.throttled == 2 and fake.calls == 3
+    assert embedder.limit == 2  # 4 -> 2 -> 1, then +1 on success
+    assert len([s for s in sleeps if s > 0]) >= 2
+
+
+def test_non_quota_errors_propagate():
+    assert is_rate_limited(QuotaError(503)) and is_rate_limited(Exception("429 RESOURCE_EXHAUSTED"))
+    assert not is_rate_limited(QuotaError(400))
+    embedder = BatchEmbedder(FlakyEmbeddings(failures=1, status=400), sleep=lambda s: None)
+    with pytest.raises(QuotaError):
+        embedder.embed(["x"])
+
+
+def test_source_is_pulled_only_when_a_slot_frees_up():
+    pulled, stored = [], []
+
+    def source():
+        for i in range(6):
+            pulled.append(i)
+            yield [f"id{i}"], [f"t{i}"]
+
+    def sink(ids, texts, vecs):
+        # Never more than max_in_flight batches pulled ahead of what has been stored
+        assert len(pulled) - len(stored) <= 2
+        stored.extend(ids)
+
+    BatchEmbedder(FlakyEmbeddings(), max_in_flight=2, sleep=lambda s: None).run(source(), sink)
+    assert len(stored) == 6
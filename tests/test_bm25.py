@@ -0,0 +1,39 @@
+from src.rag import BM25Index, reciprocal_rank_fusion
+from src.rag.bm25 import literal_terms, tokenize
+
+
+CHUNKS = [
+    ("Send requests with the X-API-Key header. Keys are issued in the Developer Portal.", {"source": "docs/auth.md", "api": "contech"}),
+    ("POST /projects/{projectId}/cost-items adds cost items such as LAB-ELEC-01.", {"source": "openapi.yaml", "api": "contech"}),
+    ("A 503 means the service is unavailable; retry with backoff.", {"source": "docs/resource_management.md", "api": "contech"}),
+    ("Tasks have a start date and a deadline on the project timeline.", {"source": "docs/scheduling_overview.md", "api": "scheduler"}),
+]
+
+
+def test_tokenize_keeps_literals():
+    toks = tokenize("POST /projects/{projectId}/cost-items with X-API-Key")
+    assert "/projects/{projectid}/cost-items" in toks
+    assert "x-api-key" in toks and "cost" in toks
+    assert literal_terms("What does LAB-ELEC-01 mean?") == ["lab-elec-01"]
+    assert literal_terms("How do I authenticate?") == []
+
+
+def test_search_confidence_and_roundtrip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("LAB-ELEC-01", k=3)
+    assert index.docs[hits[0][0]]["metadata"]["source"] == "openapi.yaml"
+    assert index.is_confident("LAB-ELEC-01", hits)
+    assert not index.is_confident("how do tasks work", index.search("how do tasks work", k=3))
+
+    assert index.search("deadline", k=3, api="contech") == []
+
+    path = str(tmp_path / "bm25.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("503", k=1) == index.search("503", k=1)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+    assert fused[0][0] == "b"
+    assert {key for key, _ in fused} == {"a", "b", "c", "d"}
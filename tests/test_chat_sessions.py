@@ -43,3 +43,47 @@ def test_session_grows_and_reset(monkeypatch):
     assert r.status_code == 200
     assert r.text.strip() == "" or "No messages" in r.text
 
+
+
+def test_chat_returns_only_new_bubbles(monkeypatch):
+    import src.web_app as web_app
+
+    from src.rate_limit import RateLimiter
+
+    client = TestClient(app)
+    client.get("/")
+    monkeypatch.setattr(web_app, "run_agent_once", lambda msg: {"selected_api": "contech", "final_text": f"Re: {msg}"})
+    # Own limiter: the module-level one's per-IP budget is shared by every web test in the run
+    monkeypatch.setattr(web_app, "RATE_LIMITER", RateLimiter())
+
+    first = client.post("/chat", data={"message": "First question"})
+    second = client.post("/chat", data={"message": "Second <question>"})
+    assert second.status_code == 200
+    assert "First question" not in second.text
+    assert "Second &lt;question>" in second.text and "Re: Second" in second.text
+    assert "hx-swap-oob" in second.text and "contech" in second.text
+    assert abs(len(second.text) - len(first.text)) < 20
+
+    # Bubbles are cached with the turns and reused for the full page render
+    turns = web_app.SESSION_STORE.get(client.cookies["chat_sid"])
+    assert all(t.get("html") for t in turns)
+    page = client.get("/")
+    assert turns[-1]["html"] in page.text
+
+
+def test_chat_error_still_shows_the_stored_user_turn(monkeypatch):
+    import src.web_app as web_app
+
+    from src.rate_limit import RateLimiter
+
+    def fail(msg):
+        raise RuntimeError("agent down")
+
+    client = TestClient(app)
+    client.get("/")
+    monkeypatch.setattr(web_app, "run_agent_once", fail)
+    monkeypatch.setattr(web_app, "RATE_LIMITER", RateLimiter())
+    r = client.post("/chat", data={"message": "Will this work?"})
+    assert r.status_code == 500
+    assert "Will this work?" in r.text and "agent down" in r.text
+    assert "user: Will this work?" in client.get("/chat/transcript").text
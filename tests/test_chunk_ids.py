@@ -0,0 +1,16 @@
+from langchain_core.documents import Document
+
+from src.rag import chunk_id
+
+
+def test_chunk_id_is_stable_and_content_sensitive():
+    doc = Document(page_content="Send the X-API-Key header.", metadata={"source": "docs/auth.md", "api": "contech"})
+    same = Document(page_content="Send the X-API-Key header.", metadata={"api": "contech", "source": "docs/auth.md"})
+    assert chunk_id(doc, "recursive:1000:100") == chunk_id(same, "recursive:1000:100")
+    assert len(chunk_id(doc)) == 64
+
+    edited = Document(page_content="Send the X-API-Key header!", metadata=doc.metadata)
+    moved = Document(page_content=doc.page_content, metadata={"source": "docs/other.md", "api": "contech"})
+    ids = {chunk_id(doc, "recursive:1000:100"), chunk_id(edited, "recursive:1000:100"),
+           chunk_id(moved, "recursive:1000:100"), chunk_id(doc, "recursive:500:50")}
+    assert len(ids) == 4
@@ -0,0 +1,55 @@
+import os
+
+import chromadb
+
+from src.rag.compaction import copy_collection, plan_compaction, remove_chroma_dirs
+from src.rag.stores import chroma_dir, list_collections, set_chroma_dir
+
+CANONICAL = "a" * 64
+
+
+def _dump():
+    return {
+        "ids": ["uuid-1", CANONICAL, "uuid-2", "uuid-3", "uuid-4", "uuid-5"],
+        "documents": ["Auth uses API keys", "Auth uses API keys", "Schedules", "Old page", "", "GET /gone"],
+        "metadatas": [
+            {"source": "C:\\repo\\docs\\auth.md"},
+            {"source": "docs/auth.md"},
+            {"source": "docs/scheduling_overview.md"},
+            {"source": "docs/removed.md"},
+            {"source": "docs/auth.md"},
+            {"source": "openapi.yaml", "method": "GET", "path": "/gone"},
+        ],
+        "embeddings": [[1.0, 0.0]] * 6,
+    }
+
+
+def test_plan_keeps_content_hash_ids_and_drops_orphans():
+    plan = plan_compaction(_dump(), {"auth.md", "scheduling_overview.md", "openapi.yaml"}, {("GET", "/status")})
+    assert sorted(plan["keep"]) == sorted([CANONICAL, "uuid-2"])
+    assert plan["duplicates"] == ["uuid-1"]
+    assert sorted(plan["orphans"]) == ["uuid-3", "uuid-4", "uuid-5"]
+
+
+def test_compact_copy_is_published_next_to_the_live_database(tmp_path):
+    index_dir = str(tmp_path)
+    live = chromadb.PersistentClient(path=index_dir)
+    col = live.create_collection("api_contech", embedding_function=None)
+    col.add(ids=[f"id-{i}" for i in range(50)], embeddings=[[float(i), 1.0] for i in range(50)],
+            documents=[f"chunk {i}" for i in range(50)], metadatas=[{"api": "contech"}] * 50)
+    assert chroma_dir(index_dir) == index_dir
+
+    target_dir = os.path.join(index_dir, "chroma-1")
+    assert copy_collection(col, chromadb.PersistentClient(path=target_dir), ["id-3", "id-7"]) == 2
+    # Nothing changes for readers of the live database until the pointer is swapped
+    assert col.count() == 50
+    set_chroma_dir(index_dir, "chroma-1")
+    assert chroma_dir(index_dir) == target_dir and list_collections(index_dir) == ["api_contech"]
+    copied = chromadb.PersistentClient(path=target_dir).get_collection("api_contech")
+    assert copied.get(ids=["id-7"])["documents"] == ["chunk 7"]
+
+    # The replaced database is kept for processes that have not reloaded; anything older goes
+    os.makedirs(os.path.join(index_dir, "chroma-0"))
+    assert remove_chroma_dirs(index_dir, keep=[target_dir, index_dir]) == [os.path.join(index_dir, "chroma-0")]
+    assert remove_chroma_dirs(index_dir, keep=[target_dir]) == []
+    assert os.path.exists(os.path.join(index_dir, "chroma.sqlite3")) and os.path.isdir(target_dir)
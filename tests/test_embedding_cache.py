@@ -0,0 +1,71 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from src.rag import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.doc_calls = 0
+        self.query_calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.doc_calls += 1
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls += 1
+        return [float(len(text)), 0.0, 0.25]
+
+
+def test_memory_and_disk_hits(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, model_name="fake", path=path)
+
+    v1 = cache.embed_query("How do I authenticate?")
+    v2 = cache.embed_query("  How do I   authenticate? ")  # same after normalisation
+    assert v1 == v2
+    assert inner.query_calls == 1
+    assert cache.stats()["memory_hits"] == 1
+
+    docs = cache.embed_documents(["alpha", "beta", "alpha"])
+    assert docs[0] == docs[2]
+    assert inner.doc_calls == 1
+    assert cache.stats()["misses"] == 3  # 1 query + 2 unique docs
+
+    # A fresh instance (restart) is served from SQLite, not the inner model
+    inner2 = CountingEmbeddings()
+    cache2 = CachedEmbeddings(inner2, model_name="fake", path=path)
+    assert cache2.embed_query("How do I authenticate?") == v1
+    assert cache2.embed_documents(["beta"]) == [docs[1]]
+    assert inner2.query_calls == 0 and inner2.doc_calls == 0
+    assert cache2.stats()["disk_hits"] == 2
+    assert cache2.stats()["hit_rate"] == 1.0
+
+
+def test_model_and_kind_are_part_of_the_key(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    inner = CountingEmbeddings()
+    CachedEmbeddings(inner, model_name="a", path=path).embed_query("x")
+    CachedEmbeddings(inner, model_name="b", path=path).embed_query("x")
+    CachedEmbeddings(inner, model_name="a", path=path).embed_documents(["x"])
+    assert inner.query_calls == 2
+    assert inner.doc_calls == 1
+
+
+def test_embed_queries_batches_only_misses(tmp_path):
+    inner = CountingEmbeddings()
+    batches = []
+
+    def batch_fn(texts):
+        batches.append(list(texts))
+        return [[float(len(t)), 0.0, 0.25] for t in texts]
+
+    cache = CachedEmbeddings(inner, model_name="fake", path=str(tmp_path / "emb.sqlite3"), batch_query_fn=batch_fn)
+    cache.embed_query("one")
+    vecs = cache.embed_queries(["one", "three", "five", "three"])
+    assert batches == [["three", "five"]]
+    assert vecs[1] == vecs[3]
+    assert inner.query_calls == 1
@@ -0,0 +1,45 @@
+import math
+import os
+
+import pytest
+
+from src.rag import HashingEmbeddings, get_embedding_provider
+
+
+def _cos(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_embeddings_are_deterministic_and_normalised():
+    emb = HashingEmbeddings(dim=256)
+    v = emb.embed_query("Send the X-API-Key header")
+    assert len(v) == 256
+    assert math.isclose(math.sqrt(sum(x * x for x in v)), 1.0, rel_tol=1e-6)
+    assert emb.embed_documents(["Send the X-API-Key header"])[0] == v
+
+    near = emb.embed_query("Which header carries the API key?")
+    far = emb.embed_query("Concrete pour scheduled for the foundation")
+    assert _cos(v, near) > _cos(v, far)
+
+
+def test_provider_selection_and_index_dirs(monkeypatch):
+    monkeypatch.setenv("HASHING_EMBEDDING_DIM", "128")
+    provider = get_embedding_provider("hashing")
+    assert provider.model_name == "hashing-128"
+    assert provider.index_dir("/repo") == os.path.join("/repo", "chroma_db_hashing-128")
+
+    with pytest.raises(ValueError):
+        get_embedding_provider("nope")
+
+
+def test_local_provider_needs_opt_in_to_fall_back(monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)  # as if not installed
+    monkeypatch.delenv("LOCAL_EMBEDDING_FALLBACK", raising=False)
+    with pytest.raises(ImportError, match="LOCAL_EMBEDDING_FALLBACK"):
+        get_embedding_provider("local")
+
+    monkeypatch.setenv("LOCAL_EMBEDDING_FALLBACK", "hashing")
+    with pytest.warns(UserWarning):
+        assert get_embedding_provider("local").name == "hashing"
@@ -0,0 +1,124 @@
+from src.index_watcher import LOCK_FILE, DocsWatcher
+from src.rag import bump_generation, read_generation
+
+
+def _watcher(tmp_path, calls):
+    docs, index = tmp_path / "docs", tmp_path / "index"
+    docs.mkdir()
+    index.mkdir()
+    (docs / "auth.md").write_text("# Auth\n")
+    live = {"generation": read_generation(str(index))}
+
+    def reindex():
+        calls.append("reindex")
+        assert (index / LOCK_FILE).exists()
+        bump_generation(str(index))
+
+    def reload():
+        calls.append("reload")
+        live["generation"] = read_generation(str(index))
+
+    w = DocsWatcher(str(docs), str(index), reindex, reload, lambda: live["generation"], interval=1.0)
+    return w, docs, index
+
+
+def test_change_is_debounced_then_reindexed_and_reloaded(tmp_path):
+    calls = []
+    w, docs, index = _watcher(tmp_path, calls)
+    w.poll_once(now=0.0)
+    assert calls == []
+
+    (docs / "new.md").write_text("# New page\n")
+    w.poll_once(now=10.0)  # change seen, waits for a quiet interval
+    assert calls == []
+    w.poll_once(now=10.5)
+    assert calls == []
+    w.poll_once(now=11.0)
+    assert calls == ["reindex", "reload"]
+    assert not (index / LOCK_FILE).exists()
+    assert w.stats()["generation"] == 1 and not w.stats()["pending_change"]
+
+
+def test_generation_published_elsewhere_triggers_reload_only(tmp_path):
+    calls = []
+    w, docs, index = _watcher(tmp_path, calls)
+    bump_generation(str(index))  # e.g. another worker re-indexed
+    w.poll_once(now=0.0)
+    assert calls == ["reload"]
+
+    (index / LOCK_FILE).write_text("other")  # another process holds the ingest lock
+    (docs / "auth.md").write_text("# Auth v2\n")
+    w.poll_once(now=1.0)
+    w.poll_once(now=5.0)
+    assert calls == ["reload"] and w.stats()["pending_change"]
+
+
+def test_change_is_reindexed_by_one_worker_only(tmp_path):
+    from src.index_watcher import docs_signature, signature_digest, write_indexed_docs
+
+    docs, index = tmp_path / "docs", tmp_path / "index"
+    docs.mkdir()
+    index.mkdir()
+    (docs / "auth.md").write_text("# Auth\n")
+    runs = []
+
+    def worker(name):
+        live = {"generation": 0}
+
+        def reindex():
+            # What ingestion does: record the docs it read next to the new generation
+            runs.append(name)
+            digest = signature_digest(docs_signature(str(docs)))
+            write_indexed_docs(str(index), digest, bump_generation(str(index)))
+
+        def reload():
+            live["generation"] = read_generation(str(index))
+
+        return DocsWatcher(str(docs), str(index), reindex, reload, lambda: live["generation"], interval=1.0)
+
+    a, b = worker("A"), worker("B")
+    (docs / "auth.md").write_text("# Auth v2\n")
+    a.poll_once(now=10.0)
+    b.poll_once(now=10.0)
+    (index / LOCK_FILE).write_text("A")  # A holds the lock while B is ready
+    b.poll_once(now=11.0)
+    (index / LOCK_FILE).unlink()
+    a.poll_once(now=11.0)
+    b.poll_once(now=12.0)
+    assert runs == ["A"]
+    assert not a.stats()["pending_change"] and not b.stats()["pending_change"]
+
+
+def test_ingest_lock_follows_the_holder_process(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    from src.index_watcher import try_ingest_lock
+
+    lock = tmp_path / LOCK_FILE
+    lock.write_text(str(os.getpid()))
+    os.utime(lock, (0, 0))  # a long ingest: old mtime, holder still running
+    assert try_ingest_lock(str(tmp_path)) is None
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    lock.write_text(str(dead.pid))  # crashed a moment ago
+    assert try_ingest_lock(str(tmp_path)) == str(lock)
+    assert lock.read_text() == str(os.getpid())
+
+
+def test_ingestion_refuses_to_run_while_the_lock_is_held(tmp_path, monkeypatch):
+    import os
+
+    import pytest
+
+    import src.ingestion as ingestion
+
+    monkeypatch.setattr(ingestion, "ROOT_DIR", str(tmp_path))
+    index = tmp_path / "chroma_db_hashing-512"
+    index.mkdir()
+    (index / LOCK_FILE).write_text(str(os.getpid()))  # e.g. a compaction in progress
+    with pytest.raises(ingestion.IngestLocked):
+        ingestion.ingest_documents("hashing")
+    assert sorted(p.name for p in index.iterdir()) == [LOCK_FILE]
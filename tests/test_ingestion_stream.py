@@ -0,0 +1,116 @@
+from langchain_core.documents import Document
+
+from src.ingestion import RecursiveCharacterTextSplitter, iter_chunks
+
+
+def test_iter_chunks_is_lazy_and_drops_duplicates():
+    consumed = []
+
+    def docs():
+        for name in ("a", "b", "a"):
+            consumed.append(name)
+            yield Document(page_content=f"Section {name}. " * 20, metadata={"source": "docs/same.md"})
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=120, chunk_overlap=0)
+    stream = iter_chunks(docs(), splitter)
+    first_id, first = next(stream)
+    assert consumed == ["a"] and first.metadata["api"] == "contech"
+
+    rest = list(stream)
+    ids = [first_id] + [cid for cid, _ in rest]
+    assert consumed == ["a", "b", "a"]
+    assert len(ids) == len(set(ids))
+    assert all("Section a" in c.page_content or "Section b" in c.page_content for _, c in rest)
+
+
+def test_openapi_is_chunked_per_operation():
+    from src.ingestion import DOCS_PATH, load_openapi_operations
+    import os
+
+    docs = load_openapi_operations(os.path.join(DOCS_PATH, "openapi.yaml"))
+    ops = {(d.metadata["method"], d.metadata["path"]): d for d in docs if "method" in d.metadata}
+    assert len(docs) == len(ops) + 1  # + overview
+    cost = ops[("POST", "/projects/{projectId}/cost-items")]
+    assert cost.page_content.startswith("POST /projects/{projectId}/cost-items")
+    assert "MAT-STL-001" in cost.page_content and cost.metadata["api"] == "contech"
+    assert ops[("POST", "/projects/{projectId}/schedule-tasks")].metadata["api"] == "scheduler"
+    assert all(isinstance(v, str) for d in docs for v in d.metadata.values())
+
+
+def test_chunks_are_routed_once_to_their_api():
+    import queue
+    import threading
+
+    import pytest
+
+    from src.ingestion import IngestAborted, drain_chunks, route_chunks
+
+    def chunks(fail=False):
+        for i, api in enumerate(["contech", "scheduler", "other", "contech"]):
+            yield f"c{i}", Document(page_content=str(i), metadata={"api": api})
+        if fail:
+            raise RuntimeError("bad spec")
+
+    queues = {"contech": queue.Queue(maxsize=1), "scheduler": queue.Queue(maxsize=1)}
+    abort = threading.Event()
+    producer = threading.Thread(target=route_chunks, args=(chunks(), queues, abort))
+    producer.start()
+    got = {api: [cid for cid, _ in drain_chunks(q, abort)] for api, q in queues.items()}
+    producer.join()
+    assert got == {"contech": ["c0", "c3"], "scheduler": ["c1"]}
+
+    # A failed stream must never look complete to the writers (they would delete unseen chunks)
+    queues = {"contech": queue.Queue()}
+    abort = threading.Event()
+    with pytest.raises(RuntimeError):
+        route_chunks(chunks(fail=True), queues, abort)
+    with pytest.raises(IngestAborted):
+        list(drain_chunks(queues["contech"], abort))
+
+
+def test_reingest_embeds_only_edited_chunks_and_deletes_vanished_ones(tmp_path, monkeypatch):
+    import shutil
+
+    import chromadb
+
+    import src.ingestion as ingestion
+    from src.rag.embedding_cache import CachedEmbeddings
+    from src.rag.stores import chroma_dir
+
+    docs = tmp_path / "docs"
+    shutil.copytree(ingestion.DOCS_PATH, docs)
+    monkeypatch.setattr(ingestion, "ROOT_DIR", str(tmp_path))
+    monkeypatch.setattr(ingestion, "DOCS_PATH", str(docs))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    embedded = []
+    real_embed = CachedEmbeddings.embed_documents
+    monkeypatch.setattr(CachedEmbeddings, "embed_documents",
+                        lambda self, texts: embedded.extend(texts) or real_embed(self, texts))
+
+    def stored():
+        # id -> (text, source) across every API collection
+        client = chromadb.PersistentClient(path=chroma_dir(str(tmp_path / "chroma_db_hashing-512")))
+        out = {}
+        for collection in client.list_collections():
+            data = collection.get(include=["documents", "metadatas"])
+            for cid, text, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+                out[cid] = (text, meta["source"])
+        return out
+
+    first = ingestion.ingest_documents("hashing")
+    before = stored()
+    assert first["added"] == len(before) == len(embedded) and first["removed"] == 0
+
+    embedded.clear()
+    (docs / "auth.md").write_text((docs / "auth.md").read_text() + "\n\nKeys rotate every 90 days.\n")
+    (docs / "scheduling_overview.md").unlink()
+    second = ingestion.ingest_documents("hashing")
+    after = stored()
+
+    new = set(after) - set(before)
+    assert new and sorted(embedded) == sorted(after[cid][0] for cid in new)
+    assert any("rotate every 90 days" in after[cid][0] for cid in new)
+    assert any(src == "docs/scheduling_overview.md" for _, src in before.values())
+    assert all(src != "docs/scheduling_overview.md" for _, src in after.values())
+    assert second["removed"] == len(set(before) - set(after)) > 0
+    assert second["kept"] == len(set(before) & set(after)) > 0 and second["generation"] == first["generation"] + 1
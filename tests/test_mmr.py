@@ -0,0 +1,31 @@
+from langchain_core.documents import Document
+
+from src.rag import mmr_rerank
+
+
+def _hit(text, source, score=1.0):
+    return (Document(page_content=text, metadata={"source": source}), score)
+
+
+def test_mmr_drops_near_duplicate_chunks():
+    ranked = [
+        _hit("POST /v1/token exchanges the client id and secret", "docs/auth.md"),
+        _hit("POST /v1/token exchanges the client id and secret for a token", "docs/auth-copy.md"),
+        _hit("GET /v1/projects lists projects for the account", "docs/projects.md"),
+    ]
+    out = mmr_rerank(ranked, k=2, lambda_mult=0.5)
+    assert [d.metadata["source"] for d, _ in out] == ["docs/auth.md", "docs/projects.md"]
+
+
+def test_mmr_uses_embeddings_when_available():
+    ranked = [_hit("a", "x.md"), _hit("b", "y.md"), _hit("c", "z.md")]
+    vectors = {("x.md", "a"): [1.0, 0.0], ("y.md", "b"): [1.0, 0.01], ("z.md", "c"): [0.0, 1.0]}
+    out = mmr_rerank(ranked, k=2, vectors=vectors, lambda_mult=0.5)
+    assert [d.page_content for d, _ in out] == ["a", "c"]
+
+
+def test_source_cap_is_relaxed_only_to_fill_k():
+    ranked = [_hit(f"auth chunk {i} text{i}", "docs/auth.md") for i in range(3)] + [_hit("costs", "docs/costs.md")]
+    out = mmr_rerank(ranked, k=3, lambda_mult=1.0, max_per_source=1)
+    assert [d.metadata["source"] for d, _ in out] == ["docs/auth.md", "docs/costs.md", "docs/auth.md"]
+    assert mmr_rerank(ranked, k=4, lambda_mult=1.0) == ranked
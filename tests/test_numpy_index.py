@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.rag import HashingEmbeddings, NumpyIndex
+
+
+TEXTS = [
+    "Authenticate with the X-API-Key header.",
+    "Create a project with POST /projects.",
+    "Add cost items to a project.",
+    "Tasks have deadlines on the schedule timeline.",
+    "Assign resources such as cranes to tasks.",
+]
+METAS = [{"api": "contech"}, {"api": "contech"}, {"api": "contech"}, {"api": "scheduler"}, {"api": "scheduler"}]
+
+
+def test_topk_matches_brute_force_and_batches():
+    rng = np.random.default_rng(1)
+    vecs = rng.normal(size=(50, 16)).astype(np.float32)
+    index = NumpyIndex(vecs, [str(i) for i in range(50)], [{} for _ in range(50)])
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+
+    unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    batch = index.query_batch(queries, k=5)
+    for q, hits in zip(queries, batch):
+        expected = list(np.argsort(-(unit @ (q / np.linalg.norm(q))))[:5])
+        assert [i for i, _ in hits] == expected
+        assert [d for _, d in hits] == sorted(d for _, d in hits)
+    assert [i for i, _ in index.query_batch(queries[1], k=5)[0]] == [i for i, _ in batch[1]]
+
+
+def test_vectorstore_interface_with_filter():
+    index = NumpyIndex.from_texts(TEXTS, HashingEmbeddings(dim=256), metadatas=METAS)
+    hits = index.similarity_search_with_score("X-API-Key header", k=2, filter={"api": "contech"})
+    assert hits[0][0].page_content == TEXTS[0]
+    assert all(doc.metadata["api"] == "contech" for doc, _ in hits)
+
+    rel = index.similarity_search_with_relevance_scores("schedule deadlines", k=1, filter={"api": "scheduler"})
+    assert rel[0][0].page_content == TEXTS[3]
+    assert 0.0 < rel[0][1] <= 1.0
+
+    assert index.similarity_search("anything", k=3, filter={"api": "billing"}) == []
+    assert len(index.get()["documents"]) == len(TEXTS)
+
+    with pytest.raises(TypeError, match="read-only"):
+        index.add_texts(["New chunk"])
@@ -0,0 +1,74 @@
+import yaml
+
+import src.rag.openapi_index as openapi_index
+from src.rag.openapi_index import EndpointIndex, example_from_schema, load_spec, resolve_refs
+
+SPEC = {
+    "info": {"title": "Test API"},
+    "components": {
+        "schemas": {
+            "CostItem": {
+                "type": "object",
+                "required": ["itemCode"],
+                "properties": {"itemCode": {"type": "string", "example": "LAB-ELEC-01"}, "quantity": {"type": "number"}},
+            },
+        },
+    },
+    "paths": {
+        "/projects/{projectId}/cost-items": {
+            "parameters": [{"in": "path", "name": "projectId", "required": True, "schema": {"type": "string"}}],
+            "post": {
+                "summary": "Add a cost item to a project",
+                "requestBody": {"required": True, "content": {"application/json": {"schema": {"$ref": "#/components/schemas/CostItem"}}}},
+                "responses": {"201": {"description": "Cost item added"}},
+            },
+        },
+        "/status": {"get": {"summary": "Check API health status", "responses": {"200": {"description": "OK"}}}},
+    },
+}
+
+
+def test_refs_resolved_and_examples_built():
+    resolved = resolve_refs(SPEC)
+    body = resolved["paths"]["/projects/{projectId}/cost-items"]["post"]["requestBody"]
+    assert "$ref" not in str(body)
+    assert example_from_schema(SPEC["components"]["schemas"]["CostItem"]) == {"itemCode": "LAB-ELEC-01", "quantity": 0.0}
+
+    index = EndpointIndex.from_spec(SPEC)
+    op = index.get("post", "/projects/PROJ-1/cost-items")
+    assert op["request_body"]["required_fields"] == ["itemCode"]
+    assert op["request_body"]["example"]["itemCode"] == "LAB-ELEC-01"
+    assert op["parameters"][0]["name"] == "projectId"
+    assert "LAB-ELEC-01" in EndpointIndex.render(op)
+
+
+def test_lookup_by_method_path_and_keywords():
+    index = EndpointIndex.from_spec(SPEC)
+    assert index.lookup("what does POST /projects/{projectId}/cost-items need?")[0]["match"] == "exact"
+    assert index.lookup("call /status")[0]["endpoint"] == "GET /status"
+    hits = index.lookup("how do I add a cost item")
+    assert hits[0]["endpoint"] == "POST /projects/{projectId}/cost-items" and hits[0]["match"] == "keywords"
+    assert index.lookup("what is the weather") == []
+
+
+def test_parallel_resolution_matches_serial(monkeypatch):
+    monkeypatch.setattr(openapi_index, "PARALLEL_MIN_PATHS", 1)
+    assert resolve_refs(SPEC, workers=2) == resolve_refs(SPEC, workers=1)
+
+
+def test_load_spec_cached_by_content_hash(tmp_path, monkeypatch):
+    spec_path, cache = tmp_path / "openapi.yaml", tmp_path / "cache"
+    spec_path.write_text(yaml.safe_dump(SPEC), encoding="utf-8")
+    first = load_spec(str(spec_path), str(cache))
+    assert first == resolve_refs(SPEC)
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("cached spec was parsed again")
+
+    monkeypatch.setattr(openapi_index.yaml, "load", no_parse)
+    assert load_spec(str(spec_path), str(cache)) == first
+    monkeypatch.undo()
+
+    spec_path.write_text(yaml.safe_dump({**SPEC, "info": {"title": "Edited"}}), encoding="utf-8")
+    assert EndpointIndex.from_file(str(spec_path), cache_dir=str(cache)).title == "Edited"
+    assert len(list(cache.glob("*.pickle"))) == 1
@@ -0,0 +1,34 @@
+import json
+
+from src.rag import HashingEmbeddings
+from src.rag.profiling import STAGES, StageProfiler, TimedEmbeddings, write_report
+
+
+def test_stages_counts_and_reports(tmp_path):
+    profiler = StageProfiler()
+    with profiler.stage("split"):
+        pass
+    embeddings = TimedEmbeddings(HashingEmbeddings(dim=8), profiler)
+    assert len(embeddings.embed_documents(["a b", "c d"])) == 2
+    profiler.count("chunks", 2)
+    profiler.count("chars", 10)
+
+    report = profiler.report(apis="contech")
+    assert list(report["stages"])[: len(STAGES)] == list(STAGES)
+    assert report["stages"]["embed"]["calls"] == 1 and report["stages"]["split"]["calls"] == 1
+    assert report["counts"]["est_tokens"] == 2 and report["counts"]["embedded_est_tokens"] == 0
+    assert report["apis"] == "contech" and report["wall_seconds"] >= 0
+
+    json_path, md_path = write_report(report, str(tmp_path / "runs"))
+    with open(json_path, encoding="utf-8") as f:
+        assert json.load(f)["counts"]["chunks"] == 2
+    with open(md_path, encoding="utf-8") as f:
+        assert "| embed |" in f.read()
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage("load"):
+        pass
+    profiler.count("chunks")
+    assert not profiler.seconds and not profiler.counts
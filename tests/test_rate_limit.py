@@ -0,0 +1,79 @@
+from src.rate_limit import MemoryBackend, RateLimiter, SQLiteBackend
+
+
+def test_sliding_window_counter_limits_and_recovers():
+    limiter = RateLimiter()
+    results = [limiter.hit("ip:a", 3, 60, now=t)[0] for t in (0, 1, 2, 3)]
+    assert results == [True, True, True, False]
+    allowed, retry_after = limiter.hit("ip:a", 3, 60, now=4)
+    assert not allowed and 0 < retry_after <= 56
+    # Next window: the previous count still weighs in until it has slid out
+    assert not limiter.hit("ip:a", 3, 60, now=61)[0]
+    assert limiter.hit("ip:a", 3, 60, now=100)[0]
+    assert limiter.hit("ip:b", 3, 60, now=4)[0]
+    assert limiter.stats()["denied"] == 3
+
+
+def test_memory_backend_evicts_idle_and_excess_keys():
+    backend = MemoryBackend(max_keys=100)
+    limiter = RateLimiter(backend)
+    for i in range(50):
+        limiter.hit(f"sid:{i}", 5, 10, now=0)
+    assert len(backend) == 50
+    limiter.hit("sid:late", 5, 10, now=25)  # every earlier key has been idle for two windows
+    assert len(backend) == 1
+    for i in range(150):
+        limiter.hit(f"ip:{i}", 5, 10, now=30)
+    assert len(backend) == 100
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "rl.sqlite3")
+    worker_a, worker_b = RateLimiter(SQLiteBackend(path)), RateLimiter(SQLiteBackend(path, cleanup_every=1))
+    assert worker_a.hit("ip:x", 2, 60, now=0)[0]
+    assert worker_b.hit("ip:x", 2, 60, now=1)[0]
+    assert not worker_a.hit("ip:x", 2, 60, now=2)[0]
+    worker_b.hit("ip:y", 2, 60, now=500)  # cleanup drops the expired ip:x row
+    assert len(worker_a.backend) == 1
+
+
+def test_sqlite_backend_schedules_cleanup_across_threads(tmp_path):
+    import threading
+
+    backend = SQLiteBackend(str(tmp_path / "rl.sqlite3"), cleanup_every=100)
+    cleanups = []
+    real = backend._conn
+
+    def conn():
+        c = real()
+
+        class Spy:
+            def execute(self, sql, *args):
+                if sql.startswith("DELETE"):
+                    cleanups.append(sql)
+                return c.execute(sql, *args)
+
+        return Spy()
+
+    backend._conn = conn
+    threads = [threading.Thread(target=lambda n=n: [backend.hit(f"ip:{n}:{i}", 5, 60, now=0) for i in range(50)])
+               for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(cleanups) == 4  # 400 hits, one cleanup per 100 whichever thread made them
+
+
+def test_per_ip_limit_sends_retry_after(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import src.web_app as web_app
+
+    monkeypatch.setattr(web_app, "RATE_LIMITER", RateLimiter())
+    monkeypatch.setattr(web_app, "run_agent_once", lambda msg: {"final_text": "OK", "selected_api": "contech"})
+    monkeypatch.setenv("RL_PER_IP", "1-60")
+    client = TestClient(web_app.app)
+    assert client.post("/chat", data={"message": "one"}).status_code == 200
+    r = client.post("/chat", data={"message": "two"})
+    assert r.status_code == 429 and 1 <= int(r.headers["Retry-After"]) <= 60
@@ -0,0 +1,47 @@
+import time
+
+from src.rag import ResultCache, bump_generation, read_generation
+
+
+def _results(text: str):
+    return [{"page_content": text, "metadata": {"source": "docs/auth.md"}, "relevance_score": 0.9}]
+
+
+def test_generation_bump_invalidates(tmp_path):
+    index_dir = str(tmp_path)
+    cache = ResultCache(index_dir=index_dir)
+    key = ResultCache.make_key("How do I authenticate?", 4, "contech")
+    cache.put(key, _results("X-API-Key"))
+    assert cache.get(ResultCache.make_key(" How do I  authenticate? ", 4, "ConTech")) == _results("X-API-Key")
+
+    assert read_generation(index_dir) == 0
+    assert bump_generation(index_dir) == 1
+    assert cache.get(key) is None
+    assert cache.stats()["generation"] == 1
+
+
+def test_ttl_and_bounds(tmp_path):
+    cache = ResultCache(index_dir=str(tmp_path), max_entries=2, ttl_seconds=0.05, max_chars=10_000)
+    cache.put("a", _results("a"))
+    cache.put("b", _results("b"))
+    cache.put("c", _results("c"))
+    assert cache.get("a") is None  # evicted (LRU)
+    assert cache.get("c") is not None
+    time.sleep(0.06)
+    assert cache.get("c") is None  # expired
+
+    # Returned lists are copies; callers cannot corrupt the cache
+    cache.put("d", _results("d"))
+    got = cache.get("d")
+    got[0]["page_content"] = "mutated"
+    assert cache.get("d")[0]["page_content"] == "d"
+
+
+def test_results_from_a_superseded_store_are_not_cached(tmp_path):
+    index_dir = str(tmp_path)
+    cache = ResultCache(index_dir=index_dir)
+    bump_generation(index_dir)  # another process published generation 1; this one still searches generation 0
+    cache.put("q", _results("stale"), generation=0)
+    assert cache.get("q") is None
+    cache.put("q", _results("fresh"), generation=1)  # after the hot swap
+    assert cache.get("q") == _results("fresh")
@@ -0,0 +1,42 @@
+from langchain_core.documents import Document
+
+from src.rag.benchmark import compare_runs, run_benchmark, score_ranking
+
+EXPECTED = [
+    {"source": "docs/auth.md", "section": "Errors", "anchor": "401 Unauthorized"},
+    {"source": "openapi.yaml", "section": "GET /status", "anchor": "/status"},
+]
+
+
+def _doc(text, source):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_score_ranking_recall_and_rr():
+    docs = [
+        _doc("Create a project", "docs/workflow_project_create.md"),
+        _doc("- **401 Unauthorized:** Your API key is missing", "..\\docs\\auth.md"),
+        _doc("401 Unauthorized but wrong file", "docs/scheduling_overview.md"),
+    ]
+    recall, rr = score_ranking(docs, EXPECTED, k=4)
+    assert recall == 0.5 and rr == 0.5
+    assert score_ranking(docs, EXPECTED, k=1) == (0.0, 0.0)
+
+
+def test_run_benchmark_reports_metrics_and_deltas():
+    queries = [{"id": "q", "query": "401?", "api": "contech", "expected": EXPECTED[:1]}]
+    calls = []
+
+    def retrieve(query, api):
+        calls.append((query, api))
+        return [_doc("401 Unauthorized", "docs/auth.md")]
+
+    run = run_benchmark(retrieve, queries, k=4, repeats=3)
+    assert len(calls) == 3 and calls[0] == ("401?", "contech")
+    assert run["metrics"]["recall@4"] == 1.0 and run["metrics"]["mrr"] == 1.0
+    assert run["metrics"]["p95_ms"] >= run["metrics"]["p50_ms"]
+    assert run["per_query"][0]["sources"] == ["auth.md"]
+
+    before = {"backends": {"x": {"metrics": {"recall@4": 0.5, "mrr": 0.25}}}}
+    deltas = compare_runs({"backends": {"x": run}}, before)
+    assert deltas["x"] == {"recall@4": 0.5, "mrr": 0.75}
@@ -0,0 +1,92 @@
+import time
+
+from src.session_store import MemoryBackend, SessionStore, SQLiteBackend
+
+
+def test_memory_backend_trims_turns_and_evicts_lru():
+    store = SessionStore(max_turns=3, max_sessions=2)
+    for i in range(5):
+        store.append("a", "user", f"m{i}")
+    assert [t["text"] for t in store.get("a")] == ["m2", "m3", "m4"]
+    store.append("b", "user", "hi")
+    store.append("c", "user", "hi")
+    assert store.get("a") == []
+    assert isinstance(store.backend, MemoryBackend)
+
+
+def test_memory_backend_expires_idle_sessions_from_the_front(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.session_store.time.monotonic", lambda: clock[0])
+    backend = MemoryBackend(ttl_seconds=60)
+    backend.append("a", {"role": "user", "text": "a"})
+    clock[0] += 30
+    backend.append("b", {"role": "user", "text": "b"})
+    clock[0] += 20
+    assert backend.get("a")  # touched: now the most recently used
+    clock[0] += 45  # b idle 65s, a idle 45s
+    backend.append("c", {"role": "user", "text": "c"})
+    assert len(backend) == 2 and backend.get("b") == [] and backend.get("a")
+
+
+def test_sqlite_backend_reads_own_writes_and_shares_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    worker_a = SessionStore(backend=SQLiteBackend(path, max_turns=3, flush_interval=60))
+    worker_b = SessionStore(backend=SQLiteBackend(path, max_turns=3))
+    try:
+        for i in range(4):
+            turns = worker_a.append("s1", "user", f"m{i}", meta={"i": i})
+        # Not written yet, but visible to the writer's own process
+        assert [t["text"] for t in turns] == ["m1", "m2", "m3"]
+        assert worker_b.get("s1") == []
+        worker_a.backend.flush()
+        assert [(t["text"], t["meta"]) for t in worker_b.get("s1")] == [("m1", {"i": 1}), ("m2", {"i": 2}), ("m3", {"i": 3})]
+        worker_b.reset("s1")
+        assert worker_b.get("s1") == []
+        worker_b.backend.flush()
+        assert worker_a.get("s1") == []
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_sqlite_backend_background_flush_and_ttl_cleanup(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "sessions.sqlite3"), ttl_seconds=60, max_sessions=1, flush_interval=0.01)
+    try:
+        backend.append("old", {"role": "user", "text": "a", "meta": {}})
+        backend.append("new", {"role": "user", "text": "b", "meta": {}})
+        deadline = time.time() + 5
+        while backend.flushes == 0 or backend._pending:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert backend.cleanup(now=time.time() + 1) == 1  # over max_sessions: least recently used goes
+        assert backend.cleanup(now=time.time() + 120) == 1  # idle past the TTL
+        assert backend.get("old") == [] and backend.get("new") == []
+    finally:
+        backend.close()
+
+
+def test_sqlite_backend_keeps_rendered_html(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    writer = SessionStore(backend=SQLiteBackend(path))
+    writer.append("s", "user", "hi", html="<div>hi</div>")
+    writer.append("s", "assistant", "hello")
+    writer.close()
+    reader = SessionStore(backend=SQLiteBackend(path))
+    try:
+        turns = reader.get("s")
+        assert turns[0]["html"] == "<div>hi</div>" and "html" not in turns[1]
+    finally:
+        reader.close()
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    import pytest
+
+    from src.session_store import SessionBackend
+
+    class AppendOnly(SessionBackend):
+        def append(self, session_id, turn):
+            return [turn]
+
+    with pytest.raises(TypeError):
+        AppendOnly()
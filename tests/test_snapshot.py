@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+
+from src.rag import NumpyIndex, bump_generation
+from src.rag.snapshot import export_snapshot, load_snapshot, snapshot_info
+
+
+def _index():
+    rng = np.random.default_rng(1)
+    return NumpyIndex(
+        rng.normal(size=(6, 8)),
+        [f"chunk {i}" for i in range(6)],
+        [{"source": f"docs/{i % 2}.md", "api": "contech"} for i in range(6)],
+        ids=[f"id-{i}" for i in range(6)],
+    )
+
+
+def test_snapshot_roundtrip_is_memory_mapped(tmp_path):
+    index = _index()
+    gen = bump_generation(str(tmp_path))
+    export_snapshot(index, str(tmp_path), gen)
+    assert snapshot_info(str(tmp_path)) == {"generation": gen, "vectors": f"vectors-{gen}.npy", "count": 6, "dim": 8}
+
+    mapped = load_snapshot(str(tmp_path))
+    assert isinstance(mapped.matrix.base, np.memmap) or isinstance(mapped.matrix, np.memmap)
+    assert not mapped.matrix.flags.writeable
+    assert list(mapped.ids) == index.ids and list(mapped.metadatas) == index.metadatas
+    assert list(mapped.documents) == index.documents and mapped.documents[-1] == "chunk 5"
+    # Texts and metadata are mapped too, not loaded into this process
+    assert isinstance(mapped.documents.blob, np.memmap) and isinstance(mapped.metadatas.offsets, np.memmap)
+    assert set(json.loads((tmp_path / "snapshot.json").read_text())) >= {"texts", "offsets"}
+    assert "chunk 0" not in (tmp_path / "snapshot.json").read_text()
+    q = index.matrix[2] + 0.01
+    assert [i for i, _ in mapped.query_batch(q, k=3)[0]] == [i for i, _ in index.query_batch(q, k=3)[0]]
+
+
+def test_stale_snapshot_is_ignored_and_old_files_removed(tmp_path):
+    index = _index()
+    export_snapshot(index, str(tmp_path), bump_generation(str(tmp_path)))
+    gen = bump_generation(str(tmp_path))
+    assert load_snapshot(str(tmp_path)) is None
+    assert load_snapshot(str(tmp_path), allow_stale=True) is not None
+
+    export_snapshot(index, str(tmp_path), gen)
+    assert sorted(p.name for p in tmp_path.glob("*.npy")) == [f"{n}-{gen}.npy" for n in ("offsets", "texts", "vectors")]
+    assert len(load_snapshot(str(tmp_path))) == 6